@@ -1,30 +1,166 @@
-from django.contrib import admin
-from .models import Appointment
+from datetime import datetime, timedelta
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .bulk import export_rows, iter_csv
+from .holds import active
+from .models import Appointment, Provider, SlotHold, SlotTaken
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids ``COUNT(*)`` over large tables.
+
+    An unfiltered changelist uses the database's row estimate when it is
+    above ``exact_below``; filtered and searched changelists count at most
+    ``count_cap`` rows, so a broad filter stops counting early.
+    """
+
+    exact_below = 10000
+    count_cap = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimate_table_rows(queryset)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+            return queryset.count()
+        return queryset[:self.count_cap].count()
+
+    @staticmethod
+    def estimate_table_rows(queryset):
+        """Return the planner's row estimate for the table, or None if unavailable."""
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            elif connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT table_rows FROM information_schema.tables '
+                    'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+                )
+            elif connection.vendor == 'sqlite':
+                # The largest rowid is read from the end of the primary key
+                # index; it over-counts by the number of deleted rows
+                cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            else:
+                return None
+            row = cursor.fetchone()
+
+        return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class DateRangeQuerySet(models.QuerySet):
+    """
+    QuerySet whose ``datetimes()`` spans the range between the first and last rows.
+
+    ``date_hierarchy`` lists its years, months or days with ``datetimes()``,
+    which is a ``SELECT DISTINCT`` over a truncated date and reads every
+    matching row. Two index lookups (MIN and MAX) are enough to list every
+    period in the range, at the cost of also listing periods with no rows.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        # Separate queries: SQLite only answers a lone MIN or MAX from the index
+        first = self.aggregate(value=models.Min(field_name))['value']
+        if first is None:
+            return []
+        last = self.aggregate(value=models.Max(field_name))['value']
+
+        first = timezone.localtime(first, tzinfo)
+        last = timezone.localtime(last, tzinfo)
+        current = first.replace(hour=0, minute=0, second=0, microsecond=0)
+        if kind in ('month', 'year'):
+            current = current.replace(day=1)
+        if kind == 'year':
+            current = current.replace(month=1)
+
+        periods = []
+        while current <= last:
+            periods.append(current)
+            if kind == 'day':
+                next_day = current.date() + timedelta(days=1)
+            elif kind == 'month':
+                next_day = (current.replace(day=28) + timedelta(days=4)).date().replace(day=1)
+            else:
+                next_day = current.date().replace(year=current.year + 1)
+            current = timezone.make_aware(datetime.combine(next_day, datetime.min.time()), current.tzinfo)
+
+        return periods[::-1] if order == 'DESC' else periods
+
+
+class AppointmentAdminForm(forms.ModelForm):
+    """Appointment form that rejects slots another booking holds."""
+
+    class Meta:
+        model = Appointment
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        provider = cleaned_data.get('provider')
+        appointment_time = cleaned_data.get('appointment_time')
+        if provider and appointment_time:
+            held = SlotHold.objects.filter(
+                active(), provider=provider, appointment_time=appointment_time,
+            ).exclude(appointment_id=self.instance.pk)
+            if held.exists():
+                self.add_error('appointment_time', 'This time slot is already booked.')
+        return cleaned_data
 
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
-    """Admin configuration for Appointment model."""
+    """
+    Admin configuration for Appointment model.
+
+    Tuned for tables with millions of rows: counts are estimated or capped,
+    search only runs index-backed lookups and dates are browsed through
+    ``date_hierarchy`` on the ``(appointment_time, id)`` index.
+    """
 
     list_display = [
-        'provider_name',
+        'provider',
         'client_email',
         'appointment_time',
         'is_paid',
         'created_at'
     ]
 
+    list_select_related = ['provider']
+
+    form = AppointmentAdminForm
+
     list_filter = [
         'is_paid',
-        'appointment_time',
-        'created_at'
     ]
 
+    # Only used to show the search box; see get_search_results
     search_fields = [
-        'provider_name',
-        'client_email',
-        'payment_intent_id'
+        '=client_email',
+        '=payment_intent_id',
+        '^provider__name',
     ]
+    search_help_text = (
+        'Exact client email, exact payment intent ID (pi_...), '
+        'or the start of a provider name (case-sensitive).'
+    )
+
+    date_hierarchy = 'appointment_time'
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     readonly_fields = [
         'created_at',
@@ -34,7 +170,7 @@ class AppointmentAdmin(admin.ModelAdmin):
 
     fieldsets = (
         ('Appointment Details', {
-            'fields': ('provider_name', 'client_email', 'appointment_time')
+            'fields': ('provider', 'client_email', 'appointment_time')
         }),
         ('Payment Information', {
             'fields': ('is_paid', 'payment_intent_id')
@@ -46,3 +182,90 @@ class AppointmentAdmin(admin.ModelAdmin):
     )
 
     ordering = ['-appointment_time']
+
+    actions = ['export_csv']
+
+    def changeform_view(self, request, *args, **kwargs):
+        # The slot can still be taken between clean() and the save
+        try:
+            return super().changeform_view(request, *args, **kwargs)
+        except SlotTaken:
+            self.message_user(request, 'This time slot was just booked. Please choose another.', messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('export/', self.admin_site.admin_view(self.export_view), name='%s_%s_export' % info),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        """Stream every appointment matching the changelist's filters and search as CSV."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        changelist = self.get_changelist_instance(request)
+        return self.stream_csv(changelist.get_queryset(request))
+
+    @admin.action(description='Export selected appointments to CSV', permissions=['view'])
+    def export_csv(self, request, queryset):
+        return self.stream_csv(queryset)
+
+    def stream_csv(self, queryset):
+        """
+        Build a CSV response that is written while the rows are read.
+
+        Rows come from ``values_list().iterator()`` in chunks, so memory stays
+        flat and the first bytes go out before the query has finished.
+        """
+        response = StreamingHttpResponse(
+            iter_csv(export_rows(queryset, chunk_size=2000)),
+            content_type='text/csv',
+        )
+        filename = f'appointments-{timezone.localdate():%Y%m%d}.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateRangeQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search with one index-backed lookup chosen from the term's shape.
+
+        The default search ORs case-insensitive matches over every field,
+        which scans the whole table.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if '@' in term:
+            return queryset.filter(client_email=term), False
+        if term.startswith('pi_'):
+            return queryset.filter(payment_intent_id=term), False
+        # Prefix match on the small provider table as a range, then an
+        # integer lookup on the (provider, appointment_time) index
+        provider_ids = Provider.objects.filter(
+            name__gte=term,
+            name__lt=term + '\U0010ffff',
+        ).values('id')
+        return queryset.filter(provider_id__in=provider_ids), False
+
+
+@admin.register(Provider)
+class ProviderAdmin(admin.ModelAdmin):
+    """Admin configuration for Provider model."""
+
+    list_display = [
+        'name',
+        'created_at'
+    ]
+
+    search_fields = [
+        'name',
+    ]
+
+    readonly_fields = [
+        'normalized_name',
+        'created_at'
+    ]
@@ -0,0 +1,121 @@
+"""
+Query parsing for the JSON appointment API.
+
+``filter_queryset`` turns the query string filters into an indexed queryset
+and ``projection`` the ``fields`` parameter into the ``.values()`` columns
+to load, so rows are read as dicts with only the requested columns and are
+never built into model instances.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+# Field names of the API and the column or expression each is read from
+FIELDS = {
+    'id': 'id',
+    'provider_id': 'provider_id',
+    'provider_name': F('provider__name'),
+    'appointment_time': 'appointment_time',
+    'client_email': 'client_email',
+    'is_paid': 'is_paid',
+    'payment_intent_id': 'payment_intent_id',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+# Columns the keyset cursor is built from; loaded even when not requested
+CURSOR_FIELDS = ('appointment_time', 'id')
+
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+# Largest primary key (BigAutoField); larger ids overflow the query parameter
+MAX_ID = 2 ** 63 - 1
+
+
+def projection(fields_param: str):
+    """
+    Parse the ``fields`` parameter.
+
+    Args:
+        fields_param: Comma-separated API field names, or empty for all
+
+    Returns:
+        Tuple of (fields to output, ``.values()`` positional args, ``.values()``
+        keyword args)
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    fields = [name.strip() for name in fields_param.split(',') if name.strip()] or list(FIELDS)
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+
+    fields = list(dict.fromkeys(fields))
+    loaded = fields + [name for name in CURSOR_FIELDS if name not in fields]
+    columns = [name for name in loaded if isinstance(FIELDS[name], str)]
+    expressions = {name: FIELDS[name] for name in loaded if not isinstance(FIELDS[name], str)}
+    return fields, columns, expressions
+
+
+def _parse_day(value: str, name: str):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+    return day
+
+
+def _start_of(day, name: str, days_later: int = 0) -> datetime:
+    try:
+        return timezone.make_aware(datetime.combine(day + timedelta(days=days_later), time.min))
+    except OverflowError:
+        raise ValueError(f'{name} is out of range')
+
+
+def filter_queryset(queryset, params):
+    """
+    Apply the ``provider``, ``date_from``, ``date_to`` and ``is_paid`` filters.
+
+    Dates are days in the site's time zone and both ends are inclusive. They
+    become a range on ``appointment_time`` so the indexes on it are used.
+
+    Args:
+        queryset: Appointments to filter
+        params: Query string (``request.GET``)
+
+    Returns:
+        The filtered queryset
+
+    Raises:
+        ValueError: If a filter value is malformed
+    """
+    if params.get('provider'):
+        try:
+            provider_id = int(params['provider'])
+        except ValueError:
+            raise ValueError('provider must be an integer id')
+        if not 0 < provider_id <= MAX_ID:
+            raise ValueError('provider is out of range')
+        queryset = queryset.filter(provider_id=provider_id)
+
+    if params.get('date_from'):
+        day = _parse_day(params['date_from'], 'date_from')
+        queryset = queryset.filter(appointment_time__gte=_start_of(day, 'date_from'))
+    if params.get('date_to'):
+        day = _parse_day(params['date_to'], 'date_to')
+        queryset = queryset.filter(appointment_time__lt=_start_of(day, 'date_to', days_later=1))
+
+    if params.get('is_paid'):
+        value = BOOLEANS.get(params['is_paid'].lower())
+        if value is None:
+            raise ValueError('is_paid must be true or false')
+        queryset = queryset.filter(is_paid=value)
+
+    return queryset
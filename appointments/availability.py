@@ -0,0 +1,166 @@
+"""
+Per-provider slot availability.
+
+Each provider/day is represented by an integer bitmap over
+``TIME_SLOT_CHOICES``: bit ``i`` is set when slot ``i`` is taken, i.e. has
+an active hold (see ``appointments.holds``). A bitmap is built from one
+grouped query, cached, and dropped by the signal handlers in
+``appointments.signals`` whenever an appointment changes. A month of
+bitmaps, for the booking calendar, is built the same way from one query
+grouped by day and hour and cached alongside. Entries holding unpaid
+bookings are cached only until the first of those holds expires.
+"""
+
+import calendar
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .forms import TIME_SLOT_CHOICES
+from .holds import active
+from .models import SlotHold
+
+
+# Slot value ("HH:MM") and starting hour -> bit position
+SLOT_INDEX = {value: i for i, (value, _label) in enumerate(TIME_SLOT_CHOICES)}
+HOUR_INDEX = {int(value.split(':')[0]): i for value, i in SLOT_INDEX.items()}
+
+
+def _cache_key(provider_id: int, day) -> str:
+    return f"availability:{provider_id}:{day.isoformat()}"
+
+
+def _month_cache_key(provider_id: int, year: int, month: int) -> str:
+    return f"availability:{provider_id}:{year:04d}-{month:02d}"
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _held_slots(provider_id: int, start, end, *group_by):
+    """Active holds of a provider between ``start`` and ``end``, grouped by hour."""
+    return (
+        SlotHold.objects
+        .filter(
+            active(),
+            provider_id=provider_id,
+            appointment_time__gte=start,
+            appointment_time__lt=end,
+        )
+        .annotate(day=TruncDate('appointment_time'), hour=ExtractHour('appointment_time'))
+        .values(*group_by, 'hour')
+        .annotate(expires_at=Min('expires_at'))
+        .order_by()
+    )
+
+
+def _timeout(rows) -> int:
+    """Cache lifetime of a result: until its first unpaid hold expires."""
+    expiries = [row['expires_at'] for row in rows if row['expires_at'] is not None]
+    if not expiries:
+        return settings.AVAILABILITY_CACHE_TIMEOUT
+    seconds = int((min(expiries) - timezone.now()).total_seconds()) + 1
+    return max(1, min(seconds, settings.AVAILABILITY_CACHE_TIMEOUT))
+
+
+def _build_day(provider_id: int, day):
+    start, end = _day_bounds(day)
+    rows = list(_held_slots(provider_id, start, end))
+
+    bitmap = 0
+    for row in rows:
+        index = HOUR_INDEX.get(row['hour'])
+        if index is not None:
+            bitmap |= 1 << index
+    return bitmap, _timeout(rows)
+
+
+def build_day_bitmap(provider_id: int, day) -> int:
+    """
+    Compute the occupancy bitmap for a provider and day from the database.
+
+    Args:
+        provider_id: Primary key of the healthcare provider
+        day: Local date to inspect
+
+    Returns:
+        Integer bitmap with one bit per time slot
+    """
+    return _build_day(provider_id, day)[0]
+
+
+def get_day_bitmap(provider_id: int, day) -> int:
+    """Return the cached occupancy bitmap, building it on a miss."""
+    key = _cache_key(provider_id, day)
+    bitmap = cache.get(key)
+    if bitmap is None:
+        bitmap, timeout = _build_day(provider_id, day)
+        cache.set(key, bitmap, timeout)
+    return bitmap
+
+
+def _build_month(provider_id: int, year: int, month: int):
+    days_in_month = calendar.monthrange(year, month)[1]
+    start, _ = _day_bounds(date(year, month, 1))
+    end, _ = _day_bounds(date(year, month, days_in_month) + timedelta(days=1))
+    rows = list(_held_slots(provider_id, start, end, 'day'))
+
+    bitmaps = [0] * days_in_month
+    for row in rows:
+        index = HOUR_INDEX.get(row['hour'])
+        if index is not None:
+            bitmaps[row['day'].day - 1] |= 1 << index
+    return bitmaps, _timeout(rows)
+
+
+def build_month_bitmaps(provider_id: int, year: int, month: int) -> list:
+    """
+    Compute the occupancy bitmaps of every day of a month from the database.
+
+    Args:
+        provider_id: Primary key of the healthcare provider
+        year: Year of the month
+        month: Month number, 1-12
+
+    Returns:
+        List of integer bitmaps, one per day of the month in order
+    """
+    return _build_month(provider_id, year, month)[0]
+
+
+def get_month_bitmaps(provider_id: int, year: int, month: int) -> list:
+    """Return the cached bitmaps of a month, building them on a miss."""
+    key = _month_cache_key(provider_id, year, month)
+    bitmaps = cache.get(key)
+    if bitmaps is None:
+        bitmaps, timeout = _build_month(provider_id, year, month)
+        cache.set(key, bitmaps, timeout)
+    return bitmaps
+
+
+def is_slot_booked(bitmap: int, slot_value: str) -> bool:
+    """Check whether ``slot_value`` ("HH:MM") is set in ``bitmap``."""
+    index = SLOT_INDEX.get(slot_value)
+    return index is not None and bool(bitmap >> index & 1)
+
+
+def booked_slots(bitmap: int) -> list:
+    """Return the slot values set in ``bitmap``."""
+    return [value for value, index in SLOT_INDEX.items() if bitmap >> index & 1]
+
+
+def invalidate(provider_id: int, appointment_time) -> None:
+    """Drop the cached day and month bitmaps covering ``appointment_time``."""
+    if not provider_id or appointment_time is None:
+        return
+    day = timezone.localtime(appointment_time).date()
+    cache.delete_many([
+        _cache_key(provider_id, day),
+        _month_cache_key(provider_id, day.year, day.month),
+    ])
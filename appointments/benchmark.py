@@ -0,0 +1,97 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Seeded rows use the ``BENCHMARK_EMAIL_DOMAIN`` so they can be told apart
+from real bookings and removed once a run is finished.
+"""
+
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Appointment, Provider
+
+
+BENCHMARK_EMAIL_DOMAIN = 'bench.invalid'
+
+BENCHMARK_PROVIDERS = [
+    'Dr. Smith', 'Dr. Jones', 'Dr. Patel', 'Dr. Garcia', 'Dr. Chen',
+    'Dr. Okafor', 'Dr. Novak', 'Dr. Rossi', 'Dr. Kim', 'Dr. Silva',
+]
+
+
+def seed_providers(using: str = 'default') -> list:
+    """Create the ``BENCHMARK_PROVIDERS`` if missing and return their ids."""
+    ids = []
+    for name in BENCHMARK_PROVIDERS:
+        provider, _created = Provider.objects.using(using).get_or_create(
+            normalized_name=Provider.normalize(name), defaults={'name': name},
+        )
+        ids.append(provider.pk)
+    return ids
+
+
+def seed_appointments(count: int, batch_size: int = 5000, using: str = 'default') -> int:
+    """
+    Insert ``count`` synthetic appointments with ``bulk_create``.
+
+    Args:
+        count: Number of rows to create
+        batch_size: Rows per INSERT statement
+        using: Database alias to write to
+
+    Returns:
+        Number of rows created
+    """
+    run_id = uuid.uuid4().hex[:8]
+    provider_ids = seed_providers(using)
+    start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=365)
+    created = 0
+
+    while created < count:
+        batch = []
+        for i in range(created, min(created + batch_size, count)):
+            paid = random.random() < 0.7
+            batch.append(Appointment(
+                provider_id=random.choice(provider_ids),
+                client_email=f'client{i}@{BENCHMARK_EMAIL_DOMAIN}',
+                appointment_time=start + timedelta(hours=random.randint(0, 24 * 730)),
+                is_paid=paid,
+                payment_intent_id=f'pi_bench_{run_id}_{i}' if paid or i % 2 else None,
+            ))
+        Appointment.objects.using(using).bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+
+    return created
+
+
+def delete_seeded_appointments(using: str = 'default') -> int:
+    """Remove rows created by ``seed_appointments``."""
+    deleted, _ = Appointment.objects.using(using).filter(
+        client_email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}'
+    ).delete()
+    return deleted
+
+
+def time_callable(func, repeat: int = 5) -> dict:
+    """
+    Call ``func`` ``repeat`` times and summarise the wall-clock timings.
+
+    Returns:
+        Dict with min, median and max durations in milliseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+    }
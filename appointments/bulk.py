@@ -0,0 +1,271 @@
+"""
+Streaming import and export of appointments.
+
+Used by the import/export management commands and the admin CSV export.
+Rows are read and written one at a time and processed in fixed-size
+batches, so memory use does not grow with the file. Both CSV (with a
+header row) and JSON Lines are supported, using the columns in ``FIELDS``.
+
+Imported rows are checked with the same rules as ``AppointmentForm``: a
+valid email, a known time slot, a future time (unless importing history)
+and a slot the provider has not already booked.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import availability, caching, holds, providers
+from .forms import TIME_SLOT_CHOICES, validate_future
+from .models import Appointment, Provider
+
+
+FIELDS = ['provider_name', 'client_email', 'appointment_time', 'is_paid', 'payment_intent_id']
+FORMATS = ('csv', 'jsonl')
+
+# Export columns read from the database, in the order of FIELDS
+EXPORT_COLUMNS = ['provider__name', 'client_email', 'appointment_time', 'is_paid', 'payment_intent_id']
+
+SLOT_VALUES = {value for value, _label in TIME_SLOT_CHOICES}
+TRUE_VALUES = {'1', 'true', 'yes', 't', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'f', 'n', ''}
+
+
+class RowError(Exception):
+    """A row that cannot be imported, with its 1-based line number."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def detect_format(path: str) -> str:
+    """Guess the file format from its extension, defaulting to CSV."""
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt: str):
+    """
+    Yield ``(line number, row)`` pairs from a CSV or JSONL stream.
+
+    ``row`` is a dict, or a RowError for a JSONL line that is not a JSON
+    object, so one bad line does not end the import.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            row = RowError(line, f'invalid JSON ({e})')
+        if not isinstance(row, (dict, RowError)):
+            row = RowError(line, 'expected a JSON object')
+        yield line, row
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else '').strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValidationError(f'invalid boolean {value!r}')
+
+
+def _parse_time(value):
+    appointment_time = parse_datetime(str(value or '').strip())
+    if appointment_time is None:
+        raise ValidationError(f'invalid appointment_time {value!r}')
+    if timezone.is_naive(appointment_time):
+        appointment_time = timezone.make_aware(appointment_time)
+    return appointment_time
+
+
+def build_appointment(line: int, row: dict, allow_past: bool = False) -> Appointment:
+    """
+    Validate one row and turn it into an unsaved Appointment.
+
+    Args:
+        line: Line number, for error messages
+        row: Mapping with the keys in ``FIELDS``
+        allow_past: Accept appointment times in the past (historical data)
+
+    Returns:
+        Unsaved Appointment, with the provider name kept in ``provider_name``
+        until ``import_batch`` resolves it to a provider
+
+    Raises:
+        RowError: If the row breaks any booking rule
+    """
+    try:
+        provider_name = str(row.get('provider_name') or '').strip()
+        if not provider_name:
+            raise ValidationError('provider_name is required')
+        max_length = Provider._meta.get_field('name').max_length
+        if len(provider_name) > max_length:
+            raise ValidationError(f'provider_name is longer than {max_length} characters')
+
+        client_email = str(row.get('client_email') or '').strip()
+        validate_email(client_email)
+
+        appointment_time = _parse_time(row.get('appointment_time'))
+        local_time = timezone.localtime(appointment_time)
+        if local_time.strftime('%H:%M') not in SLOT_VALUES or local_time.second or local_time.microsecond:
+            raise ValidationError(f'{local_time:%H:%M:%S} is not a bookable time slot')
+        if not allow_past:
+            validate_future(appointment_time)
+
+        appointment = Appointment(
+            client_email=client_email,
+            appointment_time=appointment_time,
+            is_paid=_parse_bool(row.get('is_paid')),
+            payment_intent_id=str(row.get('payment_intent_id') or '').strip() or None,
+        )
+        appointment.provider_name = provider_name
+        return appointment
+    except ValidationError as e:
+        raise RowError(line, '; '.join(e.messages))
+
+
+def _booked(appointments) -> set:
+    """Return the (provider, time) pairs of ``appointments`` already in the database."""
+    booked = Appointment.objects.filter(
+        provider_id__in={a.provider_id for a in appointments},
+        appointment_time__in={a.appointment_time for a in appointments},
+    ).values_list('provider_id', 'appointment_time')
+    return set(booked)
+
+
+def import_batch(numbered, allow_past: bool = False):
+    """
+    Validate and insert one batch of rows in a single transaction.
+
+    Slots taken in the database or earlier in the same batch are rejected;
+    earlier batches are already committed, so they are covered by the
+    database check.
+
+    Args:
+        numbered: List of ``(line number, row)`` pairs from ``read_rows``
+        allow_past: Accept appointment times in the past
+
+    Returns:
+        Tuple of (rows created, list of RowError for skipped rows)
+
+    Raises:
+        IntegrityError: If a payment_intent_id is already taken, or a slot
+            was booked since it was checked
+    """
+    errors = []
+    candidates = []
+    for line, row in numbered:
+        if isinstance(row, RowError):
+            errors.append(row)
+            continue
+        try:
+            candidates.append((line, build_appointment(line, row, allow_past)))
+        except RowError as e:
+            errors.append(e)
+
+    if not candidates:
+        return 0, errors
+
+    # One lookup for the whole batch; unknown providers are created
+    provider_ids = providers.resolve_providers({a.provider_name for _line, a in candidates})
+    for _line, appointment in candidates:
+        appointment.provider_id = provider_ids[appointment.provider_name]
+
+    taken = _booked([appointment for _line, appointment in candidates])
+    appointments = []
+    for line, appointment in candidates:
+        slot = (appointment.provider_id, appointment.appointment_time)
+        if slot in taken:
+            errors.append(RowError(line, 'time slot is already booked'))
+            continue
+        taken.add(slot)
+        appointments.append(appointment)
+
+    if not appointments:
+        return 0, errors
+
+    with transaction.atomic():
+        Appointment.objects.bulk_create(appointments)
+        holds.hold_imported(appointments)
+
+    # bulk_create sends no signals, so drop the caches the rows affect
+    days = {
+        (a.provider_id, timezone.localtime(a.appointment_time).date()): a.appointment_time
+        for a in appointments
+    }
+    for (provider_id, _day), appointment_time in days.items():
+        availability.invalidate(provider_id, appointment_time)
+    caching.invalidate(*{provider_id for provider_id, _day in days})
+
+    return len(appointments), errors
+
+
+def batched(iterable, size: int):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def export_rows(queryset, chunk_size: int = 2000):
+    """Yield one dict per appointment, streaming from the database."""
+    rows = queryset.order_by('id').values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    for values in rows:
+        row = dict(zip(FIELDS, values))
+        row['appointment_time'] = row['appointment_time'].isoformat()
+        yield row
+
+
+class Echo:
+    """File-like object whose ``write`` hands back what it was given."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Yield CSV text one line at a time, header first.
+
+    Lets ``StreamingHttpResponse`` send each row as soon as it is read.
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_rows(stream, rows, fmt: str) -> int:
+    """
+    Write rows to ``stream`` as CSV or JSONL.
+
+    Returns:
+        Number of rows written
+    """
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+    else:
+        for count, row in enumerate(rows, start=1):
+            stream.write(json.dumps(row) + '\n')
+    return count
@@ -0,0 +1,171 @@
+"""
+Versioned cache for the appointment list.
+
+List pages and list state (paid/pending counters and the conditional GET
+validators, see ``appointments.conditional``) are cached under keys that
+embed a version number: one global version for the unfiltered list and one
+per provider for provider-scoped lists. Writes never delete entries, they bump
+the versions (see ``appointments.signals``), so every later read misses and
+stale entries simply expire. ``invalidate_all`` bumps an epoch shared by
+every key, for bulk writes that bypass the signals.
+
+Entries are computed where the view reads from, usually a replica, except
+for ``DB_REPLICA_PIN_SECONDS`` after a write: a version bumped by a write
+must not be filled with rows from before it by a replica that has not
+caught up, because visitors pinned to the primary would then be served
+them. Misses in that window are computed from the primary.
+
+Hits and misses are counted in the cache itself so they are shared by all
+workers; ``python manage.py cache_stats`` prints them.
+"""
+
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+
+from sofia_health.routers import primary_reads
+
+
+EPOCH_KEY = 'appointments:epoch'
+GLOBAL_VERSION_KEY = 'appointments:version'
+STATS_KEY_PREFIX = 'appointments:stats'
+# Present while replicas may still lag behind the last write
+RECENT_WRITE_KEY = 'appointments:recent_write'
+
+# Kinds of cached entries, for the hit/miss counters
+KINDS = ('page', 'state')
+OUTCOMES = ('hits', 'misses')
+
+
+def _provider_version_key(provider_id: int) -> str:
+    return f'{GLOBAL_VERSION_KEY}:{provider_id}'
+
+
+def _get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1, so a version that was evicted
+        # can never come back at a value older entries were stored under
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def scoped_key(kind: str, provider_id: int = None, *parts) -> str:
+    """
+    Build the current versioned key for a cached entry.
+
+    Args:
+        kind: Entry kind, one of ``KINDS``
+        provider_id: Provider the entry is scoped to, or None for the
+            unfiltered list
+        *parts: Further values identifying the entry (page size, cursors)
+
+    Returns:
+        Cache key embedding the current epoch and scope version
+    """
+    epoch = _get_version(EPOCH_KEY)
+    if provider_id:
+        scope = provider_id
+        version = _get_version(_provider_version_key(provider_id))
+    else:
+        scope = 'all'
+        version = _get_version(GLOBAL_VERSION_KEY)
+    # Parts can come from the query string; hash them to keep keys short and safe
+    suffix = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'appointments:{kind}:{epoch}:{scope}:{version}:{suffix}'
+
+
+def get_or_set(kind: str, key: str, compute):
+    """
+    Return the cached value for ``key``, computing and storing it on a miss.
+
+    Args:
+        kind: Entry kind, used for the hit/miss counters
+        key: Key from ``scoped_key``
+        compute: Zero-argument callable producing the value
+
+    Returns:
+        The cached or freshly computed value
+    """
+    value = cache.get(key)
+    if value is not None:
+        _record(kind, 'hits')
+        return value
+
+    _record(kind, 'misses')
+    with primary_reads() if cache.get(RECENT_WRITE_KEY) else nullcontext():
+        value = compute()
+    cache.set(key, value, settings.APPOINTMENT_LIST_CACHE_TIMEOUT)
+    return value
+
+
+def _mark_write() -> None:
+    # Set before bumping, so whoever reads a new version also finds the mark
+    cache.set(RECENT_WRITE_KEY, True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def invalidate(*provider_ids) -> None:
+    """Bump the global version and those of the given providers."""
+    _mark_write()
+    _bump(GLOBAL_VERSION_KEY)
+    for provider_id in set(provider_ids):
+        if provider_id:
+            _bump(_provider_version_key(provider_id))
+
+
+def invalidate_all() -> None:
+    """Retire every cached list entry, e.g. after a bulk write."""
+    _mark_write()
+    _bump(EPOCH_KEY)
+
+
+def _stats_key(kind: str, outcome: str) -> str:
+    return f'{STATS_KEY_PREFIX}:{kind}:{outcome}'
+
+
+def _record(kind: str, outcome: str) -> None:
+    key = _stats_key(kind, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_stats() -> dict:
+    """
+    Return the hit/miss counters.
+
+    Returns:
+        Dict mapping each kind to its hits, misses and hit ratio
+    """
+    values = cache.get_many([_stats_key(kind, outcome) for kind in KINDS for outcome in OUTCOMES])
+
+    stats = {}
+    for kind in KINDS:
+        hits = values.get(_stats_key(kind, 'hits'), 0)
+        misses = values.get(_stats_key(kind, 'misses'), 0)
+        total = hits + misses
+        stats[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+    return stats
+
+
+def reset_stats() -> None:
+    """Zero the hit/miss counters."""
+    cache.delete_many([_stats_key(kind, outcome) for kind in KINDS for outcome in OUTCOMES])
@@ -0,0 +1,116 @@
+"""
+Conditional GET for list pages and endpoints.
+
+What a list URL shows is determined by the rows it can show, so ``list_state``
+summarises them in one aggregate: the newest ``updated_at`` and the row
+count (an insert or edit moves the first, a delete the second). Rows show
+their provider's name, so the newest provider ``updated_at`` counts
+towards the first too: renaming a provider changes it. The ETag
+built from that state, plus anything else the response depends on, lets
+``not_modified`` answer a revalidation with 304 before the page is fetched
+or rendered. ``set_validators`` adds ETag, Last-Modified and ``Cache-Control:
+private, no-cache`` to full responses, so browsers revalidate on every
+visit instead of showing a copy they guessed was still fresh.
+
+The ETag also covers the project's templates and stylesheet, so a deploy
+that changes the markup is not answered with 304 from an older page.
+"""
+
+import functools
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Provider
+
+
+def list_state(queryset, **aggregates) -> dict:
+    """
+    Aggregate the validators of a list, plus any other aggregates, in one query.
+
+    Args:
+        queryset: Rows the list can show
+        **aggregates: Further aggregates to compute in the same query
+
+    Returns:
+        Dict with ``last_modified`` (newest updated_at of the rows or of any
+        provider, or None without rows), ``row_count`` and the extra aggregates
+    """
+    provider_modified = Provider.objects.order_by('-updated_at').values('updated_at')[:1]
+    state = queryset.aggregate(
+        last_modified=Max('updated_at'),
+        provider_modified=Max(Subquery(provider_modified)),
+        row_count=Count('id'),
+        **aggregates,
+    )
+    provider_modified = state.pop('provider_modified')
+    if state['last_modified'] and provider_modified:
+        state['last_modified'] = max(state['last_modified'], provider_modified)
+    return state
+
+
+@functools.lru_cache(maxsize=None)
+def _code_digest() -> str:
+    """Digest of the template sources and built stylesheet, read once per process."""
+    digest = hashlib.md5()
+    paths = [Path(settings.TAILWIND_OUTPUT)]
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        paths.extend(sorted(Path(directory).rglob('*.html')))
+    for path in paths:
+        if path.is_file():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def make_etag(state: dict, *parts) -> str:
+    """
+    Build the ETag of a list response.
+
+    Args:
+        state: Result of ``list_state``
+        *parts: Other values the response depends on (e.g. a provider name)
+
+    Returns:
+        Quoted ETag
+    """
+    last_modified = state['last_modified']
+    raw = ':'.join(str(part) for part in (
+        _code_digest(),
+        last_modified.isoformat() if last_modified else '',
+        state['row_count'],
+        *parts,
+    ))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def not_modified(request, etag: str, state: dict):
+    """
+    Return a 304 response if the client's copy is current, else None.
+
+    A visitor with flash messages waiting gets the full page, which shows them.
+    """
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None
+    last_modified = state['last_modified']
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, state)
+    return response
+
+
+def set_validators(response, etag: str, state: dict):
+    """Add the validators and revalidation headers to a list response."""
+    response['ETag'] = etag
+    if state['last_modified']:
+        response['Last-Modified'] = http_date(state['last_modified'].timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
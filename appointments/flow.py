@@ -0,0 +1,116 @@
+"""
+Booking flow state carried between requests.
+
+The booking pages need to know which appointment the visitor is paying
+for (stage ``PENDING``) and which one they have just booked (stage
+``COMPLETED``). With ``BOOKING_FLOW_MODE = 'session'`` (the default) the
+IDs are kept in ``request.session``, which with the database session
+backend costs a session-table read and write on each step.
+
+With ``BOOKING_FLOW_MODE = 'token'`` they travel in a cookie instead,
+holding a token signed with ``django.core.signing`` that carries the
+appointment ID and the stage. It expires after
+``BOOKING_FLOW_TOKEN_MAX_AGE`` seconds, and the booking path never
+touches the session.
+"""
+
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+
+
+PENDING = 'pending'
+COMPLETED = 'completed'
+
+SESSION_KEYS = {
+    PENDING: 'pending_appointment_id',
+    COMPLETED: 'completed_appointment_id',
+}
+
+COOKIE_NAME = 'booking_flow'
+SALT = 'appointments.flow'
+
+
+def token_mode() -> bool:
+    return settings.BOOKING_FLOW_MODE == 'token'
+
+
+def make_token(appointment_id: int, stage: str) -> str:
+    """Sign an appointment ID together with its flow stage."""
+    return signing.dumps({'id': appointment_id, 'stage': stage}, salt=SALT, compress=True)
+
+
+def read_token(token: Optional[str], stage: str) -> Optional[int]:
+    """
+    Return the appointment ID from a token issued for ``stage``.
+
+    Returns:
+        The appointment ID, or None if the token is missing, tampered
+        with, expired or issued for another stage
+    """
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=SALT, max_age=settings.BOOKING_FLOW_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return data['id'] if data.get('stage') == stage else None
+
+
+def _set_cookie(request, response, appointment_id: int, stage: str):
+    response.set_cookie(
+        COOKIE_NAME,
+        make_token(appointment_id, stage),
+        max_age=settings.BOOKING_FLOW_TOKEN_MAX_AGE,
+        secure=request.is_secure(),
+        httponly=True,
+        samesite='Lax',
+    )
+
+
+def remember(request, response, stage: str, appointment_id: int):
+    """Record ``appointment_id`` as the visitor's appointment at ``stage``."""
+    if token_mode():
+        # One cookie for the whole flow: a later stage replaces the earlier one
+        _set_cookie(request, response, appointment_id, stage)
+    else:
+        request.session[SESSION_KEYS[stage]] = appointment_id
+
+
+async def aremember(request, response, stage: str, appointment_id: int):
+    """Async version of ``remember``."""
+    if token_mode():
+        _set_cookie(request, response, appointment_id, stage)
+    else:
+        await request.session.aset(SESSION_KEYS[stage], appointment_id)
+
+
+def recall(request, stage: str) -> Optional[int]:
+    """Return the visitor's appointment ID at ``stage``, or None."""
+    if token_mode():
+        return read_token(request.COOKIES.get(COOKIE_NAME), stage)
+    return request.session.get(SESSION_KEYS[stage])
+
+
+async def arecall(request, stage: str) -> Optional[int]:
+    """Async version of ``recall``."""
+    if token_mode():
+        return read_token(request.COOKIES.get(COOKIE_NAME), stage)
+    return await request.session.aget(SESSION_KEYS[stage])
+
+
+def forget(request, response, stage: str):
+    """Drop the visitor's appointment at ``stage``."""
+    if token_mode():
+        response.delete_cookie(COOKIE_NAME, samesite='Lax')
+    else:
+        request.session.pop(SESSION_KEYS[stage], None)
+
+
+async def aforget(request, response, stage: str):
+    """Async version of ``forget``."""
+    if token_mode():
+        response.delete_cookie(COOKIE_NAME, samesite='Lax')
+    else:
+        await request.session.apop(SESSION_KEYS[stage], None)
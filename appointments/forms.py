@@ -1,4 +1,7 @@
+from datetime import datetime, time
+
 from django import forms
+from django.utils import timezone
 from .models import Appointment
 
 
@@ -22,6 +25,34 @@ TIME_SLOT_CHOICES = [
 ]
 
 
+def slot_datetime(appointment_date, time_slot):
+    """Combine a date and a time slot ("HH:MM") into an aware datetime."""
+    hour, minute = map(int, time_slot.split(':'))
+    return timezone.make_aware(datetime.combine(appointment_date, time(hour, minute)))
+
+
+def validate_future(appointment_datetime):
+    """Reject appointment times that are not in the future."""
+    if appointment_datetime <= timezone.now():
+        raise forms.ValidationError(
+            "Appointment must be in the future."
+        )
+
+
+class SlotSelect(forms.Select):
+    """Select widget that renders already-booked slots as disabled options."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.booked = set()
+
+    def create_option(self, name, value, *args, **kwargs):
+        option = super().create_option(name, value, *args, **kwargs)
+        if value in self.booked:
+            option['attrs']['disabled'] = True
+        return option
+
+
 class AppointmentForm(forms.ModelForm):
     """Form for creating appointments."""
 
@@ -35,7 +66,7 @@ class AppointmentForm(forms.ModelForm):
 
     appointment_time_slot = forms.ChoiceField(
         choices=TIME_SLOT_CHOICES,
-        widget=forms.Select(attrs={
+        widget=SlotSelect(attrs={
             'class': 'form-control'
         }),
         label='Time Slot'
@@ -43,11 +74,10 @@ class AppointmentForm(forms.ModelForm):
 
     class Meta:
         model = Appointment
-        fields = ['provider_name', 'client_email']
+        fields = ['provider', 'client_email']
         widgets = {
-            'provider_name': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Enter provider name'
+            'provider': forms.Select(attrs={
+                'class': 'form-control'
             }),
             'client_email': forms.EmailInput(attrs={
                 'class': 'form-control',
@@ -55,35 +85,69 @@ class AppointmentForm(forms.ModelForm):
             }),
         }
         labels = {
-            'provider_name': 'Provider Name',
+            'provider': 'Provider',
             'client_email': 'Your Email',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.booked_bitmap = 0
+
+        # Render the options from the cached provider list instead of a query
+        from .providers import get_provider_choices
+
+        self.fields['provider'].choices = [('', 'Select a provider'), *get_provider_choices()]
+
+        # When provider and date are known up front, hide taken slots
+        source = self.data if self.is_bound else self.initial
+        provider_id = source.get('provider')
+        appointment_date = source.get('appointment_date')
+        if provider_id and appointment_date:
+            try:
+                provider_id = int(getattr(provider_id, 'pk', provider_id))
+                appointment_date = self.fields['appointment_date'].to_python(appointment_date)
+            except (TypeError, ValueError, forms.ValidationError):
+                return
+            self.load_availability(provider_id, appointment_date)
+
+    def load_availability(self, provider_id, appointment_date):
+        """Load the occupancy bitmap and mark booked slots on the widget."""
+        from . import availability
+
+        self.booked_bitmap = availability.get_day_bitmap(provider_id, appointment_date)
+        widget = self.fields['appointment_time_slot'].widget
+        widget.booked = set(availability.booked_slots(self.booked_bitmap))
+
+    @property
+    def slot_options(self):
+        """Time slots with their booked state, for rendering the slot grid."""
+        booked = self.fields['appointment_time_slot'].widget.booked
+        return [
+            {'value': value, 'label': label, 'booked': value in booked}
+            for value, label in TIME_SLOT_CHOICES
+        ]
+
     def clean(self):
         """Validate appointment date and time."""
-        from django.utils import timezone
-        from datetime import datetime, time
-
         cleaned_data = super().clean()
         appointment_date = cleaned_data.get('appointment_date')
         time_slot = cleaned_data.get('appointment_time_slot')
 
         if appointment_date and time_slot:
-            # Parse time slot (format: "HH:MM")
-            hour, minute = map(int, time_slot.split(':'))
-            appointment_datetime = datetime.combine(
-                appointment_date,
-                time(hour, minute)
-            )
-
-            # Make timezone aware
-            appointment_datetime = timezone.make_aware(appointment_datetime)
-
-            # Validate future datetime
-            if appointment_datetime <= timezone.now():
-                raise forms.ValidationError(
-                    "Appointment must be in the future."
-                )
+            appointment_datetime = slot_datetime(appointment_date, time_slot)
+            validate_future(appointment_datetime)
+
+            # Reject slots the provider already has booked
+            provider = cleaned_data.get('provider')
+            if provider:
+                from . import availability
+
+                bitmap = availability.get_day_bitmap(provider.pk, appointment_date)
+                if availability.is_slot_booked(bitmap, time_slot):
+                    self.add_error(
+                        'appointment_time_slot',
+                        "This time slot is already booked. Please choose another."
+                    )
 
             # Store combined datetime
             cleaned_data['appointment_time'] = appointment_datetime
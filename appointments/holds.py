@@ -0,0 +1,139 @@
+"""
+Slot holds: which booking owns a provider's time slot.
+
+Every booking inserts a ``SlotHold`` for its slot in the same transaction
+as the appointment, and the unique constraint on (provider, time) lets
+exactly one insert win however many bookings race past the form's
+availability check; the others roll back with ``SlotTaken``. Bookings of
+different slots touch different index entries and never wait on each other.
+
+An unpaid booking holds its slot for ``SLOT_HOLD_SECONDS``. Once that
+passes, availability no longer counts the slot as taken, and the next
+booking of it deletes the expired hold and takes its place. Payment
+makes the hold permanent (``expires_at`` is cleared).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, SlotHold, SlotTaken
+
+
+logger = logging.getLogger(__name__)
+
+
+def active(now=None) -> Q:
+    """Filter for holds that still own their slot."""
+    return Q(expires_at__isnull=True) | Q(expires_at__gt=now or timezone.now())
+
+
+def hold_slot(appointment, created: bool = False) -> SlotHold:
+    """
+    Hold the appointment's slot, releasing an expired hold of another booking.
+
+    Call inside the transaction that saves the appointment, so a lost race
+    rolls the appointment back too.
+
+    Args:
+        appointment: Saved appointment
+        created: The appointment was just inserted and has no hold yet
+
+    Returns:
+        The appointment's hold
+
+    Raises:
+        SlotTaken: If another booking holds the slot
+    """
+    now = timezone.now()
+    slot = {'provider_id': appointment.provider_id, 'appointment_time': appointment.appointment_time}
+    expires_at = None if appointment.is_paid else now + timedelta(seconds=settings.SLOT_HOLD_SECONDS)
+
+    def take():
+        with transaction.atomic():
+            if created or not SlotHold.objects.filter(appointment=appointment).update(expires_at=expires_at, **slot):
+                return SlotHold.objects.create(appointment=appointment, expires_at=expires_at, **slot)
+            return SlotHold(appointment=appointment, expires_at=expires_at, **slot)
+
+    try:
+        return take()
+    except IntegrityError as e:
+        # Only clear the slot when it is contended, which keeps the common
+        # case to a single insert
+        if not SlotHold.objects.filter(expires_at__lte=now, **slot).delete()[0]:
+            raise SlotTaken('This time slot is already booked.') from e
+    try:
+        return take()
+    except IntegrityError as e:
+        raise SlotTaken('This time slot is already booked.') from e
+
+
+def keep_slots(appointment_ids) -> int:
+    """
+    Make the holds of paid appointments permanent.
+
+    A hold that expired and was released is taken again if the slot is
+    still free; if another booking has it, the clash is logged for staff.
+
+    Returns:
+        Number of appointments that hold their slot
+    """
+    appointment_ids = set(appointment_ids)
+    kept = SlotHold.objects.filter(appointment_id__in=appointment_ids).update(expires_at=None)
+    if kept == len(appointment_ids):
+        return kept
+
+    held = set(SlotHold.objects.filter(appointment_id__in=appointment_ids).values_list('appointment_id', flat=True))
+    for appointment in Appointment.objects.filter(pk__in=appointment_ids - held):
+        try:
+            hold_slot(appointment, created=True)
+        except SlotTaken:
+            logger.error(
+                "Appointment %s was paid after its hold expired and its slot was booked again",
+                appointment.pk,
+            )
+        else:
+            kept += 1
+            # The slot was shown free once the hold expired
+            from . import availability
+
+            availability.invalidate(appointment.provider_id, appointment.appointment_time)
+    return kept
+
+
+def hold_imported(appointments) -> None:
+    """
+    Hold the slots of appointments inserted with ``bulk_create``.
+
+    Raises:
+        IntegrityError: If a slot was booked since the import checked it
+    """
+    now = timezone.now()
+    missing = [a for a in appointments if a.pk is None]
+    if missing:
+        # Backends that return no ids from bulk_create (MySQL): the import
+        # checked these slots were free, so each is the only row on its slot
+        ids = dict(
+            ((provider_id, appointment_time), pk)
+            for pk, provider_id, appointment_time in Appointment.objects.filter(
+                provider_id__in={a.provider_id for a in missing},
+                appointment_time__in={a.appointment_time for a in missing},
+                slot_hold__isnull=True,
+            ).values_list('id', 'provider_id', 'appointment_time')
+        )
+        for appointment in missing:
+            appointment.pk = ids[(appointment.provider_id, appointment.appointment_time)]
+
+    SlotHold.objects.bulk_create([
+        SlotHold(
+            appointment_id=appointment.pk,
+            provider_id=appointment.provider_id,
+            appointment_time=appointment.appointment_time,
+            expires_at=None if appointment.is_paid else now + timedelta(seconds=settings.SLOT_HOLD_SECONDS),
+        )
+        for appointment in appointments
+    ])
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from appointments.benchmark import (
+    BENCHMARK_EMAIL_DOMAIN,
+    BENCHMARK_PROVIDERS,
+    seed_appointments,
+    time_callable,
+)
+from appointments.models import Appointment
+from payments.loadtest import scratch_database
+
+
+CHANGELIST_URL = '/admin/appointments/appointment/'
+BENCHMARK_USERNAME = 'benchmark-admin'
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic appointments into a scratch database and time the '
+        'admin changelist for common views: first and deep pages, searches, '
+        'filters and date drill-down.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Number of appointments to seed (default: 1000000)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed loads per view (default: 5)')
+
+    def handle(self, *args, **options):
+        # Seeded rows and the benchmark user go away with the scratch database
+        with scratch_database():
+            self.stdout.write(f"Seeding {options['rows']} appointments...")
+            seed_appointments(options['rows'])
+
+            user = get_user_model().objects.create_superuser(BENCHMARK_USERNAME)
+            client = Client()
+            client.force_login(user)
+
+            self.stdout.write(f'Backend: {connection.vendor}')
+            for label, params in self.get_views():
+                self.report(client, label, params, options['repeat'])
+
+    def get_views(self):
+        """Return (label, query parameters) pairs for the changelist."""
+        sample = Appointment.objects.exclude(payment_intent_id=None).values_list(
+            'payment_intent_id', 'appointment_time'
+        ).first()
+        year = sample[1].year if sample else 2025
+
+        return [
+            ('first page', {}),
+            ('page 100', {'p': 100}),
+            ('search: exact email', {'q': f'client1@{BENCHMARK_EMAIL_DOMAIN}'}),
+            ('search: payment intent', {'q': sample[0] if sample else 'pi_missing'}),
+            ('search: provider prefix', {'q': BENCHMARK_PROVIDERS[0][:6]}),
+            ('filter: paid', {'is_paid__exact': 1}),
+            ('date hierarchy: year', {'appointment_time__year': year}),
+            ('date hierarchy: month', {'appointment_time__year': year, 'appointment_time__month': 6}),
+        ]
+
+    def report(self, client, label, params, repeat):
+        """Print status, query count and timings for one changelist view."""
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(CHANGELIST_URL, params)
+        # Read before the next request resets the query log
+        queries = captured.captured_queries
+        slowest = max((float(query['time']) for query in queries), default=0.0)
+
+        timings = time_callable(lambda: client.get(CHANGELIST_URL, params), repeat=repeat)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f'  HTTP {response.status_code}, {len(queries)} queries, slowest {slowest * 1000:.1f} ms'
+        )
+        self.stdout.write(
+            '  Time: min {min:.2f} ms | median {median:.2f} ms | max {max:.2f} ms'.format(**timings)
+        )
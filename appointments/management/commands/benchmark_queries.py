@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+
+from appointments.benchmark import (
+    BENCHMARK_PROVIDERS,
+    delete_seeded_appointments,
+    seed_appointments,
+    time_callable,
+)
+from appointments.models import Appointment, Provider
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic appointments and print EXPLAIN plans and timings '
+        'for the queries issued by the appointment and payment views.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='Number of appointments to seed (default: 10000)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per query (default: 5)')
+        parser.add_argument('--database', default='default',
+                            help='Database alias to benchmark (default: default)')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Benchmark existing rows without seeding')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded rows after the run')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+
+        if not options['no_seed']:
+            self.stdout.write(f"Seeding {options['rows']} appointments on '{using}'...")
+            seed_appointments(options['rows'], using=using)
+
+        try:
+            self.stdout.write(f'Backend: {connection.vendor}')
+            for label, func in self.get_queries(using):
+                self.report(connection, label, func, options['repeat'])
+        finally:
+            if not options['no_seed'] and not options['keep']:
+                deleted = delete_seeded_appointments(using=using)
+                self.stdout.write(f'Removed {deleted} seeded rows.')
+
+    def get_queries(self, using):
+        """Return (label, callable) pairs mirroring the hot view queries."""
+        appointments = Appointment.objects.using(using)
+        sample = appointments.exclude(payment_intent_id=None).values_list(
+            'payment_intent_id', flat=True
+        ).first()
+        provider = Provider.objects.using(using).filter(name=BENCHMARK_PROVIDERS[0]).first()
+
+        return [
+            ('appointment_list: first page',
+             lambda: list(appointments.order_by('-appointment_time', '-id')[:26])),
+            ('appointment_list: paid/pending counts',
+             lambda: appointments.aggregate(
+                 paid_count=Count('id', filter=Q(is_paid=True)),
+                 pending_count=Count('id', filter=Q(is_paid=False)),
+             )),
+            ('confirm_payment: lookup by payment_intent_id',
+             lambda: list(appointments.filter(payment_intent_id=sample))),
+            ('admin: is_paid filter, newest first',
+             lambda: list(appointments.filter(is_paid=True).order_by('-appointment_time')[:100])),
+            ('provider schedule',
+             lambda: list(appointments.filter(provider=provider).order_by('appointment_time')[:100])),
+        ]
+
+    def report(self, connection, label, func, repeat):
+        """Print the plan and timings for one query."""
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        sql = captured.captured_queries[-1]['sql']
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            plan = '\n'.join('    ' + ' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+        timings = time_callable(func, repeat=repeat)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(f'  SQL: {sql}')
+        self.stdout.write('  Plan:')
+        self.stdout.write(plan)
+        self.stdout.write(
+            '  Time: min {min:.2f} ms | median {median:.2f} ms | max {max:.2f} ms'.format(**timings)
+        )
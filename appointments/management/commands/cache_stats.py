@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from appointments import caching
+
+
+class Command(BaseCommand):
+    help = (
+        'Print hit/miss counters for the appointment list cache. With the '
+        'default local-memory cache only this process is visible; configure '
+        'a shared CACHE_BACKEND to see the web workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        for kind, stats in caching.get_stats().items():
+            self.stdout.write(
+                f"{kind}: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_ratio']:.1%} hit ratio)"
+            )
+
+        if options['reset']:
+            caching.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,53 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from appointments.bulk import FORMATS, detect_format, export_rows, write_rows
+from appointments.models import Appointment, Provider
+
+
+class Command(BaseCommand):
+    help = 'Stream appointments to a CSV or JSONL file without loading them into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' for stdout")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Output format (default: from the file extension, else csv)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time (default: 2000)')
+        parser.add_argument('--provider', help='Only export this provider')
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='Report progress every N rows (default: 100000)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        queryset = Appointment.objects.all()
+        if options['provider']:
+            queryset = queryset.filter(
+                provider__normalized_name=Provider.normalize(options['provider'])
+            )
+
+        # Keep stdout clean for the data when streaming to it
+        log = self.stderr if path == '-' else self.stdout
+        started = time.perf_counter()
+
+        def with_progress(rows):
+            for count, row in enumerate(rows, start=1):
+                yield row
+                if count % options['progress_every'] == 0:
+                    elapsed = time.perf_counter() - started
+                    log.write(f'{count} exported ({count / elapsed:.0f} rows/s)')
+
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            count = write_rows(stream, with_progress(export_rows(queryset, options['chunk_size'])), fmt)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        log.write(self.style.SUCCESS(
+            f'Exported {count} appointments in {time.perf_counter() - started:.1f} s.'
+        ))
@@ -0,0 +1,66 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from appointments.bulk import FORMATS, batched, detect_format, import_batch, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream appointments from a CSV or JSONL file into the database in '
+        'batches, validating each row with the booking form rules.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Input format (default: from the file extension, else csv)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows validated and inserted per transaction (default: 1000)')
+        parser.add_argument('--allow-past', action='store_true',
+                            help='Accept appointments in the past (historical data)')
+        parser.add_argument('--strict', action='store_true',
+                            help='Stop at the first batch with an invalid row')
+        parser.add_argument('--max-reported-errors', type=int, default=20,
+                            help='Invalid rows to print before only counting them (default: 20)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+
+        created = skipped = 0
+        started = time.perf_counter()
+        try:
+            for batch in batched(read_rows(stream, fmt), options['batch_size']):
+                try:
+                    batch_created, errors = import_batch(batch, allow_past=options['allow_past'])
+                except IntegrityError as e:
+                    raise CommandError(
+                        f'Lines {batch[0][0]}-{batch[-1][0]}: {e}. '
+                        f'{created} rows were imported before this batch.'
+                    )
+
+                created += batch_created
+                for error in errors:
+                    if skipped < options['max_reported_errors']:
+                        self.stderr.write(f'Skipped {error}')
+                    skipped += 1
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{created} imported, {skipped} skipped '
+                    f'({created / elapsed if elapsed else 0:.0f} rows/s)'
+                )
+                if errors and options['strict']:
+                    raise CommandError(f'Stopped at invalid rows; {created} rows imported.')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} appointments in {time.perf_counter() - started:.1f} s, '
+            f'skipped {skipped} invalid rows.'
+        ))
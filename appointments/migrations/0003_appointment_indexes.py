@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0002_create_superuser"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="appointment",
+            name="payment_intent_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Stripe PaymentIntent ID",
+                max_length=255,
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["appointment_time", "id"], name="appt_time_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["is_paid", "appointment_time"], name="appt_paid_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["provider_name", "appointment_time"],
+                name="appt_provider_time_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0003_appointment_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["client_email"], name="appt_email_idx"),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0004_appointment_email_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Provider",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Display name of the provider", max_length=255
+                    ),
+                ),
+                (
+                    "normalized_name",
+                    models.CharField(
+                        editable=False,
+                        help_text="Lower-cased name with collapsed whitespace, for de-duplication",
+                        max_length=255,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, help_text="Timestamp when provider was added"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Provider",
+                "verbose_name_plural": "Providers",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="appointment",
+            name="provider",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Healthcare provider",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="appointments",
+                to="appointments.provider",
+            ),
+        ),
+    ]
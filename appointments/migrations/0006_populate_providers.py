@@ -0,0 +1,68 @@
+from django.db import migrations, transaction
+from django.db.models import Count
+
+BATCH_SIZE = 5000
+
+
+def normalize(name):
+    # Same folding as Provider.normalize; models are not importable here
+    return ' '.join(name.split()).casefold()
+
+
+def populate_providers(apps, schema_editor):
+    """
+    Create one Provider per distinct normalized name and point appointments at it.
+
+    The most common spelling of each name becomes the provider's display
+    name. Appointments are updated in batches of primary keys, each in its
+    own transaction, so large tables are not locked for the whole run.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Provider = apps.get_model('appointments', 'Provider')
+
+    spellings = (
+        Appointment.objects.filter(provider__isnull=True)
+        .values('provider_name')
+        .annotate(total=Count('id'))
+        .order_by('-total')
+    )
+
+    provider_ids = {}
+    for row in spellings.iterator():
+        name = row['provider_name']
+        key = normalize(name)
+        if key not in provider_ids:
+            provider, _created = Provider.objects.get_or_create(
+                normalized_name=key,
+                defaults={'name': ' '.join(name.split())},
+            )
+            provider_ids[key] = provider.pk
+
+        pending = Appointment.objects.filter(provider_name=name, provider__isnull=True)
+        while True:
+            with transaction.atomic():
+                pks = list(pending.values_list('pk', flat=True)[:BATCH_SIZE])
+                if not pks:
+                    break
+                Appointment.objects.filter(pk__in=pks).update(provider_id=provider_ids[key])
+
+
+def restore_provider_names(apps, schema_editor):
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Provider = apps.get_model('appointments', 'Provider')
+
+    for provider in Provider.objects.iterator():
+        Appointment.objects.filter(provider=provider).update(provider_name=provider.name)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ("appointments", "0005_provider"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_providers, restore_provider_names),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0006_populate_providers"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="appointment",
+            name="appt_provider_time_idx",
+        ),
+        # A default lets the column be re-added when migrating backwards;
+        # 0006 then fills it in again
+        migrations.AlterField(
+            model_name="appointment",
+            name="provider_name",
+            field=models.CharField(
+                default="", help_text="Name of the healthcare provider", max_length=255
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="appointment",
+            name="provider_name",
+        ),
+        migrations.AlterField(
+            model_name="appointment",
+            name="provider",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Healthcare provider",
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="appointments",
+                to="appointments.provider",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["provider", "appointment_time"],
+                name="appt_provider_time_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0007_remove_appointment_provider_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlotHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "appointment_time",
+                    models.DateTimeField(help_text="Start of the held slot"),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When the hold lapses if the appointment is still unpaid",
+                        null=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, help_text="Timestamp when the slot was taken"
+                    ),
+                ),
+                (
+                    "appointment",
+                    models.OneToOneField(
+                        help_text="Appointment holding the slot",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slot_hold",
+                        to="appointments.appointment",
+                    ),
+                ),
+                (
+                    "provider",
+                    models.ForeignKey(
+                        db_index=False,
+                        help_text="Healthcare provider",
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="slot_holds",
+                        to="appointments.provider",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Slot hold",
+                "verbose_name_plural": "Slot holds",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("provider", "appointment_time"), name="unique_slot_hold"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 5000
+
+
+def hold_booked_slots(apps, schema_editor):
+    """
+    Give every upcoming appointment a hold on its slot.
+
+    Paid appointments hold theirs for good, unpaid ones for a fresh
+    SLOT_HOLD_SECONDS. Where two appointments already share a slot, the
+    paid one (or else the earlier one) keeps it. Past slots cannot be
+    booked any more and get no hold.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    SlotHold = apps.get_model('appointments', 'SlotHold')
+
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.SLOT_HOLD_SECONDS)
+    rows = (
+        Appointment.objects.filter(appointment_time__gte=now)
+        .order_by('-is_paid', 'id')
+        .values_list('id', 'provider_id', 'appointment_time', 'is_paid')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    while batch := list(islice(rows, BATCH_SIZE)):
+        with transaction.atomic():
+            SlotHold.objects.bulk_create([
+                SlotHold(
+                    appointment_id=pk,
+                    provider_id=provider_id,
+                    appointment_time=appointment_time,
+                    expires_at=None if is_paid else expires_at,
+                )
+                for pk, provider_id, appointment_time, is_paid in batch
+            ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ("appointments", "0008_slothold"),
+    ]
+
+    operations = [
+        migrations.RunPython(hold_booked_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0009_hold_booked_slots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="provider",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, help_text="Timestamp when provider was last changed"
+            ),
+        ),
+    ]
@@ -1,14 +1,75 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.validators import EmailValidator
 from django.utils import timezone
 
 
+# Fields that place an appointment in a slot or decide how long it holds it
+HOLD_FIELDS = {'provider', 'provider_id', 'appointment_time', 'is_paid'}
+
+
+class SlotTaken(IntegrityError):
+    """Raised when saving an appointment into a slot another booking holds."""
+
+
+class Provider(models.Model):
+    """
+    Healthcare provider that appointments are booked with.
+
+    Fields:
+        name: Display name of the provider
+        normalized_name: Case- and whitespace-folded name, unique, so the
+            same provider cannot be entered twice with different spelling
+        created_at: Timestamp when the provider was added
+        updated_at: Timestamp when the provider was last changed
+    """
+
+    name = models.CharField(
+        max_length=255,
+        help_text="Display name of the provider"
+    )
+
+    normalized_name = models.CharField(
+        max_length=255,
+        unique=True,
+        editable=False,
+        help_text="Lower-cased name with collapsed whitespace, for de-duplication"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when provider was added"
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Timestamp when provider was last changed"
+    )
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Provider"
+        verbose_name_plural = "Providers"
+
+    @staticmethod
+    def normalize(name):
+        """Fold case and whitespace so spelling variants compare equal."""
+        return ' '.join(name.split()).casefold()
+
+    def save(self, *args, **kwargs):
+        self.name = ' '.join(self.name.split())
+        self.normalized_name = self.normalize(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
 class Appointment(models.Model):
     """
     Appointment model for booking appointments with providers.
 
     Fields:
-        provider_name: Name of the healthcare provider
+        provider: Healthcare provider the appointment is with
         appointment_time: Scheduled date and time for the appointment
         client_email: Email address of the client booking the appointment
         created_at: Timestamp when the appointment was created
@@ -17,9 +78,13 @@ class Appointment(models.Model):
         payment_intent_id: Stripe PaymentIntent ID for tracking payments
     """
 
-    provider_name = models.CharField(
-        max_length=255,
-        help_text="Name of the healthcare provider"
+    provider = models.ForeignKey(
+        Provider,
+        on_delete=models.PROTECT,
+        related_name='appointments',
+        # Covered by the (provider, appointment_time) index below
+        db_index=False,
+        help_text="Healthcare provider"
     )
 
     appointment_time = models.DateTimeField(
@@ -50,6 +115,7 @@ class Appointment(models.Model):
         max_length=255,
         blank=True,
         null=True,
+        unique=True,
         help_text="Stripe PaymentIntent ID"
     )
 
@@ -57,10 +123,117 @@ class Appointment(models.Model):
         ordering = ['-appointment_time']
         verbose_name = "Appointment"
         verbose_name_plural = "Appointments"
+        indexes = [
+            # Keyset pagination and default ordering
+            models.Index(fields=['appointment_time', 'id'], name='appt_time_id_idx'),
+            # Paid/pending filters and counts
+            models.Index(fields=['is_paid', 'appointment_time'], name='appt_paid_time_idx'),
+            # Per-provider schedules
+            models.Index(fields=['provider', 'appointment_time'], name='appt_provider_time_idx'),
+            # Exact-match client lookups in the admin
+            models.Index(fields=['client_email'], name='appt_email_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the slot as loaded so moving an appointment can
+        # invalidate the availability cache of the day it left
+        instance._loaded_slot = (
+            instance.__dict__.get('provider_id'),
+            instance.__dict__.get('appointment_time'),
+        )
+        instance._loaded_paid = instance.__dict__.get('is_paid')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Save the appointment and, when it is new, moved or its payment status
+        changed, hold its slot in the same transaction (see
+        ``appointments.holds``). A paid appointment holds it for good.
+
+        Raises:
+            SlotTaken: If another booking holds the slot; nothing is saved
+        """
+        update_fields = kwargs.get('update_fields')
+        slot = (self.__dict__.get('provider_id'), self.__dict__.get('appointment_time'))
+        created = self._state.adding
+        changed = not created and (
+            getattr(self, '_loaded_slot', None) != slot
+            or getattr(self, '_loaded_paid', None) != self.__dict__.get('is_paid')
+        )
+        if not (created or changed) or (update_fields is not None and not HOLD_FIELDS & set(update_fields)):
+            return super().save(*args, **kwargs)
+
+        from .holds import hold_slot
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            hold_slot(self, created=created)
+        self._loaded_slot = slot
+        self._loaded_paid = self.is_paid
 
     def __str__(self):
-        return f"{self.provider_name} - {self.client_email} at {self.appointment_time}"
+        return f"{self.provider} - {self.client_email} at {self.appointment_time}"
 
     def is_upcoming(self):
         """Check if the appointment is in the future."""
         return self.appointment_time > timezone.now()
+
+
+class SlotHold(models.Model):
+    """
+    A provider's time slot, held by the appointment booked into it.
+
+    The unique constraint lets one booking hold a slot at a time. Unpaid
+    bookings hold it until ``expires_at``; paid ones for good (``expires_at``
+    is null). See ``appointments.holds``.
+
+    Fields:
+        appointment: Booking holding the slot
+        provider: Provider of the slot
+        appointment_time: Start of the slot
+        expires_at: When an unpaid hold lapses, or null once paid
+        created_at: Timestamp when the slot was taken
+    """
+
+    appointment = models.OneToOneField(
+        Appointment,
+        on_delete=models.CASCADE,
+        related_name='slot_hold',
+        help_text="Appointment holding the slot"
+    )
+
+    provider = models.ForeignKey(
+        Provider,
+        on_delete=models.PROTECT,
+        related_name='slot_holds',
+        # Covered by the unique (provider, appointment_time) constraint
+        db_index=False,
+        help_text="Healthcare provider"
+    )
+
+    appointment_time = models.DateTimeField(
+        help_text="Start of the held slot"
+    )
+
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the hold lapses if the appointment is still unpaid"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when the slot was taken"
+    )
+
+    class Meta:
+        verbose_name = "Slot hold"
+        verbose_name_plural = "Slot holds"
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'appointment_time'], name='unique_slot_hold'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_id} at {self.appointment_time}"
@@ -0,0 +1,150 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are addressed by the last row seen instead of an OFFSET, so fetching
+page N costs the same as fetching page 1 regardless of table size.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded."""
+
+
+def encode_cursor(appointment_time: datetime, pk: int) -> str:
+    """
+    Encode an ``(appointment_time, id)`` position as an opaque URL-safe token.
+
+    Args:
+        appointment_time: Appointment time of the boundary row
+        pk: Primary key of the boundary row
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = f"{appointment_time.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor: Cursor string from the query string
+
+    Returns:
+        Tuple of (appointment_time, id)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        time_part, pk_part = raw.rsplit('|', 1)
+        return datetime.fromisoformat(time_part), int(pk_part)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def _position(row):
+    """Return the ``(appointment_time, id)`` of a model instance or values() dict."""
+    if isinstance(row, dict):
+        return row['appointment_time'], row['id']
+    return row.appointment_time, row.id
+
+
+class KeysetPage:
+    """A single page of results plus the cursors needed to move around."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest-first on ``(appointment_time, id)``.
+
+    ``after`` moves towards older rows, ``before`` moves back towards newer
+    ones. Each page fetches ``page_size + 1`` rows to detect whether another
+    page exists without running a COUNT. The queryset may yield model
+    instances or ``.values()`` dicts that include ``appointment_time`` and ``id``.
+    """
+
+    def __init__(self, queryset, page_size: int):
+        self.queryset = queryset
+        self.page_size = page_size
+
+    def get_page(self, after: str = None, before: str = None) -> KeysetPage:
+        """
+        Return the page following ``after`` or preceding ``before``.
+
+        Args:
+            after: Cursor of the last row on the previous page
+            before: Cursor of the first row on the next page
+
+        Returns:
+            KeysetPage with rows ordered newest-first
+
+        Raises:
+            InvalidCursor: If a cursor is malformed
+        """
+        queryset = self.queryset
+
+        if before:
+            time_value, pk = decode_cursor(before)
+            queryset = queryset.filter(
+                Q(appointment_time__gt=time_value) |
+                Q(appointment_time=time_value, id__gt=pk)
+            ).order_by('appointment_time', 'id')
+        else:
+            if after:
+                time_value, pk = decode_cursor(after)
+                queryset = queryset.filter(
+                    Q(appointment_time__lt=time_value) |
+                    Q(appointment_time=time_value, id__lt=pk)
+                )
+            queryset = queryset.order_by('-appointment_time', '-id')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if before:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        first = encode_cursor(*_position(rows[0]))
+        last = encode_cursor(*_position(rows[-1]))
+
+        if before:
+            next_cursor = last
+            previous_cursor = first if has_more else None
+        else:
+            next_cursor = last if has_more else None
+            previous_cursor = first if after else None
+
+        return KeysetPage(rows, next_cursor, previous_cursor)
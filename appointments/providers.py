@@ -0,0 +1,65 @@
+"""
+Cached provider list.
+
+Providers change rarely and are read on every booking form render, so
+``(id, name)`` pairs for all providers are kept in the cache and dropped by
+the signal handlers in ``appointments.signals`` when a provider changes.
+"""
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Provider
+
+
+CACHE_KEY = 'providers:choices'
+
+
+def get_provider_choices() -> list:
+    """Return ``(id, name)`` pairs for every provider, ordered by name."""
+    choices = cache.get(CACHE_KEY)
+    if choices is None:
+        choices = list(Provider.objects.order_by('name').values_list('id', 'name'))
+        cache.set(CACHE_KEY, choices, None)
+    return choices
+
+
+def get_provider_name(provider_id) -> str:
+    """Return the cached name of a provider, or None if it does not exist."""
+    return dict(get_provider_choices()).get(provider_id)
+
+
+def invalidate() -> None:
+    """Drop the cached provider list."""
+    cache.delete(CACHE_KEY)
+
+
+def resolve_providers(names) -> dict:
+    """
+    Map provider names to provider ids, creating missing providers.
+
+    Names are matched on ``Provider.normalize`` so spelling variants land on
+    the same provider.
+
+    Args:
+        names: Iterable of provider names
+
+    Returns:
+        Dict mapping each given name to a provider id
+    """
+    keys = {name: Provider.normalize(name) for name in names}
+    found = dict(
+        Provider.objects.filter(normalized_name__in=set(keys.values()))
+        .values_list('normalized_name', 'id')
+    )
+
+    for name, key in keys.items():
+        if key not in found:
+            try:
+                with transaction.atomic():
+                    found[key] = Provider.objects.create(name=name).pk
+            except IntegrityError:
+                # Created concurrently under the same normalized name
+                found[key] = Provider.objects.get(normalized_name=key).pk
+
+    return {name: found[key] for name, key in keys.items()}
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import availability, caching, providers
+from .models import Appointment, Provider
+
+
+# Appointment handlers run once the write commits: dropped earlier, an entry
+# could be rebuilt by a concurrent reader from the rows before the write and
+# cached for its full lifetime
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_availability(sender, instance, using, **kwargs):
+    """Drop cached slot bitmaps for the appointment's old and new slot."""
+    slots = [(instance.provider_id, instance.appointment_time)]
+    loaded = getattr(instance, '_loaded_slot', None)
+    if loaded and loaded != slots[0]:
+        slots.append(loaded)
+
+    def invalidate():
+        for slot in slots:
+            availability.invalidate(*slot)
+
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_listing(sender, instance, using, **kwargs):
+    """Retire cached list pages and counters that could include the appointment."""
+    loaded = getattr(instance, '_loaded_slot', None)
+    provider_ids = (instance.provider_id, loaded[0] if loaded else None)
+    transaction.on_commit(lambda: caching.invalidate(*provider_ids), using=using)
+
+
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+def invalidate_provider_choices(sender, instance, **kwargs):
+    """Drop the cached provider list, and list pages showing the old name."""
+    providers.invalidate()
+    caching.invalidate(instance.pk)
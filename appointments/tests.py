@@ -1,8 +1,23 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
 from django.utils import timezone
-from datetime import timedelta
-from .models import Appointment
-from .forms import AppointmentForm
+from datetime import datetime, time, timedelta
+import calendar
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from .models import Appointment, Provider, SlotHold, SlotTaken
+from .forms import TIME_SLOT_CHOICES, AppointmentForm
+from . import availability, caching, conditional, flow, providers
+from .holds import keep_slots
+from payments.perf import QueryBudgetMixin
+from sofia_health import routers
 
 
 class AppointmentModelTest(TestCase):
@@ -11,16 +26,17 @@ class AppointmentModelTest(TestCase):
     def setUp(self):
         """Set up test data."""
         self.future_time = timezone.now() + timedelta(days=1)
+        self.provider = Provider.objects.create(name="Dr. Smith")
 
         self.appointment = Appointment.objects.create(
-            provider_name="Dr. Smith",
+            provider=self.provider,
             client_email="client@example.com",
             appointment_time=self.future_time
         )
 
     def test_appointment_creation(self):
         """Test appointment is created correctly."""
-        self.assertEqual(self.appointment.provider_name, "Dr. Smith")
+        self.assertEqual(self.appointment.provider.name, "Dr. Smith")
         self.assertEqual(self.appointment.client_email, "client@example.com")
         self.assertFalse(self.appointment.is_paid)
         self.assertIsNone(self.appointment.payment_intent_id)
@@ -36,44 +52,137 @@ class AppointmentModelTest(TestCase):
 
         # Create past appointment
         past_appointment = Appointment.objects.create(
-            provider_name="Dr. Jones",
+            provider=Provider.objects.create(name="Dr. Jones"),
             client_email="past@example.com",
             appointment_time=timezone.now() - timedelta(days=1)
         )
         self.assertFalse(past_appointment.is_upcoming())
 
 
+class ProviderTest(TestCase):
+    """Test cases for the Provider model and the cached provider list."""
+
+    def setUp(self):
+        """Start each test with an empty cache."""
+        cache.clear()
+        self.smith = Provider.objects.create(name="  Dr.   Smith ")
+
+    def test_names_are_cleaned_and_normalized(self):
+        """Test whitespace is collapsed and spelling variants share one provider."""
+        from django.db import IntegrityError
+
+        self.assertEqual(self.smith.name, "Dr. Smith")
+        self.assertEqual(self.smith.normalized_name, "dr. smith")
+        with self.assertRaises(IntegrityError):
+            Provider.objects.create(name="DR. SMITH")
+
+    def test_resolve_providers(self):
+        """Test names map to existing providers and unknown ones are created."""
+        ids = providers.resolve_providers(["dr.  smith", "Dr. Smith", "Dr. Jones"])
+
+        self.assertEqual(ids["dr.  smith"], self.smith.pk)
+        self.assertEqual(ids["Dr. Smith"], self.smith.pk)
+        self.assertEqual(Provider.objects.get(pk=ids["Dr. Jones"]).name, "Dr. Jones")
+
+    def test_form_choices_served_from_cache(self):
+        """Test the booking form lists providers without a query once cached."""
+        AppointmentForm()
+
+        with self.assertNumQueries(0):
+            form = AppointmentForm()
+            html = form['provider'].as_widget()
+
+        self.assertIn('Dr. Smith', html)
+
+    def test_saving_provider_drops_cached_choices(self):
+        """Test a renamed provider shows up in the form and the list."""
+        Appointment.objects.create(
+            provider=self.smith,
+            client_email="client@example.com",
+            appointment_time=timezone.now() + timedelta(days=1)
+        )
+        self.client.get('/appointments/list/')
+        providers.get_provider_choices()
+
+        self.smith.name = "Dr. Smyth"
+        self.smith.save()
+
+        self.assertEqual(providers.get_provider_choices(), [(self.smith.pk, "Dr. Smyth")])
+        response = self.client.get('/appointments/list/')
+        self.assertContains(response, "Dr. Smyth")
+
+    def test_unknown_provider_filter_lists_everything(self):
+        """Test a stale or malformed provider id falls back to the full list."""
+        for value in ('999', 'abc'):
+            response = self.client.get('/appointments/list/', {'provider': value})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.context['provider_id'])
+
+
 class AppointmentFormTest(TestCase):
     """Test cases for AppointmentForm."""
 
+    def setUp(self):
+        """Reset cached availability left over by other tests."""
+        cache.clear()
+        self.smith = Provider.objects.create(name='Dr. Smith')
+        self.jones = Provider.objects.create(name='Dr. Jones')
+
     def test_valid_form(self):
         """Test form with valid data."""
-        future_time = timezone.now() + timedelta(days=1)
+        tomorrow = (timezone.localtime() + timedelta(days=1)).date()
         data = {
-            'provider_name': 'Dr. Smith',
+            'provider': self.smith.pk,
             'client_email': 'test@example.com',
-            'appointment_time': future_time
+            'appointment_date': tomorrow,
+            'appointment_time_slot': '10:00'
         }
         form = AppointmentForm(data=data)
         self.assertTrue(form.is_valid())
 
     def test_past_appointment_invalid(self):
         """Test form rejects past appointment times."""
-        past_time = timezone.now() - timedelta(hours=1)
+        yesterday = (timezone.localtime() - timedelta(days=1)).date()
         data = {
-            'provider_name': 'Dr. Smith',
+            'provider': self.smith.pk,
+            'client_email': 'test@example.com',
+            'appointment_date': yesterday,
+            'appointment_time_slot': '10:00'
+        }
+        form = AppointmentForm(data=data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Appointment must be in the future.', form.non_field_errors())
+
+    def test_booked_slot_invalid(self):
+        """Test form rejects a slot the provider already has booked."""
+        tomorrow = (timezone.localtime() + timedelta(days=1)).date()
+        Appointment.objects.create(
+            provider=self.smith,
+            client_email='first@example.com',
+            appointment_time=timezone.make_aware(
+                datetime.combine(tomorrow, time(10, 0))
+            )
+        )
+        data = {
+            'provider': self.smith.pk,
             'client_email': 'test@example.com',
-            'appointment_time': past_time
+            'appointment_date': tomorrow,
+            'appointment_time_slot': '10:00'
         }
         form = AppointmentForm(data=data)
         self.assertFalse(form.is_valid())
-        self.assertIn('appointment_time', form.errors)
+        self.assertIn('appointment_time_slot', form.errors)
+        self.assertTrue(form.slot_options[2]['booked'])
+
+        # Same slot with another provider is still free
+        data['provider'] = self.jones.pk
+        self.assertTrue(AppointmentForm(data=data).is_valid())
 
     def test_invalid_email(self):
         """Test form rejects invalid email."""
         future_time = timezone.now() + timedelta(days=1)
         data = {
-            'provider_name': 'Dr. Smith',
+            'provider': self.smith.pk,
             'client_email': 'invalid-email',
             'appointment_time': future_time
         }
@@ -85,6 +194,10 @@ class AppointmentFormTest(TestCase):
 class AppointmentViewTest(TestCase):
     """Test cases for Appointment views."""
 
+    def setUp(self):
+        """Start each test with an empty cache."""
+        cache.clear()
+
     def test_create_appointment_get(self):
         """Test GET request to create appointment view."""
         response = self.client.get('/appointments/create/')
@@ -95,3 +208,1172 @@ class AppointmentViewTest(TestCase):
         """Test GET request to appointment list view."""
         response = self.client.get('/appointments/list/')
         self.assertEqual(response.status_code, 200)
+
+    @override_settings(APPOINTMENTS_PAGE_SIZE=2)
+    def test_appointment_list_keyset_pagination(self):
+        """Test list pages through appointments newest-first by cursor."""
+        base = timezone.now() + timedelta(days=1)
+        provider = Provider.objects.create(name="Dr. Smith")
+        for i in range(5):
+            Appointment.objects.create(
+                provider=provider,
+                client_email=f"client{i}@example.com",
+                appointment_time=base + timedelta(hours=i)
+            )
+
+        first = self.client.get('/appointments/list/')
+        self.assertEqual(
+            [a.client_email for a in first.context['page']],
+            ['client4@example.com', 'client3@example.com']
+        )
+        self.assertTrue(first.context['page'].has_next)
+        self.assertFalse(first.context['page'].has_previous)
+
+        second = self.client.get(
+            '/appointments/list/', {'after': first.context['page'].next_cursor}
+        )
+        self.assertEqual(
+            [a.client_email for a in second.context['page']],
+            ['client2@example.com', 'client1@example.com']
+        )
+
+        back = self.client.get(
+            '/appointments/list/', {'before': second.context['page'].previous_cursor}
+        )
+        self.assertEqual(
+            [a.client_email for a in back.context['page']],
+            ['client4@example.com', 'client3@example.com']
+        )
+
+    def test_appointment_list_counts_single_query(self):
+        """Test paid and pending counts come from one aggregate query."""
+        future_time = timezone.now() + timedelta(days=1)
+        provider = Provider.objects.create(name="Dr. Smith")
+        Appointment.objects.create(
+            provider=provider,
+            client_email="paid@example.com",
+            appointment_time=future_time,
+            is_paid=True
+        )
+        Appointment.objects.create(
+            provider=provider,
+            client_email="pending@example.com",
+            appointment_time=future_time + timedelta(hours=1)
+        )
+
+        # One query for the page, one for the counts
+        with self.assertNumQueries(2):
+            response = self.client.get('/appointments/list/')
+
+        self.assertEqual(response.context['paid_count'], 1)
+        self.assertEqual(response.context['pending_count'], 1)
+        self.assertEqual(response.context['total_count'], 2)
+
+    def test_appointment_list_invalid_cursor(self):
+        """Test a malformed cursor falls back to the first page."""
+        response = self.client.get('/appointments/list/', {'after': '!!!'})
+        self.assertEqual(response.status_code, 200)
+
+
+class ListingCacheTest(TestCase):
+    """Test cases for the versioned appointment list cache."""
+
+    def setUp(self):
+        """Create one appointment per provider."""
+        cache.clear()
+        future_time = timezone.now() + timedelta(days=1)
+        self.dr_smith = Provider.objects.create(name="Dr. Smith")
+        self.dr_jones = Provider.objects.create(name="Dr. Jones")
+        self.smith = Appointment.objects.create(
+            provider=self.dr_smith,
+            client_email="smith@example.com",
+            appointment_time=future_time,
+            payment_intent_id="pi_smith"
+        )
+        self.jones = Appointment.objects.create(
+            provider=self.dr_jones,
+            client_email="jones@example.com",
+            appointment_time=future_time
+        )
+
+    def test_repeat_request_served_from_cache(self):
+        """Test a second identical request runs no queries."""
+        self.client.get('/appointments/list/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/appointments/list/')
+
+        self.assertEqual(response.context['total_count'], 2)
+        self.assertEqual(caching.get_stats()['page'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_save_retires_global_and_provider_entries(self):
+        """Test a write is visible on the next read of the affected lists."""
+        self.client.get('/appointments/list/')
+        self.client.get('/appointments/list/', {'provider': self.dr_smith.pk})
+
+        self.smith.client_email = 'changed@example.com'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.smith.save()
+
+        response = self.client.get('/appointments/list/')
+        self.assertIn('changed@example.com', [a.client_email for a in response.context['page']])
+        response = self.client.get('/appointments/list/', {'provider': self.dr_smith.pk})
+        self.assertEqual([a.client_email for a in response.context['page']], ['changed@example.com'])
+
+    def test_other_provider_stays_cached(self):
+        """Test a write for one provider keeps other providers' entries."""
+        self.client.get('/appointments/list/', {'provider': self.dr_jones.pk})
+
+        self.smith.save()
+
+        with self.assertNumQueries(0):
+            self.client.get('/appointments/list/', {'provider': self.dr_jones.pk})
+
+    def test_mark_paid_retires_counts(self):
+        """Test payment status set through update() is not served stale."""
+        from payments.webhooks import mark_paid
+
+        response = self.client.get('/appointments/list/', {'provider': self.dr_smith.pk})
+        self.assertEqual(response.context['paid_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_paid('pi_smith')
+
+        response = self.client.get('/appointments/list/', {'provider': self.dr_smith.pk})
+        self.assertEqual(response.context['paid_count'], 1)
+        self.assertTrue(response.context['page'].object_list[0].is_paid)
+
+    def test_invalidate_all(self):
+        """Test bulk writes can retire every entry at once."""
+        self.client.get('/appointments/list/', {'provider': self.dr_jones.pk})
+        Appointment.objects.filter(pk=self.jones.pk).update(client_email='bulk@example.com')
+
+        caching.invalidate_all()
+
+        response = self.client.get('/appointments/list/', {'provider': self.dr_jones.pk})
+        self.assertEqual(response.context['page'].object_list[0].client_email, 'bulk@example.com')
+
+    def test_cache_stats_command(self):
+        """Test cache_stats prints and resets the counters."""
+        self.client.get('/appointments/list/')
+        out = StringIO()
+
+        call_command('cache_stats', '--reset', stdout=out)
+
+        self.assertIn('page: 0 hits, 1 misses', out.getvalue())
+        self.assertEqual(caching.get_stats()['page']['misses'], 0)
+
+
+class ConditionalListTest(TestCase):
+    """Test ETag/Last-Modified revalidation of the appointment list."""
+
+    def setUp(self):
+        """Create an appointment and fetch the list once."""
+        cache.clear()
+        self.provider = Provider.objects.create(name="Dr. Smith")
+        self.appointment = Appointment.objects.create(
+            provider=self.provider,
+            client_email="smith@example.com",
+            appointment_time=timezone.now() + timedelta(days=1)
+        )
+        self.first = self.client.get('/appointments/list/')
+
+    def revalidate(self):
+        return self.client.get('/appointments/list/', headers={'if-none-match': self.first['ETag']})
+
+    def test_validators_sent(self):
+        """Test full responses carry an ETag, Last-Modified and must be revalidated."""
+        self.assertTrue(self.first['ETag'])
+        self.assertIn('Last-Modified', self.first)
+        self.assertIn('no-cache', self.first['Cache-Control'])
+        self.assertIn('private', self.first['Cache-Control'])
+
+    def test_unchanged_not_modified(self):
+        """Test an unchanged list is answered with 304 without rendering."""
+        with self.assertNumQueries(0):
+            response = self.revalidate()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response.templates, [])
+        self.assertEqual(response['ETag'], self.first['ETag'])
+
+    def test_state_in_one_query(self):
+        """Test a revalidation on a cold cache costs one aggregate query."""
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.revalidate()
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_render_again(self):
+        """Test an edit, an insert or a delete changes the ETag."""
+        etags = {self.first['ETag']}
+        self.appointment.client_email = 'changed@example.com'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment.save()
+            Appointment.objects.create(
+                provider=self.provider,
+                client_email="second@example.com",
+                appointment_time=timezone.now() + timedelta(days=2)
+            )
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 200)
+        etags.add(response['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment.delete()
+        response = self.client.get('/appointments/list/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        etags.add(response['ETag'])
+        self.assertEqual(len(etags), 3)
+
+    def test_provider_rename_renders_again(self):
+        """Test renaming a provider changes the ETag of lists showing its name."""
+        api = self.client.get('/appointments/api/', {'fields': 'id,provider_name'})
+        self.provider.name = 'Dr. Jones'
+        self.provider.save()
+
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Dr. Jones')
+
+        response = self.client.get('/appointments/api/', {'fields': 'id,provider_name'},
+                                   headers={'if-none-match': api['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['provider_name'], 'Dr. Jones')
+
+    def test_pending_messages_render(self):
+        """Test a visitor with a flash message waiting gets the full page."""
+        with patch.object(conditional.messages, 'get_messages', return_value=['Booked']):
+            response = self.revalidate()
+        self.assertEqual(response.status_code, 200)
+
+
+class AppointmentQueryApiTest(TestCase):
+    """Test the JSON appointment API."""
+
+    def setUp(self):
+        """Create paid and pending appointments on three days for two providers."""
+        cache.clear()
+        self.smith = Provider.objects.create(name="Dr. Smith")
+        self.jones = Provider.objects.create(name="Dr. Jones")
+        self.day = timezone.localdate() + timedelta(days=1)
+        for i, provider in enumerate([self.smith, self.jones, self.smith]):
+            Appointment.objects.create(
+                provider=provider,
+                client_email=f"client{i}@example.com",
+                appointment_time=timezone.make_aware(datetime.combine(self.day + timedelta(days=i), time(9))),
+                is_paid=i == 1
+            )
+
+    def query(self, **params):
+        return self.client.get('/appointments/api/', params)
+
+    def test_projection(self):
+        """Test only the requested columns are selected and returned, without model instances."""
+        with CaptureQueriesContext(connection) as queries, \
+                patch.object(Appointment, 'from_db', side_effect=AssertionError('model instantiated')):
+            response = self.query(fields='client_email,provider_name')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0], {
+            'client_email': 'client2@example.com', 'provider_name': 'Dr. Smith',
+        })
+        page_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('payment_intent_id', page_sql)
+        self.assertNotIn('created_at', page_sql)
+
+    def test_filters(self):
+        """Test the provider, is_paid and inclusive date range filters."""
+        def emails(**params):
+            return [row['client_email'] for row in self.query(fields='client_email', **params).json()['results']]
+
+        self.assertEqual(emails(provider=self.smith.pk), ['client2@example.com', 'client0@example.com'])
+        self.assertEqual(emails(is_paid='true'), ['client1@example.com'])
+        self.assertEqual(emails(is_paid='false', provider=self.smith.pk, date_to=self.day.isoformat()),
+                         ['client0@example.com'])
+        self.assertEqual(
+            emails(date_from=(self.day + timedelta(days=1)).isoformat(), date_to=(self.day + timedelta(days=2)).isoformat()),
+            ['client2@example.com', 'client1@example.com'],
+        )
+
+    def test_keyset_pages(self):
+        """Test following the next cursor returns the remaining rows."""
+        first = self.query(fields='id', page_size=2).json()
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(first['previous'])
+
+        second = self.query(fields='id', page_size=2, after=first['next']).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        ids = {row['id'] for row in first['results'] + second['results']}
+        self.assertEqual(ids, set(Appointment.objects.values_list('id', flat=True)))
+
+    def test_invalid_parameters(self):
+        """Test malformed parameters are rejected with 400."""
+        for params in ({'fields': 'id,secret'}, {'provider': 'x'}, {'date_from': '2025-13-01'},
+                       {'is_paid': 'maybe'}, {'after': '!!!'}, {'date_to': '9999-12-31'},
+                       {'provider': '99999999999999999999999'}, {'provider': '-1'}):
+            response = self.query(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_not_modified(self):
+        """Test polling an unchanged result costs one query and returns 304."""
+        response = self.query(provider=self.smith.pk)
+        with self.assertNumQueries(1):
+            again = self.client.get('/appointments/api/', {'provider': self.smith.pk},
+                                    headers={'if-none-match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+        Appointment.objects.filter(provider=self.jones).update(is_paid=False, updated_at=timezone.now())
+        again = self.client.get('/appointments/api/', {'provider': self.smith.pk},
+                                headers={'if-none-match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+
+class BulkCommandTest(TestCase):
+    """Test cases for the import_appointments and export_appointments commands."""
+
+    def setUp(self):
+        """Prepare a scratch directory and a bookable future day."""
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.day = timezone.localdate() + timedelta(days=3)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def slot(self, hour):
+        return f'{self.day.isoformat()}T{hour:02d}:00:00'
+
+    def test_import_csv_validates_rows(self):
+        """Test valid rows are imported and rule-breaking rows skipped."""
+        Appointment.objects.create(
+            provider=Provider.objects.create(name="Dr. Smith"),
+            client_email="existing@example.com",
+            appointment_time=timezone.make_aware(datetime.combine(self.day, time(8, 0)))
+        )
+        path = self.write_file('appointments.csv', '\n'.join([
+            'provider_name,client_email,appointment_time,is_paid,payment_intent_id',
+            f'Dr. Smith,ok@example.com,{self.slot(9)},true,pi_import_1',
+            f'Dr. Smith,taken@example.com,{self.slot(8)},false,',
+            f'Dr. Smith,twice@example.com,{self.slot(9)},false,',
+            f'Dr. Smith,bad-email,{self.slot(10)},false,',
+            f'Dr. Smith,late@example.com,{self.day.isoformat()}T23:00:00,false,',
+            'Dr. Smith,past@example.com,2020-01-01T09:00:00,false,',
+        ]))
+        out, err = StringIO(), StringIO()
+
+        call_command('import_appointments', path, stdout=out, stderr=err)
+
+        imported = Appointment.objects.get(client_email='ok@example.com')
+        self.assertTrue(imported.is_paid)
+        self.assertEqual(imported.payment_intent_id, 'pi_import_1')
+        self.assertIsNone(imported.slot_hold.expires_at)
+        self.assertEqual(Appointment.objects.count(), 2)
+        self.assertIn('Imported 1 appointments', out.getvalue())
+        self.assertIn('skipped 5 invalid rows', out.getvalue())
+        for line in range(3, 8):
+            self.assertIn(f'line {line}:', err.getvalue())
+
+    def test_import_matches_provider_spellings(self):
+        """Test imported names are matched to providers after normalization."""
+        provider = Provider.objects.create(name="Dr. Smith")
+        path = self.write_file('appointments.csv', '\n'.join([
+            'provider_name,client_email,appointment_time,is_paid,payment_intent_id',
+            f'dr.  SMITH,a@example.com,{self.slot(9)},false,',
+            f'Dr. Smith,b@example.com,{self.slot(9)},false,',
+            f'Dr. Jones,c@example.com,{self.slot(9)},false,',
+        ]))
+        err = StringIO()
+
+        call_command('import_appointments', path, stdout=StringIO(), stderr=err)
+
+        self.assertEqual(Appointment.objects.get(client_email='a@example.com').provider, provider)
+        self.assertIn('line 3: time slot is already booked', err.getvalue())
+        self.assertEqual(Provider.objects.count(), 2)
+
+    def test_import_past_allowed_and_caches_dropped(self):
+        """Test historical rows import with --allow-past and show up in cached views."""
+        self.client.get('/appointments/list/')
+        path = self.write_file('history.jsonl', json.dumps({
+            'provider_name': 'Dr. Smith',
+            'client_email': 'history@example.com',
+            'appointment_time': '2020-01-01T09:00:00',
+        }) + '\nnot json\n')
+
+        call_command('import_appointments', path, '--allow-past', stdout=StringIO(), stderr=StringIO())
+
+        response = self.client.get('/appointments/list/')
+        self.assertEqual(response.context['total_count'], 1)
+
+    def test_export_round_trip(self):
+        """Test exported rows can be imported again unchanged."""
+        provider = Provider.objects.create(name="Dr. Smith")
+        for hour in (8, 9, 10):
+            Appointment.objects.create(
+                provider=provider,
+                client_email=f"client{hour}@example.com",
+                appointment_time=timezone.make_aware(datetime.combine(self.day, time(hour, 0))),
+                is_paid=hour == 9
+            )
+        path = os.path.join(self.tmpdir.name, 'export.csv')
+
+        call_command('export_appointments', path, '--chunk-size', '2', stdout=StringIO())
+        Appointment.objects.all().delete()
+        call_command('import_appointments', path, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(
+            list(Appointment.objects.order_by('appointment_time').values_list('client_email', 'is_paid')),
+            [('client8@example.com', False), ('client9@example.com', True), ('client10@example.com', False)]
+        )
+
+
+class BenchmarkCommandTest(TestCase):
+    """Test cases for the benchmark_queries and benchmark_admin management commands."""
+
+    def test_benchmark_queries_reports_and_cleans_up(self):
+        """Test the command prints plans and removes its seeded rows."""
+        out = StringIO()
+        call_command('benchmark_queries', rows=50, repeat=1, stdout=out)
+
+        self.assertIn('confirm_payment: lookup by payment_intent_id', out.getvalue())
+        self.assertIn('Plan:', out.getvalue())
+        self.assertEqual(Appointment.objects.count(), 0)
+
+    def test_benchmark_admin_uses_scratch_database(self):
+        """Test the admin benchmark seeds a scratch database and loads every view."""
+        from contextlib import nullcontext
+
+        out = StringIO()
+        # The test database stands in for the scratch one
+        with patch('appointments.management.commands.benchmark_admin.scratch_database',
+                   return_value=nullcontext()) as scratch_database:
+            call_command('benchmark_admin', rows=50, repeat=1, stdout=out)
+
+        scratch_database.assert_called_once()
+        self.assertNotIn('HTTP 500', out.getvalue())
+        self.assertEqual(out.getvalue().count('HTTP 200'), 8)
+
+
+class AppointmentAdminTest(TestCase):
+    """Test cases for the large-table admin changelist."""
+
+    def setUp(self):
+        """Log in as a superuser and create a few appointments."""
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_superuser('staff', 'staff@example.com', 'pass')
+        self.client.force_login(user)
+        # Whole seconds, as the admin's split date/time widget posts them
+        future_time = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        for i, provider in enumerate(['Dr. Smith', 'Dr. Smithers', 'Dr. Jones']):
+            Appointment.objects.create(
+                provider=Provider.objects.create(name=provider),
+                client_email=f"client{i}@example.com",
+                appointment_time=future_time + timedelta(hours=i),
+                payment_intent_id=f"pi_admin_{i}"
+            )
+
+    def search(self, term):
+        response = self.client.get('/admin/appointments/appointment/', {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return sorted(a.provider.name for a in response.context['cl'].result_list)
+
+    def test_search_uses_exact_and_prefix_lookups(self):
+        """Test each kind of search term picks its lookup."""
+        self.assertEqual(self.search('client2@example.com'), ['Dr. Jones'])
+        self.assertEqual(self.search('client2@EXAMPLE'), [])
+        self.assertEqual(self.search('pi_admin_0'), ['Dr. Smith'])
+        self.assertEqual(self.search('Dr. Smith'), ['Dr. Smith', 'Dr. Smithers'])
+        self.assertEqual(self.search('Smith'), [])
+
+    def test_estimated_count_skips_count_query(self):
+        """Test a large unfiltered table is counted from the row estimate."""
+        from .admin import EstimatedCountPaginator
+
+        with patch.object(EstimatedCountPaginator, 'estimate_table_rows', return_value=2000000):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get('/admin/appointments/appointment/')
+
+        self.assertEqual(response.context['cl'].result_count, 2000000)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in captured.captured_queries))
+
+    def test_filtered_count_is_capped(self):
+        """Test filtered changelists count no further than the cap."""
+        from .admin import EstimatedCountPaginator
+
+        with patch.object(EstimatedCountPaginator, 'count_cap', 2):
+            response = self.client.get('/admin/appointments/appointment/', {'is_paid__exact': 0})
+
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_export_view_streams_filtered_csv(self):
+        """Test the export endpoint applies the changelist's search."""
+        response = self.client.get('/admin/appointments/appointment/export/', {'q': 'Dr. Smith'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'provider_name,client_email,appointment_time,is_paid,payment_intent_id')
+        self.assertEqual(sorted(line.split(',')[0] for line in lines[1:]), ['Dr. Smith', 'Dr. Smithers'])
+
+    def test_changelist_links_to_filtered_export(self):
+        """Test the export button carries the current filters."""
+        response = self.client.get('/admin/appointments/appointment/', {'is_paid__exact': 0})
+        self.assertContains(response, '/admin/appointments/appointment/export/?is_paid__exact=0')
+
+    def test_export_action_streams_selected_rows(self):
+        """Test the admin action exports only the selected appointments."""
+        selected = Appointment.objects.get(payment_intent_id='pi_admin_2')
+
+        response = self.client.post('/admin/appointments/appointment/', {
+            'action': 'export_csv',
+            '_selected_action': [selected.pk],
+        })
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('Dr. Jones,client2@example.com,'))
+
+    def test_export_requires_staff(self):
+        """Test anonymous users are sent to the admin login."""
+        self.client.logout()
+        response = self.client.get('/admin/appointments/appointment/export/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_date_hierarchy(self):
+        """Test drilling down by appointment date."""
+        year = (timezone.now() + timedelta(days=1)).year
+        response = self.client.get('/admin/appointments/appointment/', {'appointment_time__year': year})
+        self.assertEqual(response.status_code, 200)
+
+
+    def admin_form(self, appointment, **changes):
+        local = timezone.localtime(changes.pop('appointment_time', appointment.appointment_time))
+        return {
+            'provider': appointment.provider_id,
+            'client_email': appointment.client_email,
+            'appointment_time_0': local.date().isoformat(),
+            'appointment_time_1': local.strftime('%H:%M:%S'),
+            **changes,
+        }
+
+    def test_add_onto_held_slot_rejected(self):
+        """Test the admin shows a form error for a slot another booking holds."""
+        held = Appointment.objects.get(client_email='client0@example.com')
+
+        response = self.client.post('/admin/appointments/appointment/add/', {
+            **self.admin_form(held), 'client_email': 'new@example.com',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('appointment_time', response.context['adminform'].form.errors)
+        self.assertFalse(Appointment.objects.filter(client_email='new@example.com').exists())
+
+    def test_slot_taken_on_save_reported(self):
+        """Test a slot taken after the form was checked is reported, not a 500."""
+        held = Appointment.objects.get(client_email='client0@example.com')
+
+        with patch('appointments.admin.AppointmentAdminForm.clean', lambda form: form.cleaned_data):
+            response = self.client.post('/admin/appointments/appointment/add/', {
+                **self.admin_form(held), 'client_email': 'new@example.com',
+            }, follow=True)
+
+        self.assertContains(response, 'This time slot was just booked')
+        self.assertFalse(Appointment.objects.filter(client_email='new@example.com').exists())
+
+    def test_marking_paid_keeps_hold(self):
+        """Test ticking is_paid in the admin makes the slot's hold permanent."""
+        appointment = Appointment.objects.get(client_email='client0@example.com')
+
+        response = self.client.post(
+            f'/admin/appointments/appointment/{appointment.pk}/change/',
+            self.admin_form(appointment, is_paid='on'),
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(SlotHold.objects.get(appointment=appointment).expires_at)
+
+class AvailabilityTest(TestCase):
+    """Test cases for the slot availability cache."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.day = (timezone.localtime() + timedelta(days=2)).date()
+        self.smith = Provider.objects.create(name='Dr. Smith')
+
+    def book(self, hour, provider=None):
+        return Appointment.objects.create(
+            provider=provider or self.smith,
+            client_email='client@example.com',
+            appointment_time=timezone.make_aware(
+                datetime.combine(self.day, time(hour, 0))
+            )
+        )
+
+    def test_bitmap_from_single_query(self):
+        """Test the bitmap is built in one query and then served from cache."""
+        self.book(8)
+        self.book(13)
+        self.book(9, provider=Provider.objects.create(name='Dr. Jones'))
+
+        with self.assertNumQueries(1):
+            bitmap = availability.get_day_bitmap(self.smith.pk, self.day)
+        with self.assertNumQueries(0):
+            availability.get_day_bitmap(self.smith.pk, self.day)
+
+        self.assertEqual(bitmap, 0b100001)
+        self.assertEqual(availability.booked_slots(bitmap), ['08:00', '13:00'])
+        self.assertTrue(availability.is_slot_booked(bitmap, '13:00'))
+        self.assertFalse(availability.is_slot_booked(bitmap, '09:00'))
+
+    def test_invalidated_on_save_and_delete(self):
+        """Test saving, moving and deleting appointments refresh the bitmap."""
+        self.assertEqual(availability.get_day_bitmap(self.smith.pk, self.day), 0)
+
+        # Caches are dropped once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book(10)
+        self.assertEqual(availability.get_day_bitmap(self.smith.pk, self.day), 1 << 2)
+
+        # Move it to the next day: the original day must be freed
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.appointment_time += timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(availability.get_day_bitmap(self.smith.pk, self.day), 0)
+
+        next_day = self.day + timedelta(days=1)
+        self.assertEqual(availability.get_day_bitmap(self.smith.pk, next_day), 1 << 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertEqual(availability.get_day_bitmap(self.smith.pk, next_day), 0)
+
+    def test_availability_endpoint(self):
+        """Test the JSON endpoint lists booked slots."""
+        self.book(22)
+        response = self.client.get('/appointments/availability/', {
+            'provider': self.smith.pk,
+            'date': self.day.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['booked'], ['22:00'])
+
+        for params in ({}, {'provider': self.smith.pk, 'date': '9999-12-31'},
+                       {'provider': '99999999999999999999999', 'date': self.day.isoformat()}):
+            response = self.client.get('/appointments/availability/', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_month_from_single_query(self):
+        """Test a month of bitmaps comes from one grouped query, then from cache."""
+        self.book(8)
+        self.book(22)
+        self.book(9, provider=Provider.objects.create(name='Dr. Jones'))
+
+        with self.assertNumQueries(1):
+            bitmaps = availability.get_month_bitmaps(self.smith.pk, self.day.year, self.day.month)
+        with self.assertNumQueries(0):
+            availability.get_month_bitmaps(self.smith.pk, self.day.year, self.day.month)
+
+        self.assertEqual(len(bitmaps), calendar.monthrange(self.day.year, self.day.month)[1])
+        self.assertEqual(bitmaps[self.day.day - 1], 1 | 1 << 14)
+        self.assertEqual(sum(bitmaps), 1 | 1 << 14)
+
+    def test_invalidated_after_commit(self):
+        """Test a write drops cached bitmaps only once it commits."""
+        availability.get_day_bitmap(self.smith.pk, self.day)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.book(10)
+            # A reader before the commit must not cache the uncommitted state
+            self.assertIsNotNone(cache.get(availability._cache_key(self.smith.pk, self.day)))
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(availability._cache_key(self.smith.pk, self.day)))
+
+    def test_month_invalidated_on_write(self):
+        """Test booking and moving an appointment refresh the month's bitmaps."""
+        availability.get_month_bitmaps(self.smith.pk, self.day.year, self.day.month)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book(10)
+        bitmaps = availability.get_month_bitmaps(self.smith.pk, self.day.year, self.day.month)
+        self.assertEqual(bitmaps[self.day.day - 1], 1 << 2)
+
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.appointment_time += timedelta(days=40)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        bitmaps = availability.get_month_bitmaps(self.smith.pk, self.day.year, self.day.month)
+        self.assertEqual(bitmaps[self.day.day - 1], 0)
+
+    def test_month_endpoint(self):
+        """Test the JSON endpoint returns the slots and one bitmap per day."""
+        self.book(9)
+        response = self.client.get('/appointments/availability/month/', {
+            'provider': self.smith.pk,
+            'month': self.day.strftime('%Y-%m'),
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['slots'][:2], ['08:00', '09:00'])
+        self.assertEqual(data['days'][self.day.day - 1], 1 << 1)
+
+        for params in ({}, {'provider': self.smith.pk, 'month': '2026-13'},
+                       {'provider': self.smith.pk, 'month': '2026'},
+                       {'provider': self.smith.pk, 'month': '9999-12'},
+                       {'provider': '99999999999999999999999', 'month': '2026-01'}):
+            response = self.client.get('/appointments/availability/month/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+class AppointmentQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test the read-heavy appointment views stay within their query budgets."""
+
+    def setUp(self):
+        """Book 30 appointments across 5 providers on a cold cache."""
+        cache.clear()
+        self.providers = [Provider.objects.create(name=f'Dr. {name}') for name in 'ABCDE']
+        self.day = timezone.localdate() + timedelta(days=2)
+        Appointment.objects.bulk_create([
+            Appointment(
+                provider=self.providers[i % 5],
+                client_email=f'client{i}@example.com',
+                appointment_time=timezone.make_aware(datetime.combine(self.day, time(i % 24, 0)))
+                + timedelta(days=i // 24),
+                is_paid=i % 2 == 0,
+            )
+            for i in range(30)
+        ])
+
+    def test_appointment_list_budget(self):
+        """Test the list does not query once per row or per provider."""
+        with self.assertQueryBudget('appointment_list'):
+            response = self.client.get('/appointments/list/')
+        self.assertContains(response, 'Dr. E')
+
+    def test_slot_availability_budget(self):
+        """Test availability is a single query on a cold cache."""
+        with self.assertQueryBudget('slot_availability'):
+            response = self.client.get('/appointments/availability/', {
+                'provider': self.providers[0].pk, 'date': self.day.isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+
+    def test_month_availability_budget(self):
+        """Test a month of availability is a single query on a cold cache."""
+        with self.assertQueryBudget('month_availability'):
+            response = self.client.get('/appointments/availability/month/', {
+                'provider': self.providers[0].pk, 'month': self.day.strftime('%Y-%m'),
+            })
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTest(TestCase):
+    """Test which requests read from a replica.
+
+    The only database in the tests doubles as the replica; ``choose_replica``
+    is watched to see which reads were routed to it.
+    """
+
+    def setUp(self):
+        """Watch replica reads and book one appointment."""
+        patcher = patch('sofia_health.routers.choose_replica', return_value='default')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = Provider.objects.create(name='Dr. Smith')
+        # Long after that write
+        cache.clear()
+
+    def booking(self):
+        return {
+            'provider': self.provider.pk,
+            'client_email': 'client@example.com',
+            'appointment_date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+            'appointment_time_slot': '09:00',
+        }
+
+    def test_read_only_view_uses_replica(self):
+        """Test the JSON API reads from a replica and sets no pin."""
+        response = self.client.get('/appointments/api/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.choose_replica.called)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_list_cache_filled_from_replica(self):
+        """Test the list computes its cached entries on a replica when no write is recent."""
+        response = self.client.get('/appointments/list/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.choose_replica.called)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_list_cache_filled_from_primary_after_write(self):
+        """Test entries computed while replicas may lag, which pinned visitors read too, come from the primary."""
+        caching.invalidate(self.provider.pk)
+
+        response = self.client.get('/appointments/list/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.choose_replica.called)
+
+        # Once the window has passed
+        cache.clear()
+        self.client.get('/appointments/list/')
+        self.assertTrue(self.choose_replica.called)
+
+    def test_write_pins_visitor_to_primary(self):
+        """Test a booking stays on the primary and pins the next page there."""
+        response = self.client.post('/appointments/create/', self.booking())
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.choose_replica.called)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        self.client.get('/appointments/list/')
+        self.assertFalse(self.choose_replica.called)
+
+    def test_confirm_payment_uses_primary(self):
+        """Test confirming a payment never reads from a replica."""
+        with override_settings(STRIPE_WEBHOOK_SECRET=''), \
+                patch('payments.views.StripeService.confirm_payment', return_value=True):
+            self.client.post('/payments/confirm/', {'payment_intent_id': 'pi_missing'})
+        self.assertFalse(self.choose_replica.called)
+
+    def test_admin_reads_use_replica(self):
+        """Test admin pages read from a replica."""
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_superuser('replica-admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+
+        response = self.client.get('/admin/appointments/appointment/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.choose_replica.called)
+
+    def test_outside_requests_use_primary(self):
+        """Test commands and workers, which serve no request, use the primary."""
+        router = routers.ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(Appointment), 'default')
+        self.assertEqual(router.db_for_write(Appointment), 'default')
+        self.assertFalse(self.choose_replica.called)
+
+
+@override_settings(BOOKING_FLOW_MODE='token', BOOKING_FLOW_TOKEN_MAX_AGE=60)
+class BookingFlowTokenTest(TestCase):
+    """Test cases for the signed-cookie booking flow."""
+
+    def setUp(self):
+        """Create a paid appointment."""
+        self.appointment = Appointment.objects.create(
+            provider=Provider.objects.create(name='Dr. Smith'),
+            client_email='test@example.com',
+            appointment_time=timezone.now() + timedelta(days=1),
+            is_paid=True
+        )
+
+    def test_token_carries_id_and_stage(self):
+        """Test a token only opens the stage it was issued for."""
+        token = flow.make_token(self.appointment.id, flow.COMPLETED)
+
+        self.assertEqual(flow.read_token(token, flow.COMPLETED), self.appointment.id)
+        self.assertIsNone(flow.read_token(token, flow.PENDING))
+        self.assertIsNone(flow.read_token(token[:-1] + 'x', flow.COMPLETED))
+        self.assertIsNone(flow.read_token('', flow.COMPLETED))
+
+    def test_expired_token_rejected(self):
+        """Test tokens stop working after BOOKING_FLOW_TOKEN_MAX_AGE."""
+        token = flow.make_token(self.appointment.id, flow.COMPLETED)
+
+        with patch('django.core.signing.time.time', return_value=timezone.now().timestamp() + 120):
+            self.assertIsNone(flow.read_token(token, flow.COMPLETED))
+
+    def test_create_sets_cookie_not_session(self):
+        """Test booking hands the appointment to the payment page in a cookie."""
+        tomorrow = (timezone.localtime() + timedelta(days=1)).date()
+        response = self.client.post('/appointments/create/', {
+            'provider': self.appointment.provider_id,
+            'client_email': 'new@example.com',
+            'appointment_date': tomorrow.isoformat(),
+            'appointment_time_slot': '10:00',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        created = Appointment.objects.get(client_email='new@example.com')
+        token = response.cookies[flow.COOKIE_NAME].value
+        self.assertEqual(flow.read_token(token, flow.PENDING), created.id)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_success_page_shown_once(self):
+        """Test the success page reads the token and then clears it."""
+        self.client.cookies[flow.COOKIE_NAME] = flow.make_token(self.appointment.id, flow.COMPLETED)
+
+        response = self.client.get('/appointments/success/')
+        self.assertContains(response, 'test@example.com')
+        self.assertEqual(response.cookies[flow.COOKIE_NAME].value, '')
+
+        response = self.client.get('/appointments/success/')
+        self.assertRedirects(response, '/appointments/create/')
+
+
+@override_settings(ROOT_URLCONF='sofia_health.urls_async')
+class AsyncAppointmentViewTest(TestCase):
+    """Test cases for the async booking views served under ASGI."""
+
+    def setUp(self):
+        """Reset cached availability left over by other tests."""
+        cache.clear()
+        self.provider = Provider.objects.create(name='Dr. Smith')
+
+    async def test_create_appointment_async(self):
+        """Test the async booking view saves and starts the payment flow."""
+        tomorrow = (timezone.localtime() + timedelta(days=1)).date()
+        response = await self.async_client.post('/appointments/create/', {
+            'provider': self.provider.pk,
+            'client_email': 'test@example.com',
+            'appointment_date': tomorrow.isoformat(),
+            'appointment_time_slot': '10:00',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        appointment = await Appointment.objects.aget(client_email='test@example.com')
+        session = await self.async_client.asession()
+        self.assertEqual(await session.aget('pending_appointment_id'), appointment.id)
+
+    async def test_create_form_async_cold_cache(self):
+        """Test the async booking form renders when provider choices are not cached."""
+        response = await self.async_client.get('/appointments/create/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Dr. Smith')
+
+    async def test_appointment_success_async(self):
+        """Test the async success page shows and clears the booking."""
+        appointment = await Appointment.objects.acreate(
+            provider=self.provider,
+            client_email='test@example.com',
+            appointment_time=timezone.now() + timedelta(days=1),
+            is_paid=True
+        )
+        session = await self.async_client.asession()
+        await session.aset('completed_appointment_id', appointment.id)
+        await session.asave()
+
+        response = await self.async_client.get('/appointments/success/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'test@example.com')
+
+
+class SlotHoldTest(TestCase):
+    """Test cases for the slot holds that keep a slot to one booking."""
+
+    def setUp(self):
+        """Reset cached availability left over by other tests."""
+        cache.clear()
+        self.provider = Provider.objects.create(name='Dr. Smith')
+        self.day = (timezone.localtime() + timedelta(days=1)).date()
+        self.appointment_time = timezone.make_aware(datetime.combine(self.day, time(10, 0)))
+
+    def _book(self, email='client@example.com', **kwargs):
+        return Appointment.objects.create(
+            provider=self.provider,
+            client_email=email,
+            appointment_time=kwargs.pop('appointment_time', self.appointment_time),
+            **kwargs
+        )
+
+    def _expire(self, appointment):
+        SlotHold.objects.filter(appointment=appointment).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_booking_holds_slot(self):
+        """Test an unpaid booking holds its slot for SLOT_HOLD_SECONDS."""
+        with self.settings(SLOT_HOLD_SECONDS=600):
+            before = timezone.now()
+            appointment = self._book()
+
+        hold = appointment.slot_hold
+        self.assertEqual(hold.appointment_time, self.appointment_time)
+        self.assertGreaterEqual(hold.expires_at, before + timedelta(seconds=600))
+        self.assertIsNone(self._book('paid@example.com', appointment_time=self.appointment_time + timedelta(hours=1), is_paid=True).slot_hold.expires_at)
+
+    def test_second_booking_of_slot_rejected(self):
+        """Test a second booking of a held slot raises and saves nothing."""
+        self._book()
+        with self.assertRaises(SlotTaken):
+            self._book('other@example.com')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_view_rejects_slot_taken_after_validation(self):
+        """Test a booking that passed a stale availability check is re-shown with an error."""
+        self._book()
+
+        with patch('appointments.availability.get_day_bitmap', return_value=0):
+            response = self.client.post('/appointments/create/', {
+                'provider': self.provider.pk,
+                'client_email': 'late@example.com',
+                'appointment_date': self.day.isoformat(),
+                'appointment_time_slot': '10:00',
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('appointment_time_slot', response.context['form'].errors)
+        self.assertFalse(Appointment.objects.filter(client_email='late@example.com').exists())
+
+    def test_expired_hold_frees_slot(self):
+        """Test a slot whose unpaid hold expired can be booked again."""
+        first = self._book()
+        self.assertTrue(availability.is_slot_booked(availability.get_day_bitmap(self.provider.pk, self.day), '10:00'))
+
+        self._expire(first)
+        cache.clear()
+        self.assertFalse(availability.is_slot_booked(availability.get_day_bitmap(self.provider.pk, self.day), '10:00'))
+
+        second = self._book('second@example.com')
+        self.assertEqual(SlotHold.objects.get(appointment_time=self.appointment_time).appointment, second)
+        self.assertFalse(SlotHold.objects.filter(appointment=first).exists())
+
+    def test_availability_cached_until_hold_expires(self):
+        """Test cached availability lasts no longer than the first hold."""
+        with self.settings(SLOT_HOLD_SECONDS=60):
+            self._book()
+        with patch.object(availability.cache, 'set') as cache_set:
+            availability.get_day_bitmap(self.provider.pk, self.day)
+        self.assertLessEqual(cache_set.call_args.args[2], 60)
+
+    def test_moving_booking_moves_hold(self):
+        """Test rescheduling releases the old slot and holds the new one."""
+        appointment = self._book()
+        appointment.appointment_time += timedelta(hours=1)
+        appointment.save()
+
+        self.assertEqual(SlotHold.objects.get().appointment_time, appointment.appointment_time)
+        self._book('next@example.com')
+        self.assertEqual(SlotHold.objects.count(), 2)
+
+    def test_moving_onto_held_slot_rejected(self):
+        """Test rescheduling onto a held slot raises and keeps the old slot."""
+        self._book()
+        appointment = self._book('other@example.com', appointment_time=self.appointment_time + timedelta(hours=1))
+
+        appointment.appointment_time = self.appointment_time
+        with self.assertRaises(SlotTaken):
+            appointment.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.slot_hold.appointment_time, self.appointment_time + timedelta(hours=1))
+
+    def test_payment_keeps_hold(self):
+        """Test a paid booking's hold no longer expires."""
+        appointment = self._book()
+        keep_slots([appointment.pk])
+        self.assertIsNone(SlotHold.objects.get().expires_at)
+
+    def test_saving_paid_keeps_hold(self):
+        """Test marking an appointment paid with save() makes its hold permanent."""
+        self._book()
+        appointment = Appointment.objects.get()
+        appointment.is_paid = True
+        appointment.save()
+
+        self.assertIsNone(SlotHold.objects.get().expires_at)
+
+    def test_payment_after_expiry_takes_free_slot_again(self):
+        """Test a booking paid after its hold was released holds its slot again."""
+        appointment = self._book()
+        SlotHold.objects.all().delete()
+        Appointment.objects.filter(pk=appointment.pk).update(is_paid=True)
+
+        self.assertEqual(keep_slots([appointment.pk]), 1)
+        self.assertIsNone(SlotHold.objects.get(appointment=appointment).expires_at)
+
+    def test_payment_after_slot_rebooked_logged(self):
+        """Test a booking paid after its slot went to someone else is logged."""
+        first = self._book()
+        self._expire(first)
+        self._book('second@example.com')
+
+        with self.assertLogs('appointments.holds', 'ERROR'):
+            self.assertEqual(keep_slots([first.pk]), 0)
+
+
+class SlotHoldConcurrencyTest(TransactionTestCase):
+    """Test concurrent bookings race on the slot hold, not the form check."""
+
+    THREADS = 8
+
+    def setUp(self):
+        """Reset cached availability left over by other tests."""
+        cache.clear()
+        self.provider = Provider.objects.create(name='Dr. Smith')
+        self.day = (timezone.localtime() + timedelta(days=1)).date()
+
+    def _book_concurrently(self, slots):
+        """
+        POST one booking per slot from its own thread and client.
+
+        Every thread passes the form's availability check before any of
+        them saves, as when requests arrive together.
+        """
+        barrier = threading.Barrier(len(slots))
+        get_day_bitmap = availability.get_day_bitmap
+
+        def checked_together(provider_id, day):
+            bitmap = get_day_bitmap(provider_id, day)
+            barrier.wait(timeout=10)
+            return bitmap
+
+        responses = [None] * len(slots)
+
+        def book(index, slot):
+            try:
+                responses[index] = Client().post('/appointments/create/', {
+                    'provider': self.provider.pk,
+                    'client_email': f'client{index}@example.com',
+                    'appointment_date': self.day.isoformat(),
+                    'appointment_time_slot': slot,
+                })
+            except Exception as e:
+                responses[index] = e
+            finally:
+                connection.close()
+
+        with patch('appointments.availability.get_day_bitmap', checked_together):
+            threads = [threading.Thread(target=book, args=item) for item in enumerate(slots)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for response in responses:
+            if isinstance(response, Exception):
+                raise response
+        return responses
+
+    def test_one_booking_wins_a_slot(self):
+        """Test exactly one of many simultaneous bookings gets the slot."""
+        responses = self._book_concurrently(['10:00'] * self.THREADS)
+
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(SlotHold.objects.count(), 1)
+        self.assertEqual([r.status_code for r in responses].count(302), 1)
+        for response in responses:
+            if response.status_code == 200:
+                self.assertIn('appointment_time_slot', response.context['form'].errors)
+
+    def test_different_slots_all_booked(self):
+        """Test simultaneous bookings of different slots all succeed."""
+        slots = [value for value, _label in TIME_SLOT_CHOICES[:self.THREADS]]
+        responses = self._book_concurrently(slots)
+
+        self.assertEqual([r.status_code for r in responses], [302] * len(slots))
+        self.assertEqual(SlotHold.objects.count(), len(slots))
@@ -5,4 +5,17 @@ urlpatterns = [
     path('create/', views.create_appointment, name='create_appointment'),
     path('list/', views.appointment_list, name='appointment_list'),
     path('success/', views.appointment_success, name='appointment_success'),
+    path('availability/', views.slot_availability, name='slot_availability'),
+    path('availability/month/', views.month_availability, name='month_availability'),
+    path('api/', views.appointment_query, name='appointment_query'),
+]
+
+# Same routes served by the async views, used by sofia_health.urls_async
+async_urlpatterns = [
+    path('create/', views.create_appointment_async, name='create_appointment'),
+    path('list/', views.appointment_list, name='appointment_list'),
+    path('success/', views.appointment_success_async, name='appointment_success'),
+    path('availability/', views.slot_availability, name='slot_availability'),
+    path('availability/month/', views.month_availability, name='month_availability'),
+    path('api/', views.appointment_query, name='appointment_query'),
 ]
@@ -1,7 +1,50 @@
+from datetime import MAXYEAR, MINYEAR, date
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.conf import settings
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
+from sofia_health.routers import replica_reads
+from . import api, availability, caching, conditional, flow
 from .forms import AppointmentForm
-from .models import Appointment
+from .models import Appointment, SlotTaken
+from .pagination import KeysetPaginator, InvalidCursor
+from .providers import get_provider_name
+
+
+def _parse_id(value):
+    """Return ``value`` as a positive integer id, or None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 < value <= api.MAX_ID else None
+
+
+def _bookable_year(year):
+    """Whether a day in ``year`` and its neighbours can be turned into datetimes."""
+    return MINYEAR < year < MAXYEAR
+
+
+def _page_size(request):
+    """Return the requested page size, clamped to APPOINTMENTS_MAX_PAGE_SIZE."""
+    page_size = settings.APPOINTMENTS_PAGE_SIZE
+    try:
+        requested_size = int(request.GET.get('page_size', page_size))
+        page_size = max(1, min(requested_size, settings.APPOINTMENTS_MAX_PAGE_SIZE))
+    except ValueError:
+        pass
+    return page_size
+
+
+def _slot_taken(request, form):
+    """Report that another booking won the slot between validation and save."""
+    form.add_error('appointment_time_slot', 'This time slot was just booked. Please choose another.')
+    messages.error(request, 'Please correct the errors below.')
 
 
 def create_appointment(request):
@@ -11,12 +54,16 @@ def create_appointment(request):
         form = AppointmentForm(request.POST)
 
         if form.is_valid():
-            # Save appointment to database
-            appointment = form.save()
-            # Store appointment ID in session for payment flow
-            request.session['pending_appointment_id'] = appointment.id
-            # Redirect to payment page
-            return redirect('payment_create')
+            try:
+                # Save appointment to database
+                appointment = form.save()
+            except SlotTaken:
+                _slot_taken(request, form)
+            else:
+                # Remember the appointment for the payment page
+                response = redirect('payment_create')
+                flow.remember(request, response, flow.PENDING, appointment.id)
+                return response
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
@@ -30,42 +77,250 @@ def create_appointment(request):
     return render(request, 'appointments/create.html', context)
 
 
+@replica_reads
 def appointment_list(request):
-    """View for listing all appointments."""
+    """
+    View for listing appointments one keyset page at a time.
 
-    appointments = Appointment.objects.all().order_by('-appointment_time')
-    paid_count = appointments.filter(is_paid=True).count()
-    pending_count = appointments.filter(is_paid=False).count()
+    Pages and counters are cached under versioned keys (see
+    ``appointments.caching``) that every appointment write retires. A
+    client whose copy is current gets 304 without the page being fetched
+    or rendered (see ``appointments.conditional``).
+    """
+
+    page_size = _page_size(request)
+
+    provider_id = _parse_id(request.GET.get('provider'))
+    provider_name = get_provider_name(provider_id) if provider_id else None
+    if provider_name is None:
+        provider_id = None
+
+    queryset = Appointment.objects.select_related('provider')
+    if provider_id:
+        queryset = queryset.filter(provider_id=provider_id)
+
+    # Newest update, row count and the paid/pending totals in one aggregate;
+    # cached like the pages, as every write retires both
+    state = caching.get_or_set(
+        'state',
+        caching.scoped_key('state', provider_id),
+        lambda: conditional.list_state(
+            queryset,
+            paid_count=Count('id', filter=Q(is_paid=True)),
+            pending_count=Count('id', filter=Q(is_paid=False)),
+        ),
+    )
+    etag = conditional.make_etag(state, provider_name)
+    response = conditional.not_modified(request, etag, state)
+    if response is not None:
+        return response
+
+    paginator = KeysetPaginator(queryset, page_size)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    try:
+        page = caching.get_or_set(
+            'page',
+            caching.scoped_key('page', provider_id, page_size, after, before),
+            lambda: paginator.get_page(after=after, before=before),
+        )
+    except InvalidCursor:
+        messages.warning(request, 'Invalid page link, showing the latest appointments.')
+        page = caching.get_or_set(
+            'page',
+            caching.scoped_key('page', provider_id, page_size, None, None),
+            paginator.get_page,
+        )
 
     context = {
-        'appointments': appointments,
-        'paid_count': paid_count,
-        'pending_count': pending_count,
+        'appointments': page,
+        'page': page,
+        'page_size': page_size,
+        'provider_id': provider_id,
+        'provider_name': provider_name,
+        'paid_count': state['paid_count'],
+        'pending_count': state['pending_count'],
+        'total_count': state['row_count'],
         'title': 'Appointments'
     }
 
-    return render(request, 'appointments/list.html', context)
+    response = render(request, 'appointments/list.html', context)
+    return conditional.set_validators(response, etag, state)
 
 
+@replica_reads
 def appointment_success(request):
     """View shown after successful appointment booking and payment."""
 
-    appointment_id = request.session.get('completed_appointment_id')
+    appointment_id = flow.recall(request, flow.COMPLETED)
 
     if appointment_id:
         try:
-            appointment = Appointment.objects.get(id=appointment_id)
-            # Clear session
-            del request.session['completed_appointment_id']
+            appointment = Appointment.objects.select_related('provider').get(id=appointment_id)
 
             context = {
                 'appointment': appointment,
                 'title': 'Booking Confirmed'
             }
 
-            return render(request, 'appointments/success.html', context)
+            response = render(request, 'appointments/success.html', context)
+            # Only shown once
+            flow.forget(request, response, flow.COMPLETED)
+            return response
         except Appointment.DoesNotExist:
             pass
 
     messages.warning(request, 'No appointment found.')
     return redirect('create_appointment')
+
+
+def _validate_appointment_form(data):
+    """Bind and validate the form; clean() reads the availability cache."""
+    form = AppointmentForm(data)
+    form.is_valid()
+    return form
+
+
+async def create_appointment_async(request):
+    """Async version of ``create_appointment`` for ASGI deployments."""
+
+    if request.method == 'POST':
+        form = await sync_to_async(_validate_appointment_form)(request.POST)
+
+        if form.is_valid():
+            appointment = form.save(commit=False)
+            try:
+                await appointment.asave()
+            except SlotTaken:
+                _slot_taken(request, form)
+            else:
+                response = redirect('payment_create')
+                await flow.aremember(request, response, flow.PENDING, appointment.id)
+                return response
+        else:
+            messages.error(request, 'Please correct the errors below.')
+    else:
+        # __init__ loads the provider choices, from the database on a cold cache
+        form = await sync_to_async(AppointmentForm)()
+
+    context = {
+        'form': form,
+        'title': 'Book Appointment'
+    }
+
+    return render(request, 'appointments/create.html', context)
+
+
+@replica_reads
+async def appointment_success_async(request):
+    """Async version of ``appointment_success`` for ASGI deployments."""
+
+    appointment_id = await flow.arecall(request, flow.COMPLETED)
+
+    if appointment_id:
+        try:
+            appointment = await Appointment.objects.select_related('provider').aget(id=appointment_id)
+
+            context = {
+                'appointment': appointment,
+                'title': 'Booking Confirmed'
+            }
+
+            response = render(request, 'appointments/success.html', context)
+            await flow.aforget(request, response, flow.COMPLETED)
+            return response
+        except Appointment.DoesNotExist:
+            pass
+
+    messages.warning(request, 'No appointment found.')
+    return redirect('create_appointment')
+
+
+@require_GET
+def slot_availability(request):
+    """
+    API endpoint returning the booked slots for a provider on a given day.
+    """
+    provider_id = _parse_id(request.GET.get('provider'))
+    try:
+        day = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        day = None
+    if day is not None and not _bookable_year(day.year):
+        day = None
+
+    if not provider_id or day is None:
+        return JsonResponse({'error': 'provider and date are required'}, status=400)
+
+    bitmap = availability.get_day_bitmap(provider_id, day)
+
+    return JsonResponse({
+        'date': day.isoformat(),
+        'bitmap': bitmap,
+        'booked': availability.booked_slots(bitmap),
+    })
+
+
+@require_GET
+def month_availability(request):
+    """
+    API endpoint returning a provider's booked slots for every day of a month.
+
+    ``days`` holds one bitmap per day of the month; bit ``i`` is set when
+    the ``i``-th entry of ``slots`` is taken.
+    """
+    provider_id = _parse_id(request.GET.get('provider'))
+    try:
+        year, month = (int(part) for part in request.GET.get('month', '').split('-'))
+        date(year, month, 1)
+        if not _bookable_year(year):
+            raise ValueError(year)
+    except ValueError:
+        year = month = None
+
+    if not provider_id or month is None:
+        return JsonResponse({'error': 'provider and month (YYYY-MM) are required'}, status=400)
+
+    return JsonResponse({
+        'month': f'{year:04d}-{month:02d}',
+        'slots': list(availability.SLOT_INDEX),
+        'days': availability.get_month_bitmaps(provider_id, year, month),
+    })
+
+
+@replica_reads
+@require_GET
+def appointment_query(request):
+    """
+    JSON API listing appointments newest-first, one keyset page at a time.
+
+    Filters by ``provider``, ``date_from``/``date_to`` and ``is_paid``;
+    ``fields`` selects the columns returned and ``after``/``before`` take the
+    cursors of a previous response. Rows are read with ``.values()``, so only
+    the requested columns are loaded and no model instances are built. A
+    client whose copy is current gets 304 (see ``appointments.conditional``).
+    """
+    try:
+        fields, columns, expressions = api.projection(request.GET.get('fields', ''))
+        queryset = api.filter_queryset(Appointment.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    state = conditional.list_state(queryset)
+    etag = conditional.make_etag(state)
+    response = conditional.not_modified(request, etag, state)
+    if response is not None:
+        return response
+
+    paginator = KeysetPaginator(queryset.values(*columns, **expressions), _page_size(request))
+    try:
+        page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+
+    response = JsonResponse({
+        'results': [{name: row[name] for name in fields} for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+    return conditional.set_validators(response, etag, state)
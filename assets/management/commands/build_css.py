@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.tailwind import generate, scan
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the Tailwind stylesheet from the classes used in '
+        'TAILWIND_CONTENT into TAILWIND_OUTPUT: only the utilities the '
+        'templates use, minified. Needs no network or Node.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if the stylesheet is out of date instead of writing it')
+
+    def handle(self, *args, **options):
+        css, classes = generate(scan(settings.TAILWIND_CONTENT))
+        output = Path(settings.TAILWIND_OUTPUT)
+
+        if options['check']:
+            if not output.exists() or output.read_text(encoding='utf-8') != css:
+                raise CommandError(f'{output} is out of date; run python manage.py build_css')
+            self.stdout.write(f'{output} is up to date')
+            return
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(css, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {output}: {len(classes)} utilities, {len(css.encode()) / 1024:.1f} KiB'
+        ))
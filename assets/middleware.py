@@ -0,0 +1,117 @@
+"""
+Serve collected static files from the application server.
+
+For deployments without a web server in front of Django for ``/static/``
+(``SERVE_STATIC=True``, the default when ``DEBUG`` is off). Files are read
+from ``STATIC_ROOT`` as ``collectstatic`` left them:
+
+- A precompressed ``.br`` or ``.gz`` copy is sent when the client accepts
+  it, with ``Vary: Accept-Encoding``; nothing is compressed per request.
+- Content-hashed names (``app.3f2a9c1b.css``) never change content, so they
+  are cached for a year as immutable; other names for ``STATIC_MAX_AGE``.
+- ``ETag``/``If-None-Match`` answer revalidations with 304.
+"""
+
+import mimetypes
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+
+# ManifestStaticFilesStorage inserts the first 12 hex digits of the MD5
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+class StaticFilesMiddleware:
+    """Answer requests under STATIC_URL from STATIC_ROOT, before any other work."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVE_STATIC or not settings.STATIC_ROOT or '://' in settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.root = str(settings.STATIC_ROOT)
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def find(self, path):
+        """Return the file under STATIC_ROOT for a request path, or None."""
+        if not path.startswith(self.prefix):
+            return None
+        try:
+            filename = safe_join(self.root, path[len(self.prefix):])
+        except SuspiciousFileOperation:
+            return None
+        return filename if os.path.isfile(filename) else None
+
+    def serve(self, request):
+        """
+        Build the response for a static file.
+
+        Returns:
+            The response, or None if the request is not for a collected file
+        """
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        filename = self.find(request.path_info)
+        if filename is None:
+            return None
+
+        accepted = {
+            token.split(';')[0].strip()
+            for token in request.headers.get('Accept-Encoding', '').split(',')
+            if not token.replace(' ', '').endswith(';q=0')
+        }
+        variants = [(encoding, filename + suffix) for encoding, suffix in ENCODINGS
+                    if os.path.isfile(filename + suffix)]
+        encoding, chosen = next(
+            ((encoding, path) for encoding, path in variants if encoding in accepted),
+            (None, filename),
+        )
+
+        stat = os.stat(chosen)
+        headers = {
+            'ETag': f'"{int(stat.st_mtime):x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"',
+            'Last-Modified': http_date(stat.st_mtime),
+            'Cache-Control': (
+                IMMUTABLE if HASHED_NAME_RE.search(filename)
+                else f'public, max-age={settings.STATIC_MAX_AGE}'
+            ),
+        }
+        if variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if request.headers.get('If-None-Match') == headers['ETag']:
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=content_type)
+            else:
+                response = FileResponse(open(chosen, 'rb'), content_type=content_type)
+                del response['Content-Disposition']
+            response['Content-Length'] = str(stat.st_size)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response[header] = value
+        return response
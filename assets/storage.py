@@ -0,0 +1,67 @@
+"""
+Static files storage for production.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` writes each
+file under a content-hashed name (``app.3f2a9c1b.css``), so its URL changes
+whenever its content does and it can be cached forever, and writes gzip
+and brotli copies of text files next to it (``app.3f2a9c1b.css.gz``,
+``.br``); the brotli copies are skipped where the ``brotli`` package (in
+requirements.txt) is not installed. Compression
+happens once at deploy, not per request: ``StaticFilesMiddleware`` or
+nginx (``gzip_static``/``brotli_static``) serve the copies as they are.
+"""
+
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico')
+
+
+def compress(path: str) -> list:
+    """
+    Write the .gz (and .br) copies of a file when they are smaller.
+
+    Returns:
+        List of the paths written
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoders = [('.gz', lambda content: gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('.br', lambda content: brotli.compress(content, quality=11)))
+
+    written = []
+    for suffix, encode in encoders:
+        compressed = encode(data)
+        if len(compressed) >= len(data):
+            continue
+        with open(path + suffix, 'wb') as f:
+            f.write(compressed)
+        written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also precompresses the text files it collects."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception) and not dry_run:
+                processed_names.append(hashed_name or name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+
+        # Both the original and the hashed copy, as either may be requested
+        names = set(paths) | set(processed_names)
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress(self.path(name))
@@ -0,0 +1,679 @@
+"""
+Offline Tailwind CSS build.
+
+Generates the stylesheet for the Tailwind utility classes the templates
+use, without Node, the Tailwind CLI or the network. ``scan`` collects
+candidate class names from the template sources (markup and inline
+scripts alike, as Tailwind's own scanner does) and ``generate`` emits
+preflight plus a rule for each candidate that is a known utility, in
+Tailwind's layer and variant order, minified. Unknown candidates are
+ignored, so the output only holds what the pages can use.
+
+The utilities and theme follow Tailwind v3's defaults, extended with the
+project colours ``primary`` and ``secondary``. A utility the templates start
+using that is not covered here produces no rule: add its values to the
+tables below and rebuild with ``python manage.py build_css``.
+"""
+
+import glob
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# -- Theme --------------------------------------------------------------------
+
+PALETTE = {
+    'gray': ['#f9fafb', '#f3f4f6', '#e5e7eb', '#d1d5db', '#9ca3af', '#6b7280', '#4b5563', '#374151', '#1f2937', '#111827', '#030712'],
+    'red': ['#fef2f2', '#fee2e2', '#fecaca', '#fca5a5', '#f87171', '#ef4444', '#dc2626', '#b91c1c', '#991b1b', '#7f1d1d', '#450a0a'],
+    'orange': ['#fff7ed', '#ffedd5', '#fed7aa', '#fdba74', '#fb923c', '#f97316', '#ea580c', '#c2410c', '#9a3412', '#7c2d12', '#431407'],
+    'yellow': ['#fefce8', '#fef9c3', '#fef08a', '#fde047', '#facc15', '#eab308', '#ca8a04', '#a16207', '#854d0e', '#713f12', '#422006'],
+    'green': ['#f0fdf4', '#dcfce7', '#bbf7d0', '#86efac', '#4ade80', '#22c55e', '#16a34a', '#15803d', '#166534', '#14532d', '#052e16'],
+    'emerald': ['#ecfdf5', '#d1fae5', '#a7f3d0', '#6ee7b7', '#34d399', '#10b981', '#059669', '#047857', '#065f46', '#064e3b', '#022c22'],
+    'teal': ['#f0fdfa', '#ccfbf1', '#99f6e4', '#5eead4', '#2dd4bf', '#14b8a6', '#0d9488', '#0f766e', '#115e59', '#134e4a', '#042f2e'],
+    'blue': ['#eff6ff', '#dbeafe', '#bfdbfe', '#93c5fd', '#60a5fa', '#3b82f6', '#2563eb', '#1d4ed8', '#1e40af', '#1e3a8a', '#172554'],
+    'indigo': ['#eef2ff', '#e0e7ff', '#c7d2fe', '#a5b4fc', '#818cf8', '#6366f1', '#4f46e5', '#4338ca', '#3730a3', '#312e81', '#1e1b4b'],
+    'violet': ['#f5f3ff', '#ede9fe', '#ddd6fe', '#c4b5fd', '#a78bfa', '#8b5cf6', '#7c3aed', '#6d28d9', '#5b21b6', '#4c1d95', '#2e1065'],
+    'purple': ['#faf5ff', '#f3e8ff', '#e9d5ff', '#d8b4fe', '#c084fc', '#a855f7', '#9333ea', '#7e22ce', '#6b21a8', '#581c87', '#3b0764'],
+    'pink': ['#fdf2f8', '#fce7f3', '#fbcfe8', '#f9a8d4', '#f472b6', '#ec4899', '#db2777', '#be185d', '#9d174d', '#831843', '#500724'],
+}
+SHADES = ['50', '100', '200', '300', '400', '500', '600', '700', '800', '900', '950']
+
+COLORS = {'white': '#ffffff', 'black': '#000000', 'primary': '#3b82f6', 'secondary': '#10b981'}
+for _name, _values in PALETTE.items():
+    COLORS.update({f'{_name}-{shade}': value for shade, value in zip(SHADES, _values)})
+# Keywords usable wherever a colour is, but without an opacity modifier
+COLOR_KEYWORDS = {'transparent': 'transparent', 'current': 'currentColor', 'inherit': 'inherit'}
+
+SPACING = {
+    '0': '0px', 'px': '1px', '0.5': '0.125rem', '1': '0.25rem', '1.5': '0.375rem', '2': '0.5rem',
+    '2.5': '0.625rem', '3': '0.75rem', '3.5': '0.875rem', '4': '1rem', '5': '1.25rem', '6': '1.5rem',
+    '7': '1.75rem', '8': '2rem', '9': '2.25rem', '10': '2.5rem', '11': '2.75rem', '12': '3rem',
+    '14': '3.5rem', '16': '4rem', '20': '5rem', '24': '6rem', '28': '7rem', '32': '8rem', '36': '9rem',
+    '40': '10rem', '44': '11rem', '48': '12rem', '52': '13rem', '56': '14rem', '60': '15rem',
+    '64': '16rem', '72': '18rem', '80': '20rem', '96': '24rem',
+}
+FRACTIONS = {
+    '1/2': '50%', '1/3': '33.333333%', '2/3': '66.666667%', '1/4': '25%', '3/4': '75%',
+    '1/5': '20%', '2/5': '40%', '3/5': '60%', '4/5': '80%', 'full': '100%',
+}
+INSET = {**SPACING, **FRACTIONS, 'auto': 'auto'}
+SIZES = {**SPACING, **FRACTIONS, 'auto': 'auto', 'min': 'min-content', 'max': 'max-content', 'fit': 'fit-content'}
+WIDTHS = {**SIZES, 'screen': '100vw'}
+HEIGHTS = {**SIZES, 'screen': '100vh'}
+MIN_WIDTHS = {'0': '0px', 'full': '100%', 'min': 'min-content', 'max': 'max-content', 'fit': 'fit-content'}
+MIN_HEIGHTS = {'0': '0px', 'full': '100%', 'screen': '100vh', 'min': 'min-content', 'max': 'max-content', 'fit': 'fit-content'}
+MAX_WIDTHS = {
+    '0': '0rem', 'none': 'none', 'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem',
+    '2xl': '42rem', '3xl': '48rem', '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem',
+    'full': '100%', 'prose': '65ch',
+}
+MARGINS = {**SPACING, 'auto': 'auto'}
+
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'),
+    '6xl': ('3.75rem', '1'), '7xl': ('4.5rem', '1'), '8xl': ('6rem', '1'), '9xl': ('8rem', '1'),
+}
+FONT_WEIGHTS = {
+    'thin': '100', 'extralight': '200', 'light': '300', 'normal': '400', 'medium': '500',
+    'semibold': '600', 'bold': '700', 'extrabold': '800', 'black': '900',
+}
+LEADING = {
+    'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625', 'loose': '2',
+    '3': '.75rem', '4': '1rem', '5': '1.25rem', '6': '1.5rem', '7': '1.75rem', '8': '2rem',
+    '9': '2.25rem', '10': '2.5rem',
+}
+TRACKING = {
+    'tighter': '-0.05em', 'tight': '-0.025em', 'normal': '0em', 'wide': '0.025em',
+    'wider': '0.05em', 'widest': '0.1em',
+}
+RADII = {
+    'none': '0px', 'sm': '0.125rem', '': '0.25rem', 'md': '0.375rem', 'lg': '0.5rem',
+    'xl': '0.75rem', '2xl': '1rem', '3xl': '1.5rem', 'full': '9999px',
+}
+BORDER_WIDTHS = {'': '1px', '0': '0px', '2': '2px', '4': '4px', '8': '8px'}
+SHADOWS = {
+    'sm': ('0 1px 2px 0 rgb(0 0 0 / 0.05)', '0 1px 2px 0 var(--tw-shadow-color)'),
+    '': ('0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)',
+         '0 1px 3px 0 var(--tw-shadow-color), 0 1px 2px -1px var(--tw-shadow-color)'),
+    'md': ('0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)',
+           '0 4px 6px -1px var(--tw-shadow-color), 0 2px 4px -2px var(--tw-shadow-color)'),
+    'lg': ('0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+           '0 10px 15px -3px var(--tw-shadow-color), 0 4px 6px -4px var(--tw-shadow-color)'),
+    'xl': ('0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+           '0 20px 25px -5px var(--tw-shadow-color), 0 8px 10px -6px var(--tw-shadow-color)'),
+    '2xl': ('0 25px 50px -12px rgb(0 0 0 / 0.25)', '0 25px 50px -12px var(--tw-shadow-color)'),
+    'inner': ('inset 0 2px 4px 0 rgb(0 0 0 / 0.05)', 'inset 0 2px 4px 0 var(--tw-shadow-color)'),
+    'none': ('0 0 #0000', '0 0 #0000'),
+}
+RING_WIDTHS = {'': '3px', '0': '0px', '1': '1px', '2': '2px', '4': '4px', '8': '8px'}
+BLURS = {
+    'none': '0', 'sm': '4px', '': '8px', 'md': '12px', 'lg': '16px', 'xl': '24px',
+    '2xl': '40px', '3xl': '64px',
+}
+OPACITIES = {str(n): str(n / 100).rstrip('0').rstrip('.') if n % 100 else str(n // 100) for n in
+             (0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100)}
+SCALES = {n: str(int(n) / 100).rstrip('0').rstrip('.') if int(n) % 100 else str(int(n) // 100) for n in
+          ('0', '50', '75', '90', '95', '100', '105', '110', '125', '150')}
+Z_INDEX = {'0': '0', '10': '10', '20': '20', '30': '30', '40': '40', '50': '50', 'auto': 'auto'}
+DURATIONS = {n: f'{n}ms' for n in ('0', '75', '100', '150', '200', '300', '500', '700', '1000')}
+GRADIENT_DIRECTIONS = {
+    't': 'to top', 'tr': 'to top right', 'r': 'to right', 'br': 'to bottom right',
+    'b': 'to bottom', 'bl': 'to bottom left', 'l': 'to left', 'tl': 'to top left',
+}
+
+SCREENS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px', '2xl': '1536px'}
+
+# Pseudo-class variants, in the order Tailwind emits them
+PSEUDO_VARIANTS = {
+    'first': ':first-child', 'last': ':last-child', 'focus-within': ':focus-within',
+    'hover': ':hover', 'focus': ':focus', 'focus-visible': ':focus-visible',
+    'active': ':active', 'disabled': ':disabled',
+}
+GROUP_VARIANTS = {'group-hover': ':hover', 'group-focus': ':focus'}
+VARIANT_ORDER = [*PSEUDO_VARIANTS, *GROUP_VARIANTS]
+
+TRANSFORM = (
+    'translate(var(--tw-translate-x), var(--tw-translate-y)) rotate(var(--tw-rotate)) '
+    'skewX(var(--tw-skew-x)) skewY(var(--tw-skew-y)) scaleX(var(--tw-scale-x)) scaleY(var(--tw-scale-y))'
+)
+FILTER = (
+    'var(--tw-blur) var(--tw-brightness) var(--tw-contrast) var(--tw-grayscale) var(--tw-hue-rotate) '
+    'var(--tw-invert) var(--tw-saturate) var(--tw-sepia) var(--tw-drop-shadow)'
+)
+BACKDROP_FILTER = (
+    'var(--tw-backdrop-blur) var(--tw-backdrop-brightness) var(--tw-backdrop-contrast) '
+    'var(--tw-backdrop-grayscale) var(--tw-backdrop-hue-rotate) var(--tw-backdrop-invert) '
+    'var(--tw-backdrop-opacity) var(--tw-backdrop-saturate) var(--tw-backdrop-sepia)'
+)
+TRANSITION_TIMING = 'transition-timing-function:cubic-bezier(0.4, 0, 0.2, 1);transition-duration:150ms'
+SPACE_CHILDREN = ' > :not([hidden]) ~ :not([hidden])'
+
+KEYFRAMES = {
+    'spin': '@keyframes spin{to{transform:rotate(360deg)}}',
+    'ping': '@keyframes ping{75%,100%{transform:scale(2);opacity:0}}',
+    'pulse': '@keyframes pulse{50%{opacity:.5}}',
+    'bounce': (
+        '@keyframes bounce{0%,100%{transform:translateY(-25%);animation-timing-function:cubic-bezier(0.8,0,1,1)}'
+        '50%{transform:none;animation-timing-function:cubic-bezier(0,0,0.2,1)}}'
+    ),
+}
+ANIMATIONS = {
+    'none': 'none', 'spin': 'spin 1s linear infinite', 'ping': 'ping 1s cubic-bezier(0, 0, 0.2, 1) infinite',
+    'pulse': 'pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite', 'bounce': 'bounce 1s infinite',
+}
+
+# Preflight (Tailwind's base layer) and the defaults of the variables the
+# composable utilities (transforms, filters, rings, shadows) read
+PREFLIGHT = """
+*, ::before, ::after {
+    box-sizing: border-box; border-width: 0; border-style: solid; border-color: #e5e7eb;
+    --tw-translate-x: 0; --tw-translate-y: 0; --tw-rotate: 0; --tw-skew-x: 0; --tw-skew-y: 0;
+    --tw-scale-x: 1; --tw-scale-y: 1;
+    --tw-ring-inset: ; --tw-ring-offset-width: 0px; --tw-ring-offset-color: #fff;
+    --tw-ring-color: rgb(59 130 246 / 0.5); --tw-ring-offset-shadow: 0 0 #0000; --tw-ring-shadow: 0 0 #0000;
+    --tw-shadow: 0 0 #0000; --tw-shadow-colored: 0 0 #0000;
+    --tw-blur: ; --tw-brightness: ; --tw-contrast: ; --tw-grayscale: ; --tw-hue-rotate: ; --tw-invert: ;
+    --tw-saturate: ; --tw-sepia: ; --tw-drop-shadow: ;
+    --tw-backdrop-blur: ; --tw-backdrop-brightness: ; --tw-backdrop-contrast: ; --tw-backdrop-grayscale: ;
+    --tw-backdrop-hue-rotate: ; --tw-backdrop-invert: ; --tw-backdrop-opacity: ; --tw-backdrop-saturate: ;
+    --tw-backdrop-sepia: ;
+}
+html, :host {
+    line-height: 1.5; -webkit-text-size-adjust: 100%; tab-size: 4;
+    font-family: ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol", "Noto Color Emoji";
+    -webkit-tap-highlight-color: transparent;
+}
+body { margin: 0; line-height: inherit; }
+hr { height: 0; color: inherit; border-top-width: 1px; }
+abbr:where([title]) { text-decoration: underline dotted; }
+h1, h2, h3, h4, h5, h6 { font-size: inherit; font-weight: inherit; }
+a { color: inherit; text-decoration: inherit; }
+b, strong { font-weight: bolder; }
+code, kbd, samp, pre {
+    font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;
+    font-size: 1em;
+}
+small { font-size: 80%; }
+sub, sup { font-size: 75%; line-height: 0; position: relative; vertical-align: baseline; }
+sub { bottom: -0.25em; }
+sup { top: -0.5em; }
+table { text-indent: 0; border-color: inherit; border-collapse: collapse; }
+button, input, optgroup, select, textarea {
+    font-family: inherit; font-feature-settings: inherit; font-variation-settings: inherit;
+    font-size: 100%; font-weight: inherit; line-height: inherit; letter-spacing: inherit;
+    color: inherit; margin: 0; padding: 0;
+}
+button, select { text-transform: none; }
+button, input:where([type='button']), input:where([type='reset']), input:where([type='submit']) {
+    -webkit-appearance: button; background-color: transparent; background-image: none;
+}
+:-moz-focusring { outline: auto; }
+:-moz-ui-invalid { box-shadow: none; }
+progress { vertical-align: baseline; }
+::-webkit-inner-spin-button, ::-webkit-outer-spin-button { height: auto; }
+[type='search'] { -webkit-appearance: textfield; outline-offset: -2px; }
+::-webkit-search-decoration { -webkit-appearance: none; }
+::-webkit-file-upload-button { -webkit-appearance: button; font: inherit; }
+summary { display: list-item; }
+blockquote, dl, dd, h1, h2, h3, h4, h5, h6, hr, figure, p, pre { margin: 0; }
+fieldset { margin: 0; padding: 0; }
+legend { padding: 0; }
+ol, ul, menu { list-style: none; margin: 0; padding: 0; }
+dialog { padding: 0; }
+textarea { resize: vertical; }
+input::placeholder, textarea::placeholder { opacity: 1; color: #9ca3af; }
+button, [role="button"] { cursor: pointer; }
+:disabled { cursor: default; }
+img, svg, video, canvas, audio, iframe, embed, object { display: block; vertical-align: middle; }
+img, video { max-width: 100%; height: auto; }
+[hidden]:where(:not([hidden="until-found"])) { display: none; }
+"""
+
+
+# -- Utilities ----------------------------------------------------------------
+
+# Order of the utility families in the output; a later family wins over an
+# earlier one on the same element, as in Tailwind's core plugin order
+FAMILIES = [
+    'position', 'inset', 'z-index', 'margin', 'display', 'height', 'min-height', 'width', 'min-width',
+    'max-width', 'flex', 'flex-shrink', 'translate', 'scale', 'transform', 'animation', 'cursor',
+    'grid-columns', 'flex-direction', 'flex-wrap', 'align-items', 'justify-content', 'gap', 'space',
+    'divide-width', 'divide-color', 'overflow', 'truncate', 'whitespace', 'border-radius',
+    'border-width', 'border-color', 'background-color', 'background-image', 'gradient-from',
+    'gradient-via', 'gradient-to', 'background-clip', 'padding', 'text-align', 'vertical-align',
+    'font-size', 'font-weight', 'text-transform', 'line-height', 'letter-spacing', 'text-color',
+    'opacity', 'mix-blend', 'box-shadow', 'shadow-color', 'outline', 'ring-width', 'ring-color',
+    'ring-offset-width', 'filter', 'backdrop-filter', 'transition', 'duration',
+]
+FAMILY_INDEX = {family: i for i, family in enumerate(FAMILIES)}
+
+STATIC_UTILITIES = {
+    'static': ('position', 'position:static'),
+    'fixed': ('position', 'position:fixed'),
+    'absolute': ('position', 'position:absolute'),
+    'relative': ('position', 'position:relative'),
+    'sticky': ('position', 'position:sticky'),
+    'block': ('display', 'display:block'),
+    'inline-block': ('display', 'display:inline-block'),
+    'inline': ('display', 'display:inline'),
+    'flex': ('display', 'display:flex'),
+    'inline-flex': ('display', 'display:inline-flex'),
+    'table': ('display', 'display:table'),
+    'grid': ('display', 'display:grid'),
+    'contents': ('display', 'display:contents'),
+    'hidden': ('display', 'display:none'),
+    'flex-1': ('flex', 'flex:1 1 0%'),
+    'flex-auto': ('flex', 'flex:1 1 auto'),
+    'flex-none': ('flex', 'flex:none'),
+    'flex-shrink-0': ('flex-shrink', 'flex-shrink:0'),
+    'shrink-0': ('flex-shrink', 'flex-shrink:0'),
+    'transform': ('transform', f'transform:{TRANSFORM}'),
+    'transform-none': ('transform', 'transform:none'),
+    'cursor-pointer': ('cursor', 'cursor:pointer'),
+    'cursor-not-allowed': ('cursor', 'cursor:not-allowed'),
+    'cursor-default': ('cursor', 'cursor:default'),
+    'flex-row': ('flex-direction', 'flex-direction:row'),
+    'flex-col': ('flex-direction', 'flex-direction:column'),
+    'flex-wrap': ('flex-wrap', 'flex-wrap:wrap'),
+    'items-start': ('align-items', 'align-items:flex-start'),
+    'items-end': ('align-items', 'align-items:flex-end'),
+    'items-center': ('align-items', 'align-items:center'),
+    'items-baseline': ('align-items', 'align-items:baseline'),
+    'items-stretch': ('align-items', 'align-items:stretch'),
+    'justify-start': ('justify-content', 'justify-content:flex-start'),
+    'justify-end': ('justify-content', 'justify-content:flex-end'),
+    'justify-center': ('justify-content', 'justify-content:center'),
+    'justify-between': ('justify-content', 'justify-content:space-between'),
+    'justify-around': ('justify-content', 'justify-content:space-around'),
+    'overflow-auto': ('overflow', 'overflow:auto'),
+    'overflow-hidden': ('overflow', 'overflow:hidden'),
+    'overflow-x-auto': ('overflow', 'overflow-x:auto'),
+    'overflow-y-auto': ('overflow', 'overflow-y:auto'),
+    'truncate': ('truncate', 'overflow:hidden;text-overflow:ellipsis;white-space:nowrap'),
+    'whitespace-nowrap': ('whitespace', 'white-space:nowrap'),
+    'whitespace-normal': ('whitespace', 'white-space:normal'),
+    'bg-clip-border': ('background-clip', 'background-clip:border-box'),
+    'bg-clip-padding': ('background-clip', 'background-clip:padding-box'),
+    'bg-clip-content': ('background-clip', 'background-clip:content-box'),
+    'bg-clip-text': ('background-clip', '-webkit-background-clip:text;background-clip:text'),
+    'text-left': ('text-align', 'text-align:left'),
+    'text-center': ('text-align', 'text-align:center'),
+    'text-right': ('text-align', 'text-align:right'),
+    'align-top': ('vertical-align', 'vertical-align:top'),
+    'align-middle': ('vertical-align', 'vertical-align:middle'),
+    'align-bottom': ('vertical-align', 'vertical-align:bottom'),
+    'uppercase': ('text-transform', 'text-transform:uppercase'),
+    'lowercase': ('text-transform', 'text-transform:lowercase'),
+    'capitalize': ('text-transform', 'text-transform:capitalize'),
+    'mix-blend-multiply': ('mix-blend', 'mix-blend-mode:multiply'),
+    'mix-blend-normal': ('mix-blend', 'mix-blend-mode:normal'),
+    'outline-none': ('outline', 'outline:2px solid transparent;outline-offset:2px'),
+    'filter': ('filter', f'filter:{FILTER}'),
+    'filter-none': ('filter', 'filter:none'),
+    'transition': (
+        'transition',
+        'transition-property:color, background-color, border-color, text-decoration-color, fill, stroke, '
+        f'opacity, box-shadow, transform, filter, backdrop-filter;{TRANSITION_TIMING}',
+    ),
+    'transition-all': ('transition', f'transition-property:all;{TRANSITION_TIMING}'),
+    'transition-colors': (
+        'transition',
+        'transition-property:color, background-color, border-color, text-decoration-color, fill, stroke;'
+        f'{TRANSITION_TIMING}',
+    ),
+    'transition-opacity': ('transition', f'transition-property:opacity;{TRANSITION_TIMING}'),
+    'transition-shadow': ('transition', f'transition-property:box-shadow;{TRANSITION_TIMING}'),
+    'transition-transform': ('transition', f'transition-property:transform;{TRANSITION_TIMING}'),
+    'transition-none': ('transition', 'transition-property:none'),
+}
+
+SIDES = {
+    '': ['{p}'],
+    'x': ['{p}-left', '{p}-right'],
+    'y': ['{p}-top', '{p}-bottom'],
+    't': ['{p}-top'],
+    'r': ['{p}-right'],
+    'b': ['{p}-bottom'],
+    'l': ['{p}-left'],
+}
+
+# (prefix, family, CSS properties, values, negative values allowed)
+FUNCTIONAL_UTILITIES = [
+    ('inset', 'inset', ['inset'], INSET, True),
+    ('inset-x', 'inset', ['left', 'right'], INSET, True),
+    ('inset-y', 'inset', ['top', 'bottom'], INSET, True),
+    ('top', 'inset', ['top'], INSET, True),
+    ('right', 'inset', ['right'], INSET, True),
+    ('bottom', 'inset', ['bottom'], INSET, True),
+    ('left', 'inset', ['left'], INSET, True),
+    ('z', 'z-index', ['z-index'], Z_INDEX, True),
+    *[(f'm{side}', 'margin', [p.format(p='margin') for p in props], MARGINS, True)
+      for side, props in SIDES.items()],
+    ('h', 'height', ['height'], HEIGHTS, False),
+    ('min-h', 'min-height', ['min-height'], MIN_HEIGHTS, False),
+    ('w', 'width', ['width'], WIDTHS, False),
+    ('min-w', 'min-width', ['min-width'], MIN_WIDTHS, False),
+    ('max-w', 'max-width', ['max-width'], MAX_WIDTHS, False),
+    ('gap', 'gap', ['gap'], SPACING, False),
+    ('gap-x', 'gap', ['column-gap'], SPACING, False),
+    ('gap-y', 'gap', ['row-gap'], SPACING, False),
+    *[(f'p{side}', 'padding', [p.format(p='padding') for p in props], SPACING, False)
+      for side, props in SIDES.items()],
+    ('font', 'font-weight', ['font-weight'], FONT_WEIGHTS, False),
+    ('leading', 'line-height', ['line-height'], LEADING, False),
+    ('tracking', 'letter-spacing', ['letter-spacing'], TRACKING, True),
+    ('opacity', 'opacity', ['opacity'], OPACITIES, False),
+    ('duration', 'duration', ['transition-duration'], DURATIONS, False),
+    ('animate', 'animation', ['animation'], ANIMATIONS, False),
+]
+
+ARBITRARY_RE = re.compile(r'^\[([^\]]+)\]$')
+COLOR_RE = re.compile(r'^(?P<color>[a-z]+(?:-\d{2,3})?)(?:/(?P<alpha>\d{1,3}))?$')
+
+
+def _rgb(hex_color: str) -> str:
+    value = hex_color.lstrip('#')
+    return ' '.join(str(int(value[i:i + 2], 16)) for i in (0, 2, 4))
+
+
+def resolve_color(value: str) -> Optional[Tuple[str, str]]:
+    """
+    Resolve a colour name with an optional ``/<opacity>`` modifier.
+
+    Returns:
+        Tuple of (CSS colour, the same colour fully transparent), or None
+    """
+    if value in COLOR_KEYWORDS:
+        return COLOR_KEYWORDS[value], 'rgb(255 255 255 / 0)'
+    match = COLOR_RE.match(value)
+    if not match or match['color'] not in COLORS:
+        return None
+    hex_color = COLORS[match['color']]
+    transparent = f'rgb({_rgb(hex_color)} / 0)'
+    if match['alpha'] is None:
+        return hex_color, transparent
+    if match['alpha'] not in OPACITIES:
+        return None
+    return f"rgb({_rgb(hex_color)} / {OPACITIES[match['alpha']]})", transparent
+
+
+def _lookup(values: Dict[str, str], key: str, negative: bool) -> Optional[str]:
+    arbitrary = ARBITRARY_RE.match(key)
+    if arbitrary:
+        value = arbitrary.group(1).replace('_', ' ')
+    elif key in values:
+        value = values[key]
+    else:
+        return None
+    if not negative or value in ('0', '0px'):
+        return value
+    # Only lengths and percentages can be negated ("-mx-auto" is not a utility)
+    return f'-{value}' if value[0].isdigit() else None
+
+
+def _functional(name: str) -> Optional[Tuple[str, str]]:
+    negative = name.startswith('-')
+    base = name[1:] if negative else name
+    # Longest prefix first, so "min-h-" is not read as "m" + "in-h-..."
+    for prefix, family, properties, values, allow_negative in sorted(
+            FUNCTIONAL_UTILITIES, key=lambda item: -len(item[0])):
+        if not base.startswith(prefix + '-') or (negative and not allow_negative):
+            continue
+        value = _lookup(values, base[len(prefix) + 1:], negative)
+        if value is None:
+            continue
+        return family, ';'.join(f'{prop}:{value}' for prop in properties)
+    return None
+
+
+def _utility(name: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Return (family, selector suffix, declarations) for a utility without variants.
+    """
+    if name in STATIC_UTILITIES:
+        family, declarations = STATIC_UTILITIES[name]
+        return family, '', declarations
+
+    if name.endswith('-'):
+        return None
+
+    functional = _functional(name)
+    if functional:
+        return functional[0], '', functional[1]
+
+    negative = name.startswith('-')
+    base = name[1:] if negative else name
+    sign = '-' if negative else ''
+
+    if base.startswith('translate-'):
+        axis, _, key = base[len('translate-'):].partition('-')
+        value = _lookup({**SPACING, **FRACTIONS}, key, negative)
+        if axis in ('x', 'y') and value is not None:
+            return 'translate', '', f'--tw-translate-{axis}:{value};transform:{TRANSFORM}'
+    if base.startswith('scale-') and not negative:
+        key = base[len('scale-'):]
+        axis = ''
+        if key[:2] in ('x-', 'y-'):
+            axis, key = key[0], key[2:]
+        if key in SCALES:
+            axes = [axis] if axis else ['x', 'y']
+            variables = ';'.join(f'--tw-scale-{a}:{sign}{SCALES[key]}' for a in axes)
+            return 'scale', '', f'{variables};transform:{TRANSFORM}'
+    if negative:
+        return None
+
+    if name.startswith('grid-cols-') and name[len('grid-cols-'):].isdigit():
+        count = name[len('grid-cols-'):]
+        return 'grid-columns', '', f'grid-template-columns:repeat({count}, minmax(0, 1fr))'
+
+    for axis, prop in (('x', 'margin-left'), ('y', 'margin-top')):
+        prefix = f'space-{axis}-'
+        if name.startswith(prefix) and name[len(prefix):] in SPACING:
+            return 'space', SPACE_CHILDREN, f'{prop}:{SPACING[name[len(prefix):]]}'
+
+    if name in ('divide-x', 'divide-y'):
+        side = 'left' if name == 'divide-x' else 'top'
+        return 'divide-width', SPACE_CHILDREN, f'border-{side}-width:1px'
+    if name.startswith('divide-'):
+        color = resolve_color(name[len('divide-'):])
+        if color:
+            return 'divide-color', SPACE_CHILDREN, f'border-color:{color[0]}'
+
+    if name == 'rounded' or name.startswith('rounded-'):
+        key = name[len('rounded-'):] if name != 'rounded' else ''
+        if key in RADII:
+            return 'border-radius', '', f'border-radius:{RADII[key]}'
+
+    if name == 'border' or name.startswith('border-'):
+        rest = name[len('border-'):] if name != 'border' else ''
+        side, _, width = rest.partition('-') if rest[:2] in ('t-', 'r-', 'b-', 'l-', 'x-', 'y-') else ('', '', rest)
+        if rest in ('t', 'r', 'b', 'l', 'x', 'y'):
+            side, width = rest, ''
+        if width in BORDER_WIDTHS:
+            properties = [p.format(p='border') + '-width' if side else 'border-width' for p in SIDES[side]]
+            return 'border-width', '', ';'.join(f'{prop}:{BORDER_WIDTHS[width]}' for prop in properties)
+        color = resolve_color(rest)
+        if color:
+            return 'border-color', '', f'border-color:{color[0]}'
+
+    if name.startswith('bg-gradient-to-'):
+        direction = GRADIENT_DIRECTIONS.get(name[len('bg-gradient-to-'):])
+        if direction:
+            return 'background-image', '', f'background-image:linear-gradient({direction}, var(--tw-gradient-stops))'
+    if name.startswith('bg-'):
+        color = resolve_color(name[len('bg-'):])
+        if color:
+            return 'background-color', '', f'background-color:{color[0]}'
+
+    for stop in ('from', 'via', 'to'):
+        if name.startswith(stop + '-'):
+            color = resolve_color(name[len(stop) + 1:])
+            if not color:
+                return None
+            if stop == 'from':
+                declarations = (
+                    f'--tw-gradient-from:{color[0]};--tw-gradient-to:{color[1]};'
+                    '--tw-gradient-stops:var(--tw-gradient-from), var(--tw-gradient-to)'
+                )
+            elif stop == 'via':
+                declarations = (
+                    f'--tw-gradient-to:{color[1]};'
+                    f'--tw-gradient-stops:var(--tw-gradient-from), {color[0]}, var(--tw-gradient-to)'
+                )
+            else:
+                declarations = f'--tw-gradient-to:{color[0]}'
+            return f'gradient-{stop}', '', declarations
+
+    if name.startswith('text-'):
+        key = name[len('text-'):]
+        if key in FONT_SIZES:
+            size, line_height = FONT_SIZES[key]
+            return 'font-size', '', f'font-size:{size};line-height:{line_height}'
+        color = resolve_color(key)
+        if color:
+            return 'text-color', '', f'color:{color[0]}'
+
+    if name == 'shadow' or name.startswith('shadow-'):
+        key = name[len('shadow-'):] if name != 'shadow' else ''
+        if key in SHADOWS:
+            shadow, colored = SHADOWS[key]
+            return 'box-shadow', '', (
+                f'--tw-shadow:{shadow};--tw-shadow-colored:{colored};'
+                'box-shadow:var(--tw-ring-offset-shadow, 0 0 #0000), var(--tw-ring-shadow, 0 0 #0000), var(--tw-shadow)'
+            )
+        color = resolve_color(key)
+        if color:
+            return 'shadow-color', '', f'--tw-shadow-color:{color[0]};--tw-shadow:var(--tw-shadow-colored)'
+
+    if name.startswith('ring-offset-'):
+        key = name[len('ring-offset-'):]
+        if key in RING_WIDTHS and key:
+            return 'ring-offset-width', '', f'--tw-ring-offset-width:{RING_WIDTHS[key]}'
+        color = resolve_color(key)
+        if color:
+            return 'ring-offset-width', '', f'--tw-ring-offset-color:{color[0]}'
+    if name == 'ring' or name.startswith('ring-'):
+        key = name[len('ring-'):] if name != 'ring' else ''
+        if key in RING_WIDTHS:
+            return 'ring-width', '', (
+                '--tw-ring-offset-shadow:var(--tw-ring-inset) 0 0 0 var(--tw-ring-offset-width) var(--tw-ring-offset-color);'
+                f'--tw-ring-shadow:var(--tw-ring-inset) 0 0 0 calc({RING_WIDTHS[key]} + var(--tw-ring-offset-width)) var(--tw-ring-color);'
+                'box-shadow:var(--tw-ring-offset-shadow), var(--tw-ring-shadow), var(--tw-shadow, 0 0 #0000)'
+            )
+        color = resolve_color(key)
+        if color:
+            return 'ring-color', '', f'--tw-ring-color:{color[0]}'
+
+    if name == 'blur' or name.startswith('blur-'):
+        key = name[len('blur-'):] if name != 'blur' else ''
+        if key in BLURS:
+            return 'filter', '', f'--tw-blur:blur({BLURS[key]});filter:{FILTER}'
+    if name == 'backdrop-blur' or name.startswith('backdrop-blur-'):
+        key = name[len('backdrop-blur-'):] if name != 'backdrop-blur' else ''
+        if key in BLURS:
+            return 'backdrop-filter', '', (
+                f'--tw-backdrop-blur:blur({BLURS[key]});'
+                f'-webkit-backdrop-filter:{BACKDROP_FILTER};backdrop-filter:{BACKDROP_FILTER}'
+            )
+
+    return None
+
+
+def escape(class_name: str) -> str:
+    """Escape a class name for use in a CSS selector."""
+    return re.sub(r'([^a-zA-Z0-9_-])', r'\\\1', class_name)
+
+
+def parse(candidate: str) -> Optional[Dict]:
+    """
+    Split a candidate into its variants and utility and build its rule.
+
+    Returns:
+        Dict with the screen, variant, family, selector and declarations,
+        or None if the candidate is not a supported utility
+    """
+    *variants, name = candidate.split(':')
+    screen = None
+    pseudo = ''
+    group = ''
+    variant_rank = -1
+    for variant in variants:
+        if variant in SCREENS and screen is None and not pseudo and not group:
+            screen = variant
+        elif variant in PSEUDO_VARIANTS:
+            pseudo += PSEUDO_VARIANTS[variant]
+            variant_rank = max(variant_rank, VARIANT_ORDER.index(variant))
+        elif variant in GROUP_VARIANTS:
+            group = f'.group{GROUP_VARIANTS[variant]} '
+            variant_rank = max(variant_rank, VARIANT_ORDER.index(variant))
+        else:
+            return None
+
+    utility = _utility(name)
+    if utility is None:
+        return None
+    family, suffix, declarations = utility
+    animation = name[len('animate-'):] if name.startswith('animate-') else None
+    return {
+        'screen': screen,
+        'order': (variant_rank, FAMILY_INDEX[family]),
+        'selector': f'{group}.{escape(candidate)}{pseudo}{suffix}',
+        'declarations': declarations,
+        'keyframes': KEYFRAMES.get(animation),
+    }
+
+
+# Class-like tokens: letters, digits and -:/._ with an optional [arbitrary value]
+CANDIDATE_RE = re.compile(r'-?[a-z0-9][a-z0-9:/._-]*(?:\[[^\]\s"\'`]+\])?')
+
+
+def scan(paths: Iterable[str]) -> Set[str]:
+    """Collect candidate class names from the files matching the glob patterns."""
+    candidates = set()
+    for pattern in paths:
+        for path in glob.glob(str(pattern), recursive=True):
+            with open(path, encoding='utf-8') as f:
+                candidates.update(CANDIDATE_RE.findall(f.read()))
+    return candidates
+
+
+def minify(css: str) -> str:
+    """Strip comments and the whitespace CSS does not need."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>~])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    # "--tw-blur: ;" must keep its value: a single space
+    css = re.sub(r'(--tw-[a-z-]+):;', r'\1: ;', css)
+    return css.replace(';}', '}').strip()
+
+
+def generate(candidates: Iterable[str]) -> Tuple[str, List[str]]:
+    """
+    Build the minified stylesheet for ``candidates``.
+
+    Returns:
+        Tuple of (CSS, sorted class names that produced a rule)
+    """
+    rules = {}
+    for candidate in candidates:
+        rule = parse(candidate)
+        if rule is not None:
+            rules[candidate] = rule
+
+    screen_order = [None, *SCREENS]
+    blocks = [minify(PREFLIGHT)]
+    keyframes = sorted({rule['keyframes'] for rule in rules.values() if rule['keyframes']})
+    for screen in screen_order:
+        body = ''.join(
+            f"{rule['selector']}{{{rule['declarations']}}}"
+            for _name, rule in sorted(
+                ((name, rule) for name, rule in rules.items() if rule['screen'] == screen),
+                key=lambda item: (item[1]['order'], item[0]),
+            )
+        )
+        if body:
+            blocks.append(body if screen is None else f'@media (min-width:{SCREENS[screen]}){{{body}}}')
+    return ''.join(keyframes + blocks) + '\n', sorted(rules)
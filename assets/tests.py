@@ -0,0 +1,132 @@
+import gzip
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import storage, tailwind
+from .middleware import StaticFilesMiddleware
+
+
+class TailwindTest(SimpleTestCase):
+    """Test the generated stylesheet."""
+
+    def css(self, *classes):
+        return tailwind.generate(classes)[0]
+
+    def test_utilities(self):
+        """Test variants, opacity modifiers, arbitrary and negative values."""
+        css = self.css('hover:text-primary/80', 'lg:left-[30%]', '-translate-x-1/2', 'group-hover:scale-110')
+        self.assertIn('.hover\\:text-primary\\/80:hover{color:rgb(59 130 246 / 0.8)}', css)
+        self.assertIn('@media (min-width:1024px){.lg\\:left-\\[30\\%\\]{left:30%}}', css)
+        self.assertIn('.-translate-x-1\\/2{--tw-translate-x:-50%;', css)
+        self.assertIn('.group:hover .group-hover\\:scale-110{--tw-scale-x:1.1;--tw-scale-y:1.1;', css)
+
+    def test_only_known_utilities(self):
+        """Test words that are not utilities produce no rule."""
+        self.assertEqual(tailwind.generate(['appointment-form', 'text-bogus', 'p-4'])[1], ['p-4'])
+
+    def test_order(self):
+        """Test responsive rules follow the base ones and variants follow plain utilities."""
+        css = self.css('md:p-2', 'hover:bg-blue-700', 'bg-blue-600', 'p-4')
+        self.assertLess(css.index('.p-4{'), css.index('.md\\:p-2{'))
+        self.assertLess(css.index('.bg-blue-600{'), css.index('.hover\\:bg-blue-700:hover{'))
+
+    def test_committed_stylesheet_up_to_date(self):
+        """Test static/css/app.css was rebuilt after the templates changed."""
+        call_command('build_css', '--check', stdout=StringIO())
+
+
+class CompressedStorageTest(SimpleTestCase):
+    """Test collected files are hashed and precompressed."""
+
+    def test_collect(self):
+        """Test a hashed copy and its gzip (and brotli) copies are written."""
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(source, 'site.css'), 'w') as f:
+                f.write('body{color:red}' * 100)
+            with override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=root, STORAGES={
+                'staticfiles': {'BACKEND': 'assets.storage.CompressedManifestStaticFilesStorage'},
+            }):
+                call_command('collectstatic', interactive=False, verbosity=0)
+
+            hashed = [name for name in os.listdir(root) if name.startswith('site.') and name.endswith('.css')]
+            self.assertEqual(len(hashed), 2)
+            path = os.path.join(root, max(hashed, key=len))
+            with gzip.open(path + '.gz') as f, open(path, 'rb') as original:
+                self.assertEqual(f.read(), original.read())
+            self.assertEqual(os.path.exists(path + '.br'), storage.brotli is not None)
+
+
+@override_settings(SERVE_STATIC=True, STATIC_URL='/static/', STATIC_MAX_AGE=60)
+class StaticFilesMiddlewareTest(SimpleTestCase):
+    """Test serving collected files."""
+
+    def setUp(self):
+        """Collect a hashed file with a gzip copy."""
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.name = 'app.0123456789ab.css'
+        with open(os.path.join(self.root.name, self.name), 'w') as f:
+            f.write('body{margin:0}' * 100)
+        storage.compress(os.path.join(self.root.name, self.name))
+        with open(os.path.join(self.root.name, 'robots.txt'), 'w') as f:
+            f.write('User-agent: *')
+
+        with override_settings(STATIC_ROOT=self.root.name):
+            self.middleware = StaticFilesMiddleware(lambda request: None)
+        self.factory = RequestFactory()
+
+    def test_hashed_file_gzip(self):
+        """Test a hashed name is immutable and sent gzipped to clients that accept it."""
+        response = self.middleware(self.factory.get(f'/static/{self.name}', headers={'accept-encoding': 'gzip'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'body{margin:0}' * 100)
+        response.close()
+
+        revalidated = self.middleware(self.factory.get(
+            f'/static/{self.name}', headers={'accept-encoding': 'gzip', 'if-none-match': response['ETag']},
+        ))
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_identity_and_short_lived(self):
+        """Test clients without gzip get the original and unhashed names a short max-age."""
+        response = self.middleware(self.factory.get(f'/static/{self.name}'))
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(int(response['Content-Length']), 1400)
+        response.close()
+
+        response = self.middleware(self.factory.get('/static/robots.txt'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response.close()
+
+    def test_other_paths_pass_through(self):
+        """Test missing files, paths outside STATIC_ROOT and other URLs reach the views."""
+        for path in ('/static/missing.css', '/static/../etc/passwd', '/appointments/'):
+            self.assertIsNone(self.middleware(self.factory.get(path)))
+        self.assertIsNone(self.middleware(self.factory.post(f'/static/{self.name}')))
+
+
+@unittest.skipIf(storage.brotli is None, 'brotli is not installed')
+class BrotliTest(SimpleTestCase):
+    """Test brotli copies are preferred when accepted."""
+
+    def test_brotli_preferred(self):
+        """Test a .br copy is sent to clients accepting br."""
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'app.css')
+            with open(path, 'w') as f:
+                f.write('body{margin:0}' * 100)
+            storage.compress(path)
+            with override_settings(SERVE_STATIC=True, STATIC_URL='/static/', STATIC_ROOT=root):
+                middleware = StaticFilesMiddleware(lambda request: None)
+                response = middleware(RequestFactory().get('/static/app.css', headers={'accept-encoding': 'gzip, br'}))
+            self.assertEqual(response['Content-Encoding'], 'br')
+            response.close()
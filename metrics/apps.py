@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    name = "metrics"
+
+    def ready(self):
+        # Time the queries of every database connection as it is opened
+        from django.db.backends.signals import connection_created
+
+        from .middleware import install_query_timer
+
+        connection_created.connect(install_query_timer, dispatch_uid='metrics.install_query_timer')
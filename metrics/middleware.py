@@ -0,0 +1,103 @@
+"""
+Request, database and in-flight metrics for every view.
+
+``MetricsMiddleware`` labels samples with the URL name of the matched
+pattern (``unmatched`` for 404s outside the URLconf), never the raw path,
+so the number of series stays bounded. Queries are counted and timed by a
+wrapper on each database connection, and only while a request is being
+served, so management commands and workers do not add to the view series.
+"""
+
+import contextvars
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import registry
+
+
+# URL name of the request being served in this thread or asyncio task;
+# a one-item list so the view label can be filled in once resolved
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+
+def _view_name(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+def _query_timer(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        labels = (('view', current[0]),)
+        registry.inc('db_queries_total', labels)
+        registry.observe('db_query_duration_seconds', time.perf_counter() - started, labels)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding the query timer to a connection."""
+    if _query_timer not in connection.execute_wrappers:
+        # First in the list: connection.execute_wrapper() pops from the end
+        connection.execute_wrappers.insert(0, _query_timer)
+
+
+class MetricsMiddleware:
+    """Record latency, status and query counts per URL name."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        registry.gauge_add('http_requests_in_flight', 1)
+        return _current.set(['unmatched']), time.perf_counter()
+
+    def _finish(self, request, response, token, started):
+        view = _view_name(request)
+        elapsed = time.perf_counter() - started
+        _current.reset(token)
+        registry.gauge_add('http_requests_in_flight', -1)
+        registry.observe(
+            'http_request_duration_seconds', elapsed, (('view', view), ('method', request.method)),
+        )
+        status = response.status_code if response is not None else 500
+        registry.inc(
+            'http_requests_total', (('view', view), ('method', request.method), ('status', str(status))),
+        )
+        registry.maybe_flush()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current = _current.get()
+        if current is not None:
+            current[0] = _view_name(request)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = self._start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, token, started)
+
+    async def __acall__(self, request):
+        token, started = self._start()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, token, started)
@@ -0,0 +1,254 @@
+"""
+In-process metric storage and Prometheus text exposition.
+
+Every thread records into its own shard (a plain dict only that thread
+writes), so recording a sample takes no lock. Reading merges the shards of
+the process. Shards of finished threads are folded into a process total
+and dropped, so servers that start a thread per request keep a shard per
+live thread only.
+
+With several worker processes, set ``METRICS_DIR`` to a directory shared
+by them. Each process then writes its merged samples to
+``metrics-<pid>.json`` there, at most every ``METRICS_FLUSH_INTERVAL``
+seconds and whenever it serves ``/metrics``. The endpoint sums the files of
+all processes, so any worker can answer a scrape. Counters and histograms
+of processes that have exited are kept so totals never go backwards;
+gauges only count live processes.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+
+
+# Latency buckets in seconds, from a fast cache hit to a slow Stripe call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# name: (type, help text)
+METRICS = {
+    'http_requests_total': (COUNTER, 'HTTP requests by URL name, method and status code.'),
+    'http_request_duration_seconds': (HISTOGRAM, 'Time to build the response, by URL name and method.'),
+    'http_requests_in_flight': (GAUGE, 'Requests being served.'),
+    'db_queries_total': (COUNTER, 'Database queries run while serving a request, by URL name.'),
+    'db_query_duration_seconds': (HISTOGRAM, 'Duration of single database queries, by URL name.'),
+    'template_render_duration_seconds': (HISTOGRAM, 'Time to render a template, by template name.'),
+    'stripe_calls_total': (COUNTER, 'Stripe API calls by StripeService method.'),
+    'stripe_call_errors_total': (COUNTER, 'Stripe API calls that raised, by StripeService method.'),
+    'stripe_call_duration_seconds': (HISTOGRAM, 'Stripe API call latency including retries, by method.'),
+}
+
+_local = threading.local()
+# Guards the list of shards (not the shards): taken when a thread records
+# its first sample and on reads, never per sample
+_lock = threading.Lock()
+_state = {'pid': None, 'shards': [], 'finished': None, 'last_flush': 0.0}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _empty() -> Dict:
+    return {COUNTER: {}, GAUGE: {}, HISTOGRAM: {}}
+
+
+def _fold_finished() -> None:
+    # A finished thread no longer writes its shard, so it can be merged
+    # without copying. Call with _lock held.
+    live = []
+    for shard in _state['shards']:
+        if shard['thread'].is_alive():
+            live.append(shard)
+        else:
+            _merge(_state['finished'], shard)
+    _state['shards'] = live
+
+
+def _shard() -> Dict:
+    pid = os.getpid()
+    if _state['pid'] != pid:
+        # First use, or a forked worker: start from nothing rather than
+        # counting the parent's samples again
+        with _lock:
+            _state.update(pid=pid, shards=[], finished=_empty(), last_flush=0.0)
+    shard = getattr(_local, 'shard', None)
+    if shard is None or shard['pid'] != pid:
+        shard = {'pid': pid, 'thread': threading.current_thread(), **_empty()}
+        _local.shard = shard
+        with _lock:
+            _fold_finished()
+            _state['shards'].append(shard)
+    return shard
+
+
+def inc(name: str, labels: Labels = (), value: float = 1) -> None:
+    """Add ``value`` to a counter."""
+    counters = _shard()[COUNTER]
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def gauge_add(name: str, value: float, labels: Labels = ()) -> None:
+    """Move a gauge up or down by ``value``."""
+    gauges = _shard()[GAUGE]
+    key = (name, labels)
+    gauges[key] = gauges.get(key, 0) + value
+
+
+def observe(name: str, value: float, labels: Labels = ()) -> None:
+    """Record one observation in a histogram."""
+    histograms = _shard()[HISTOGRAM]
+    key = (name, labels)
+    counts = histograms.get(key)
+    if counts is None:
+        # One count per bucket, then +Inf, sum
+        counts = histograms[key] = [0] * (len(DEFAULT_BUCKETS) + 1) + [0.0]
+    for i, bound in enumerate(DEFAULT_BUCKETS):
+        if value <= bound:
+            counts[i] += 1
+            break
+    else:
+        counts[len(DEFAULT_BUCKETS)] += 1
+    counts[-1] += value
+
+
+def _merge(into: Dict, samples: Dict) -> None:
+    for kind in (COUNTER, GAUGE):
+        for key, value in samples[kind].items():
+            into[kind][key] = into[kind].get(key, 0) + value
+    for key, counts in samples[HISTOGRAM].items():
+        total = into[HISTOGRAM].setdefault(key, [0] * len(counts))
+        for i, count in enumerate(counts):
+            total[i] += count
+
+
+def snapshot() -> Dict:
+    """Return the samples recorded by this process, summed over its threads."""
+    _shard()
+    merged = _empty()
+    with _lock:
+        _fold_finished()
+        _merge(merged, _state['finished'])
+        shards = list(_state['shards'])
+    for shard in shards:
+        # Copies are taken in one step each; the owning thread may still be writing
+        _merge(merged, {
+            COUNTER: dict(shard[COUNTER]),
+            GAUGE: dict(shard[GAUGE]),
+            HISTOGRAM: {key: list(counts) for key, counts in dict(shard[HISTOGRAM]).items()},
+        })
+    return merged
+
+
+def _encode(samples: Dict) -> Dict:
+    return {
+        kind: [[name, [list(pair) for pair in labels], value] for (name, labels), value in values.items()]
+        for kind, values in samples.items()
+    }
+
+
+def _decode(data: Dict) -> Dict:
+    return {
+        kind: {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in data.get(kind, [])}
+        for kind in (COUNTER, GAUGE, HISTOGRAM)
+    }
+
+
+def flush() -> None:
+    """Write this process's samples to ``METRICS_DIR``, if configured."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    _state['last_flush'] = time.monotonic()
+    path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+    # Per-thread temporary file, then an atomic rename: readers never see a partial file
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(_encode(snapshot()), f)
+    os.replace(tmp_path, path)
+
+
+def maybe_flush() -> None:
+    """Flush if ``METRICS_FLUSH_INTERVAL`` has passed since the last flush."""
+    if settings.METRICS_DIR and time.monotonic() - _state['last_flush'] >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect() -> Dict:
+    """Return the samples of every worker process (or just this one)."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return snapshot()
+
+    flush()
+    merged = _empty()
+    for filename in os.listdir(directory):
+        if not (filename.startswith('metrics-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                samples = _decode(json.load(f))
+        except (OSError, ValueError):
+            continue
+        if not _is_alive(int(filename[len('metrics-'):-len('.json')])):
+            samples[GAUGE] = {}
+        _merge(merged, samples)
+    return merged
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    pairs = ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+    return f'{{{pairs}}}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(samples: Dict) -> str:
+    """Format samples in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        series = sorted((key, value) for key, value in samples[kind].items() if key[0] == name)
+        for (_name, labels), value in series:
+            if kind != HISTOGRAM:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*DEFAULT_BUCKETS, '+Inf'], value[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(bound)
+                lines.append(f'{name}_bucket{_format_labels((*labels, ("le", le)))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset() -> None:
+    """Forget every sample recorded by this process (for tests)."""
+    with _lock:
+        shards = [*_state['shards'], _state['finished'] or _empty()]
+    for shard in shards:
+        for kind in (COUNTER, GAUGE, HISTOGRAM):
+            shard[kind].clear()
@@ -0,0 +1,46 @@
+"""
+Template engine backend that times every render.
+
+A drop-in for ``django.template.backends.django.DjangoTemplates``: set it
+as the ``BACKEND`` in ``TEMPLATES`` to get
+``template_render_duration_seconds`` per template name. Included templates
+are part of the time of the template that includes them.
+"""
+
+import time
+
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates
+
+from . import registry
+
+
+class TimedTemplate:
+    """Wrapper timing ``render`` of a backend template."""
+
+    def __init__(self, template, name):
+        self.template = template
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.template, attr)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            registry.observe(
+                'template_render_duration_seconds',
+                time.perf_counter() - started,
+                (('template', self.name),),
+            )
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """Django template engine whose templates record their render time."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code), '<string>')
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name), template_name)
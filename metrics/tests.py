@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+import stripe
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from payments.services.stripe_service import StripeService
+from . import registry
+
+
+def _sample(samples, kind, name, **labels):
+    return samples[kind].get((name, tuple(labels.items())))
+
+
+class RegistryTest(TestCase):
+    """Test recording, merging and rendering samples."""
+
+    def setUp(self):
+        """Start from empty metrics."""
+        registry.reset()
+
+    def test_threads_merged(self):
+        """Test samples recorded by several threads are summed."""
+        def work():
+            for _ in range(1000):
+                registry.inc('stripe_calls_total', (('method', 'confirm_payment'),))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        samples = registry.snapshot()
+        self.assertEqual(_sample(samples, registry.COUNTER, 'stripe_calls_total', method='confirm_payment'), 4000)
+
+    def test_finished_threads_folded(self):
+        """Test shards of finished threads are dropped without losing their samples."""
+        def work():
+            registry.inc('stripe_calls_total', (('method', 'confirm_payment'),))
+            registry.observe('template_render_duration_seconds', 0.003)
+
+        for _ in range(50):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        samples = registry.snapshot()
+        self.assertEqual(_sample(samples, registry.COUNTER, 'stripe_calls_total', method='confirm_payment'), 50)
+        self.assertEqual(_sample(samples, registry.HISTOGRAM, 'template_render_duration_seconds')[0], 50)
+        self.assertLessEqual(len(registry._state['shards']), 2)
+
+    def test_render_histogram(self):
+        """Test histogram buckets are cumulative and labels escaped."""
+        labels = (('template', 'say "hi".html'),)
+        registry.observe('template_render_duration_seconds', 0.003, labels)
+        registry.observe('template_render_duration_seconds', 0.2, labels)
+        registry.observe('template_render_duration_seconds', 60, labels)
+
+        text = registry.render(registry.snapshot())
+
+        self.assertIn('# TYPE template_render_duration_seconds histogram', text)
+        self.assertIn('template_render_duration_seconds_bucket{template="say \\"hi\\".html",le="0.005"} 1', text)
+        self.assertIn('template_render_duration_seconds_bucket{template="say \\"hi\\".html",le="0.25"} 2', text)
+        self.assertIn('template_render_duration_seconds_bucket{template="say \\"hi\\".html",le="+Inf"} 3', text)
+        self.assertIn('template_render_duration_seconds_count{template="say \\"hi\\".html"} 3', text)
+
+    def test_processes_merged_through_directory(self):
+        """Test METRICS_DIR sums all workers and drops gauges of exited ones."""
+        registry.inc('stripe_calls_total', (('method', 'confirm_payment'),), 2)
+        registry.gauge_add('http_requests_in_flight', 1)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            exited = {
+                'counter': [['stripe_calls_total', [['method', 'confirm_payment']], 3]],
+                'gauge': [['http_requests_in_flight', [], 5]],
+                'histogram': [],
+            }
+            # No process has a pid this large
+            with open(os.path.join(directory, 'metrics-4194305.json'), 'w') as f:
+                json.dump(exited, f)
+
+            samples = registry.collect()
+
+        self.assertEqual(_sample(samples, registry.COUNTER, 'stripe_calls_total', method='confirm_payment'), 5)
+        self.assertEqual(_sample(samples, registry.GAUGE, 'http_requests_in_flight'), 1)
+        registry.gauge_add('http_requests_in_flight', -1)
+
+
+class MetricsEndpointTest(TestCase):
+    """Test the middleware, the Stripe instrumentation and /metrics."""
+
+    def setUp(self):
+        """Start from empty metrics and cache."""
+        cache.clear()
+        registry.reset()
+
+    def test_view_latency_queries_and_templates(self):
+        """Test a page records its URL name, status, queries and template."""
+        response = self.client.get('/appointments/list/')
+        self.assertEqual(response.status_code, 200)
+        self.client.get('/no-such-page/')
+
+        samples = registry.snapshot()
+        self.assertEqual(
+            _sample(samples, registry.COUNTER, 'http_requests_total',
+                    view='appointment_list', method='GET', status='200'),
+            1,
+        )
+        self.assertEqual(
+            _sample(samples, registry.COUNTER, 'http_requests_total',
+                    view='unmatched', method='GET', status='404'),
+            1,
+        )
+        self.assertGreater(_sample(samples, registry.COUNTER, 'db_queries_total', view='appointment_list'), 0)
+        duration = _sample(
+            samples, registry.HISTOGRAM, 'http_request_duration_seconds', view='appointment_list', method='GET',
+        )
+        self.assertEqual(sum(duration[:-1]), 1)
+        self.assertIsNotNone(_sample(
+            samples, registry.HISTOGRAM, 'template_render_duration_seconds', template='appointments/list.html',
+        ))
+        self.assertEqual(_sample(samples, registry.GAUGE, 'http_requests_in_flight'), 0)
+
+    @patch('stripe.PaymentIntent.retrieve', side_effect=stripe.StripeError('down'))
+    def test_stripe_errors_counted(self, mock_retrieve):
+        """Test Stripe calls are counted per method, failures included."""
+        with self.assertRaises(Exception):
+            StripeService.retrieve_payment_intent('pi_missing')
+
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('stripe_calls_total{method="retrieve_payment_intent"} 1', text)
+        self.assertIn('stripe_call_errors_total{method="retrieve_payment_intent"} 1', text)
+        self.assertIn('stripe_call_duration_seconds_count{method="retrieve_payment_intent"} 1', text)
+
+    @override_settings(METRICS_BEARER_TOKEN='secret')
+    def test_bearer_token(self):
+        """Test scrapes need the token when one is configured."""
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_http_methods
+
+from . import registry
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """
+    Expose the collected metrics in the Prometheus text format.
+
+    When METRICS_BEARER_TOKEN is set, the scraper must send it as
+    ``Authorization: Bearer <token>``.
+    """
+    token = settings.METRICS_BEARER_TOKEN
+    if token:
+        header = request.headers.get('Authorization', '')
+        if not constant_time_compare(header, f'Bearer {token}'):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+
+    return HttpResponse(registry.render(registry.collect()), content_type=CONTENT_TYPE)
@@ -1,3 +1,30 @@
 from django.contrib import admin
+from .models import StripeEvent
 
-# Register your models here.
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    """Admin configuration for processed Stripe webhook events."""
+
+    list_display = [
+        'event_id',
+        'event_type',
+        'payment_intent_id',
+        'received_at'
+    ]
+
+    list_filter = [
+        'event_type'
+    ]
+
+    search_fields = [
+        '=event_id',
+        '=payment_intent_id'
+    ]
+
+    readonly_fields = [
+        'event_id',
+        'event_type',
+        'payment_intent_id',
+        'received_at'
+    ]
@@ -0,0 +1,263 @@
+"""
+Local stand-in for the Stripe PaymentIntent API.
+
+Serves just enough of ``/v1/payment_intents`` (create, list, retrieve and
+confirm) for StripeService to run
+against it over real HTTP, so the client's pooling, timeout and retry
+behaviour and the whole booking flow can be exercised without network
+access. Point ``STRIPE_API_BASE`` at ``FakeStripeServer.url`` (or at the
+``run_fake_stripe`` management command) to use it.
+
+Every response can be delayed by ``latency`` seconds plus up to ``jitter``
+seconds, and a random ``error_rate`` fraction of requests answered with
+``error_status`` to exercise retries.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+def _parse_form(body: str) -> dict:
+    """Decode Stripe's form encoding, folding ``a[b]=c`` into nested dicts."""
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        if '[' in key:
+            outer, inner = key.rstrip(']').split('[', 1)
+            data.setdefault(outer, {})[inner] = value
+        else:
+            data[key] = value
+    return data
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.state.connection_opened()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+
+        url = urlparse(self.path)
+        # GET parameters come in the query string, POST ones in the body
+        status, payload = state.handle(
+            method, url.path, _parse_form(url.query if method == 'GET' else body),
+            idempotency_key=self.headers.get('Idempotency-Key'),
+        )
+
+        encoded = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (e.g. read timeout) before the response was sent
+            self.close_connection = True
+
+
+class FakeStripeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once; the default backlog of 5
+    # would make clients wait on SYN retries
+    request_queue_size = 1024
+
+
+class FakeStripeState:
+    """Stored PaymentIntents plus knobs for latency and failure injection."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.payment_intents = {}
+        self.connections = 0
+        self.requests = 0
+        self.injected_errors = 0
+        self.idempotent_replays = 0
+        self._idempotency_keys = {}
+        self._fail_next = []
+        self._lock = threading.Lock()
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def fail_next(self, count: int, status: int = 500):
+        """Answer the next ``count`` requests with ``status``."""
+        with self._lock:
+            self._fail_next.extend([status] * count)
+
+    def handle(self, method: str, path: str, params: dict, idempotency_key=None):
+        with self._lock:
+            self.requests += 1
+            failure = self._fail_next.pop(0) if self._fail_next else None
+            if failure is None and self.error_rate and random.random() < self.error_rate:
+                failure = self.error_status
+            if failure:
+                self.injected_errors += 1
+
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if failure:
+            return failure, {'error': {'type': 'api_error', 'message': 'Injected failure'}}
+
+        parts = [part for part in path.split('/') if part]
+        if parts[:2] != ['v1', 'payment_intents']:
+            return 404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}}
+
+        if method == 'GET' and len(parts) == 2:
+            return 200, self.list_payment_intents(params)
+
+        if method == 'POST' and len(parts) == 2:
+            with self._lock:
+                replay = self._idempotency_keys.get(idempotency_key)
+                if replay is not None:
+                    self.idempotent_replays += 1
+                    return 200, self.payment_intents[replay]
+            intent = self.create_payment_intent(params)
+            if idempotency_key:
+                with self._lock:
+                    self._idempotency_keys[idempotency_key] = intent['id']
+            return 200, intent
+
+        intent = self.payment_intents.get(parts[2]) if len(parts) > 2 else None
+        if len(parts) > 2 and intent is None:
+            return 404, {'error': {
+                'type': 'invalid_request_error',
+                'code': 'resource_missing',
+                'message': f'No such payment_intent: {parts[2]}',
+            }}
+
+        if method == 'GET' and len(parts) == 3:
+            return 200, intent
+        if method == 'POST' and len(parts) == 4 and parts[3] == 'confirm':
+            # What Stripe.js does once the card is accepted
+            self.succeed(intent['id'])
+            return 200, intent
+
+        return 404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}}
+
+    def create_payment_intent(self, params: dict) -> dict:
+        intent_id = f'pi_fake_{uuid.uuid4().hex[:24]}'
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(params.get('amount', 0)),
+            'currency': params.get('currency', 'usd'),
+            'status': 'requires_payment_method',
+            'client_secret': f'{intent_id}_secret_{uuid.uuid4().hex[:12]}',
+            'metadata': params.get('metadata', {}),
+            'created': int(time.time()),
+        }
+        with self._lock:
+            self.payment_intents[intent_id] = intent
+        return intent
+
+    def list_payment_intents(self, params: dict) -> dict:
+        """
+        Return one page of PaymentIntents, newest first, like ``GET /v1/payment_intents``.
+
+        Supports ``limit``, ``starting_after`` and the ``created[gte]`` /
+        ``created[lt]`` window.
+        """
+        created = params.get('created', {})
+        limit = min(int(params.get('limit', 10)), 100)
+        with self._lock:
+            intents = sorted(
+                self.payment_intents.values(),
+                key=lambda intent: (intent['created'], intent['id']),
+                reverse=True,
+            )
+
+        if 'gte' in created:
+            intents = [i for i in intents if i['created'] >= int(created['gte'])]
+        if 'lt' in created:
+            intents = [i for i in intents if i['created'] < int(created['lt'])]
+        if params.get('starting_after'):
+            ids = [intent['id'] for intent in intents]
+            if params['starting_after'] in ids:
+                intents = intents[ids.index(params['starting_after']) + 1:]
+
+        return {
+            'object': 'list',
+            'url': '/v1/payment_intents',
+            'data': intents[:limit],
+            'has_more': len(intents) > limit,
+        }
+
+    def succeed(self, intent_id: str):
+        """Mark a PaymentIntent as paid, as if the card had been charged."""
+        self.payment_intents[intent_id]['status'] = 'succeeded'
+
+
+class FakeStripeServer:
+    """
+    Run the fake API on a background thread.
+
+    Usage::
+
+        with FakeStripeServer() as server:
+            with override_settings(STRIPE_API_BASE=server.url):
+                ...
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **options):
+        self.httpd = FakeStripeHTTPServer((host, port), FakeStripeHandler)
+        self.httpd.state = FakeStripeState(**options)
+        self._thread = None
+
+    @property
+    def state(self) -> FakeStripeState:
+        return self.httpd.state
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted."""
+        self.httpd.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
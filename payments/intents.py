@@ -0,0 +1,165 @@
+"""
+PaymentIntent reuse for the payment page.
+
+Each appointment keeps a single PaymentIntent. Its id, client secret and
+amount are cached, so reloading the payment page costs no Stripe call
+while the cache entry lives and at most one call after it expires: a
+retrieve of the stored intent, or a create under an idempotency key
+derived from the appointment, which Stripe answers with the same intent
+if the create is repeated.
+
+An intent that has been paid, or whose payment is still being processed,
+is never replaced, even while the webhook recording it is on its way: a
+new intent would take ``payment_intent_id`` from it, and the webhook for
+the captured payment would then match no appointment.
+"""
+
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .services.stripe_service import StripeService
+from .webhooks import amark_paid, mark_paid
+
+
+# PaymentIntent statuses in which the card form can still be submitted
+REUSABLE_STATUSES = {'requires_payment_method', 'requires_confirmation', 'requires_action'}
+# PaymentIntent statuses in which the client has paid or the payment is under way
+SETTLED_STATUSES = {'succeeded', 'processing', 'requires_capture'}
+
+
+class PaymentSettled(Exception):
+    """
+    Raised when the appointment's intent has been paid or is being processed.
+
+    Attributes:
+        paid: Whether the intent succeeded (and the appointment is now paid)
+    """
+
+    def __init__(self, paid: bool):
+        super().__init__('Payment already succeeded' if paid else 'Payment is being processed')
+        self.paid = paid
+
+
+def _cache_key(appointment_id: int) -> str:
+    return f"payment_intent:{appointment_id}"
+
+
+def _idempotency_key(appointment, amount: int) -> str:
+    # Replacing an unusable intent needs a fresh key, otherwise Stripe
+    # would replay the create that produced it
+    key = f"appointment-{appointment.id}-{amount}"
+    if appointment.payment_intent_id:
+        key = f"{key}-after-{appointment.payment_intent_id}"
+    return key
+
+
+def _metadata(appointment) -> Dict:
+    return {
+        'appointment_id': appointment.id,
+        'provider_name': appointment.provider.name,
+        'client_email': appointment.client_email,
+    }
+
+
+def _matches(cached, appointment, amount: int) -> bool:
+    # The appointment may have moved to another intent since it was cached
+    return bool(cached) and cached['id'] == appointment.payment_intent_id and cached['amount'] == amount
+
+
+def _is_reusable(payment_data: Dict, amount: int) -> bool:
+    return payment_data['status'] in REUSABLE_STATUSES and payment_data['amount'] == amount
+
+
+def _check_unpaid(appointment) -> None:
+    # A paid appointment's intent has succeeded: serving its client secret
+    # or replacing it would start a second payment
+    if appointment.is_paid:
+        raise ValueError('Appointment is already paid')
+
+
+def _cache_entry(payment_data: Dict) -> Dict:
+    return {
+        'id': payment_data['id'],
+        'client_secret': payment_data['client_secret'],
+        'amount': payment_data['amount'],
+    }
+
+
+def get_or_create_payment_intent(appointment, amount: int) -> Dict:
+    """
+    Return a usable PaymentIntent for ``appointment``, creating one if needed.
+
+    Args:
+        appointment: Appointment being paid for
+        amount: Payment amount in cents
+
+    Returns:
+        Dict with the intent's id, client_secret and amount
+
+    Raises:
+        ValueError: If the appointment is already paid
+        PaymentSettled: If the stored intent succeeded (the appointment is
+            marked paid first) or its payment is being processed
+        Exception: If a Stripe call fails
+    """
+    _check_unpaid(appointment)
+    key = _cache_key(appointment.id)
+    intent = cache.get(key)
+    if _matches(intent, appointment, amount):
+        return intent
+
+    payment_data = None
+    if appointment.payment_intent_id:
+        payment_data = StripeService.retrieve_payment_intent(appointment.payment_intent_id)
+        if payment_data['status'] in SETTLED_STATUSES:
+            paid = payment_data['status'] == 'succeeded'
+            if paid:
+                # Ahead of the webhook, which then finds nothing left to do
+                mark_paid(payment_data['id'])
+            raise PaymentSettled(paid)
+
+    if payment_data is None or not _is_reusable(payment_data, amount):
+        payment_data = StripeService.create_payment_intent(
+            amount=amount,
+            metadata=_metadata(appointment),
+            idempotency_key=_idempotency_key(appointment, amount),
+        )
+        appointment.payment_intent_id = payment_data['id']
+        appointment.save(update_fields=['payment_intent_id', 'updated_at'])
+
+    intent = _cache_entry(payment_data)
+    cache.set(key, intent, settings.PAYMENT_INTENT_CACHE_TIMEOUT)
+    return intent
+
+
+async def aget_or_create_payment_intent(appointment, amount: int) -> Dict:
+    """Async version of ``get_or_create_payment_intent``."""
+    _check_unpaid(appointment)
+    key = _cache_key(appointment.id)
+    intent = await cache.aget(key)
+    if _matches(intent, appointment, amount):
+        return intent
+
+    payment_data = None
+    if appointment.payment_intent_id:
+        payment_data = await StripeService.aretrieve_payment_intent(appointment.payment_intent_id)
+        if payment_data['status'] in SETTLED_STATUSES:
+            paid = payment_data['status'] == 'succeeded'
+            if paid:
+                await amark_paid(payment_data['id'])
+            raise PaymentSettled(paid)
+
+    if payment_data is None or not _is_reusable(payment_data, amount):
+        payment_data = await StripeService.acreate_payment_intent(
+            amount=amount,
+            metadata=_metadata(appointment),
+            idempotency_key=_idempotency_key(appointment, amount),
+        )
+        appointment.payment_intent_id = payment_data['id']
+        await appointment.asave(update_fields=['payment_intent_id', 'updated_at'])
+
+    intent = _cache_entry(payment_data)
+    await cache.aset(key, intent, settings.PAYMENT_INTENT_CACHE_TIMEOUT)
+    return intent
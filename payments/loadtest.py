@@ -0,0 +1,241 @@
+"""
+Helpers for the in-process load-test management commands.
+
+Load tests run against a throwaway file-backed test database (so worker
+threads can wait on SQLite's lock instead of failing) and against
+``FakeStripeServer`` instead of the real Stripe API.
+"""
+
+import os
+import re
+import statistics
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from django.db import close_old_connections, connections
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from .fake_stripe import FakeStripeServer
+
+
+def percentile(values, pct: float) -> float:
+    """Return the ``pct`` percentile (0-100) of ``values`` by nearest rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, elapsed: float, errors: int = 0) -> dict:
+    """
+    Summarise one load-test run.
+
+    Args:
+        latencies: Per-request latencies in seconds
+        elapsed: Wall-clock duration of the run in seconds
+        errors: Number of failed requests
+
+    Returns:
+        Dict with request count, throughput and latency percentiles in ms
+    """
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'mean': statistics.mean(latencies) * 1000 if latencies else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def format_summary(label: str, summary: dict) -> str:
+    return (
+        f"{label}: {summary['requests']} requests, {summary['errors']} errors, "
+        f"{summary['throughput']:.1f} req/s | "
+        f"p50 {summary['p50']:.1f} ms, p95 {summary['p95']:.1f} ms, p99 {summary['p99']:.1f} ms"
+    )
+
+
+@contextmanager
+def scratch_database():
+    """
+    Point the default connection at a throwaway, migrated test database.
+
+    With SQLite it is a temporary file; other backends use their test
+    database. It is dropped on exit, so nothing touches real data.
+    """
+    handle, db_path = tempfile.mkstemp(suffix='.sqlite3', prefix='loadtest-')
+    os.close(handle)
+
+    connection = connections['default']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = db_path
+
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    try:
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        test_settings['NAME'] = previous_name
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+
+@contextmanager
+def load_test_environment(stripe_latency: float = 0.0, **stripe_options):
+    """
+    Provide a scratch database and a fake Stripe API for a load test.
+
+    Args:
+        stripe_latency: Seconds the fake Stripe API waits per call
+        **stripe_options: Extra FakeStripeState options (jitter, error_rate, ...)
+
+    Yields:
+        The running FakeStripeServer
+    """
+    with scratch_database():
+        server = FakeStripeServer(latency=stripe_latency, **stripe_options).start()
+        try:
+            with override_settings(
+                STRIPE_SECRET_KEY='sk_test_loadtest',
+                STRIPE_API_BASE=server.url,
+                STRIPE_WEBHOOK_SECRET='',
+            ):
+                yield server
+        finally:
+            server.stop()
+
+
+# Steps of one booking, in the order a browser takes them
+BOOKING_STEPS = [
+    'create_appointment (GET)',
+    'create_appointment (POST)',
+    'payment_create',
+    'payment_confirm',
+    'appointment_success',
+]
+
+CLIENT_SECRET_RE = re.compile(r"confirmCardPayment\('((pi_[^']+?)_secret_[^']+)'")
+
+
+class QueryCounter:
+    """
+    Count the queries run on one connection, via ``execute_wrapper``.
+
+    Transaction statements are left out: whether ``atomic()`` sends a
+    savepoint or (on SQLite) a ``BEGIN`` depends on whether the caller is
+    already in a transaction (as in a TestCase), not on the view.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')):
+            self.record(sql)
+        return execute(sql, params, many, context)
+
+    def record(self, sql: str):
+        self.count += 1
+
+
+class ServerClient(Client):
+    """
+    Test client that handles database connections the way a server does.
+
+    The test client keeps one connection open for the whole test. A real
+    server calls ``close_old_connections`` when each request starts and
+    finishes, closing connections older than ``CONN_MAX_AGE`` (or handing
+    them back to the pool), and so does this client.
+    """
+
+    def request(self, **request):
+        close_old_connections()
+        try:
+            return super().request(**request)
+        finally:
+            close_old_connections()
+
+
+def timed_request(client, method: str, path: str, data=None, expect=(200,)):
+    """
+    Issue one request through the test client and measure it.
+
+    Returns:
+        Tuple of (response, seconds, query count, ok)
+    """
+    counter = QueryCounter()
+    started = time.perf_counter()
+    with connections['default'].execute_wrapper(counter):
+        response = getattr(client, method)(path, data)
+    elapsed = time.perf_counter() - started
+    return response, elapsed, counter.count, response.status_code in expect
+
+
+def confirm_on_stripe(stripe_url: str, payment_intent_id: str) -> bool:
+    """Do what Stripe.js does in the browser: confirm the PaymentIntent."""
+    request = urllib.request.Request(
+        f'{stripe_url}/v1/payment_intents/{payment_intent_id}/confirm', data=b'', method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+    except urllib.error.URLError:
+        return False
+    return True
+
+
+def run_booking_flow(client, stripe_url: str, booking: dict) -> list:
+    """
+    Book and pay for one appointment through the real URL routes.
+
+    Args:
+        client: Django test client holding this visitor's session
+        stripe_url: Base URL of the fake Stripe API
+        booking: Form data for the appointment form
+
+    Returns:
+        List of (step, seconds, query count, ok) tuples; stops at the first
+        failed step, so a completed booking has one entry per BOOKING_STEPS
+    """
+    results = []
+
+    def step(name, *args, **kwargs):
+        response, elapsed, queries, ok = timed_request(client, *args, **kwargs)
+        results.append((name, elapsed, queries, ok))
+        return response if ok else None
+
+    if step(BOOKING_STEPS[0], 'get', '/appointments/create/') is None:
+        return results
+    if step(BOOKING_STEPS[1], 'post', '/appointments/create/', booking, expect=(302,)) is None:
+        return results
+
+    response = step(BOOKING_STEPS[2], 'get', '/payments/create/')
+    match = CLIENT_SECRET_RE.search(response.content.decode()) if response is not None else None
+    if match is None:
+        if response is not None:
+            results[-1] = (*results[-1][:3], False)
+        return results
+
+    payment_intent_id = match.group(2)
+    if not confirm_on_stripe(stripe_url, payment_intent_id):
+        return results
+
+    response = step(BOOKING_STEPS[3], 'post', '/payments/confirm/',
+                    {'payment_intent_id': payment_intent_id})
+    if response is None or not response.json().get('success'):
+        results[-1] = (*results[-1][:3], False)
+        return results
+
+    step(BOOKING_STEPS[4], 'get', '/appointments/success/')
+    return results
@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from appointments.forms import TIME_SLOT_CHOICES
+from appointments.providers import resolve_providers
+from payments.loadtest import (
+    BOOKING_STEPS,
+    ServerClient,
+    format_summary,
+    load_test_environment,
+    run_booking_flow,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the booking flow with concurrent visitors against a local fake '
+        'Stripe API, once opening a database connection per request and once '
+        'reusing connections (persistent, or pooled on PostgreSQL), and report '
+        'requests per second and connections opened for each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=8,
+                            help='Concurrent visitors (default: 8)')
+        parser.add_argument('--bookings', type=int, default=10,
+                            help='Bookings each visitor makes per mode (default: 10)')
+        parser.add_argument('--conn-max-age', type=int, default=60,
+                            help='CONN_MAX_AGE of the persistent mode (default: 60)')
+        parser.add_argument('--stripe-latency', type=float, default=0.0,
+                            help='Seconds the fake Stripe API waits per call (default: 0)')
+
+    def handle(self, *args, **options):
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        try:
+            with load_test_environment(stripe_latency=options['stripe_latency']) as server:
+                settings_dict = connections['default'].settings_dict
+                original = (settings_dict['CONN_MAX_AGE'], settings_dict['OPTIONS'].get('pool'))
+                try:
+                    results = {}
+                    for mode, conn_max_age, pool in self.get_modes(options, settings_dict):
+                        self.configure(settings_dict, conn_max_age, pool)
+                        opened.clear()
+                        results[mode] = self.run_mode(mode, options, server.url)
+                        self.report(mode, *results[mode], len(opened))
+                finally:
+                    self.configure(settings_dict, *original)
+        finally:
+            connection_created.disconnect(count_connection)
+
+        baseline = results['per-request'][0]['throughput']
+        for mode, (summary, _bookings) in results.items():
+            if mode != 'per-request' and baseline:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{mode} vs per-request: {summary['throughput'] / baseline:.2f}x requests/s"
+                ))
+
+    def get_modes(self, options, settings_dict):
+        """Return (mode, CONN_MAX_AGE, pool options) for each run."""
+        modes = [
+            ('per-request', 0, None),
+            ('persistent', options['conn_max_age'], None),
+        ]
+        if connections['default'].vendor == 'postgresql':
+            pool = settings_dict['OPTIONS'].get('pool') or {'min_size': 2, 'max_size': options['sessions']}
+            modes.append(('pooled', 0, pool))
+        return modes
+
+    def configure(self, settings_dict, conn_max_age, pool):
+        """Apply connection settings; takes effect for connections opened afterwards."""
+        connections.close_all()
+        if hasattr(connections['default'], 'close_pool'):
+            connections['default'].close_pool()
+        settings_dict['CONN_MAX_AGE'] = conn_max_age
+        if pool:
+            settings_dict['OPTIONS']['pool'] = pool
+        else:
+            settings_dict['OPTIONS'].pop('pool', None)
+
+    def run_mode(self, mode, options, stripe_url):
+        """Run every visitor's bookings; return the request summary and completed bookings."""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['sessions']) as pool:
+            flows = [
+                flow
+                for visitor_flows in pool.map(
+                    lambda visitor: self.run_visitor(mode, visitor, options['bookings'], stripe_url),
+                    range(options['sessions']),
+                )
+                for flow in visitor_flows
+            ]
+        elapsed = time.perf_counter() - started
+
+        steps = [step for flow in flows for step in flow]
+        summary = summarize(
+            [seconds for _name, seconds, _queries, _ok in steps], elapsed,
+            errors=sum(1 for *_rest, ok in steps if not ok),
+        )
+        completed = sum(
+            1 for flow in flows
+            if len(flow) == len(BOOKING_STEPS) and all(ok for *_rest, ok in flow)
+        )
+        return summary, completed
+
+    def run_visitor(self, mode, visitor, bookings, stripe_url):
+        """Make ``bookings`` bookings in one session; each on its own slot."""
+        client = ServerClient()
+        first_day = timezone.localdate() + timedelta(days=1)
+        flows = []
+        try:
+            name = f'Dr. Conn {mode} {visitor}'
+            provider_id = resolve_providers([name])[name]
+            for i in range(bookings):
+                day, slot = divmod(i, len(TIME_SLOT_CHOICES))
+                flows.append(run_booking_flow(client, stripe_url, {
+                    'provider': provider_id,
+                    'client_email': f'conn{visitor}-{i}@example.com',
+                    'appointment_date': (first_day + timedelta(days=day)).isoformat(),
+                    'appointment_time_slot': TIME_SLOT_CHOICES[slot][0],
+                }))
+        finally:
+            # Each worker thread opened its own connection
+            connections.close_all()
+        return flows
+
+    def report(self, mode, summary, completed, opened):
+        self.stdout.write(
+            f'{format_summary(mode, summary)} | '
+            f'{completed} bookings, {opened} connections opened'
+        )
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from appointments.benchmark import seed_appointments
+from appointments.providers import resolve_providers
+from payments.loadtest import load_test_environment
+from payments.perf import (
+    QUERY_BUDGETS,
+    find_regressions,
+    load_baseline,
+    run_views,
+    save_baseline,
+    summarize_views,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a scratch database, time each booking view against a local fake '
+        'Stripe API and fail if a view is over its query budget or slower than '
+        'the stored baseline by more than the threshold.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                            help='Appointments to seed before timing (default: 100000)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed requests per view (default: 20)')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'perf_baseline.json'),
+                            help='Baseline file (default: perf_baseline.json in the project root)')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed slowdown of a median as a fraction (default: 0.25)')
+        parser.add_argument('--min-delta', type=float, default=1.0,
+                            help='Ignore slowdowns under this many ms (default: 1.0)')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Write this run as the new baseline instead of comparing')
+
+    def handle(self, *args, **options):
+        with load_test_environment() as server:
+            self.stdout.write(f"Seeding {options['rows']} appointments...")
+            seed_appointments(options['rows'])
+            provider_id = resolve_providers(['Dr. Perf'])['Dr. Perf']
+
+            client = Client()
+            # Untimed first pass: imports, URL resolver and template loading
+            run_views(client, server.url, provider_id, 0)
+            runs = [run_views(client, server.url, provider_id, i) for i in range(1, options['repeat'] + 1)]
+
+        summary = summarize_views(runs)
+        for name, view in summary.items():
+            self.stdout.write(
+                f"{name}: median {view['median_ms']:.2f} ms, p95 {view['p95_ms']:.2f} ms | "
+                f"queries {view['max_queries']}/{QUERY_BUDGETS[name]}"
+                + (f" | {view['errors']} errors" if view['errors'] else '')
+            )
+
+        failed = [name for name, view in summary.items() if view['errors']]
+        if failed:
+            raise CommandError(f"Requests failed: {', '.join(failed)}")
+
+        if options['update_baseline']:
+            save_baseline(options['baseline'], options['rows'], summary)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            # Without one the latency check would pass whatever the timings
+            raise CommandError(
+                f"No baseline at {options['baseline']}; run with --update-baseline to record one."
+            )
+        if baseline.get('rows') != options['rows']:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with {baseline.get('rows')} rows, this run used {options['rows']}."
+            ))
+
+        problems = find_regressions(summary, baseline, options['threshold'], options['min_delta'])
+        if problems:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('All views within their query budgets and baseline.'))
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from appointments import holds
+from appointments.models import Appointment
+from appointments.providers import resolve_providers
+from payments.loadtest import format_summary, load_test_environment, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the payment page with the sync views on a fixed pool of '
+        'worker threads (WSGI) and with the async views on one event loop '
+        '(ASGI), both against a local fake Stripe API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Payment page loads per run (default: 200)')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='WSGI worker threads (default: 8)')
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help='In-flight requests on the ASGI event loop (default: 200)')
+        parser.add_argument('--stripe-latency', type=float, default=0.2,
+                            help='Seconds the fake Stripe API waits per call (default: 0.2)')
+
+    def handle(self, *args, **options):
+        with load_test_environment(stripe_latency=options['stripe_latency']):
+            count = options['requests']
+            wsgi = self.run_wsgi(self.prepare_clients(count), options['workers'])
+            self.stdout.write(format_summary(f"WSGI ({options['workers']} threads)", wsgi))
+
+            # Later slots than the WSGI run's, which still hold theirs
+            asgi = self.run_asgi(self.prepare_clients(count, first=count), options['concurrency'])
+            self.stdout.write(format_summary(f"ASGI ({options['concurrency']} in flight)", asgi))
+
+        failed = [name for name, run in (('WSGI', wsgi), ('ASGI', asgi)) if run['errors']]
+        if failed:
+            # A page that failed or redirected was not the page being compared
+            raise CommandError(f"Requests failed: {', '.join(failed)}")
+
+        if wsgi['throughput']:
+            self.stdout.write(self.style.SUCCESS(
+                f"ASGI/WSGI throughput: {asgi['throughput'] / wsgi['throughput']:.1f}x"
+            ))
+
+    def prepare_clients(self, count, first=0):
+        """
+        Create ``count`` pending appointments, each holding its slot and with
+        its own session.
+
+        Args:
+            count: Number of appointments
+            first: Index of the first slot, so repeated calls book distinct slots
+        """
+        appointment_time = timezone.now() + timedelta(days=7)
+        provider_id = resolve_providers(['Dr. Load'])['Dr. Load']
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                provider_id=provider_id,
+                client_email=f'load{i}@example.com',
+                appointment_time=appointment_time + timedelta(minutes=i),
+            )
+            for i in range(first, first + count)
+        ])
+        # bulk_create skips save(), which holds the slot; the payment page
+        # turns away appointments without a hold
+        holds.hold_imported(appointments)
+
+        clients = []
+        for appointment in appointments:
+            client = Client()
+            session = client.session
+            session['pending_appointment_id'] = appointment.id
+            session.save()
+            clients.append(client)
+        return clients
+
+    def run_wsgi(self, clients, workers):
+        """Serve every client through the sync views on ``workers`` threads."""
+        def load(client):
+            started = time.perf_counter()
+            response = client.get('/payments/create/')
+            return time.perf_counter() - started, response.status_code == 200
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(load, clients))
+        elapsed = time.perf_counter() - started
+
+        return summarize(
+            [latency for latency, _ok in results], elapsed,
+            errors=sum(1 for _latency, ok in results if not ok),
+        )
+
+    def run_asgi(self, clients, concurrency):
+        """Serve every client through the async views on one event loop."""
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def load(client):
+                async_client = AsyncClient()
+                async_client.cookies = client.cookies
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await async_client.get('/payments/create/')
+                    return time.perf_counter() - started, response.status_code == 200
+
+            return await asyncio.gather(*(load(client) for client in clients))
+
+        with override_settings(ROOT_URLCONF='sofia_health.urls_async'):
+            started = time.perf_counter()
+            results = asyncio.run(run())
+            elapsed = time.perf_counter() - started
+
+        return summarize(
+            [latency for latency, _ok in results], elapsed,
+            errors=sum(1 for _latency, ok in results if not ok),
+        )
@@ -0,0 +1,112 @@
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from appointments.forms import TIME_SLOT_CHOICES
+from appointments.providers import resolve_providers
+from payments.loadtest import (
+    BOOKING_STEPS,
+    format_summary,
+    load_test_environment,
+    run_booking_flow,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the full booking flow (create appointment, payment page, '
+        'confirm, success) with concurrent sessions against a local fake '
+        'Stripe API and report latency, throughput and queries per step.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=10,
+                            help='Concurrent visitors (default: 10)')
+        parser.add_argument('--bookings', type=int, default=5,
+                            help='Bookings each visitor makes (default: 5)')
+        parser.add_argument('--stripe-latency', type=float, default=0.05,
+                            help='Seconds the fake Stripe API waits per call (default: 0.05)')
+        parser.add_argument('--stripe-jitter', type=float, default=0.0,
+                            help='Extra random delay of up to this many seconds per call')
+        parser.add_argument('--stripe-error-rate', type=float, default=0.0,
+                            help='Fraction of Stripe calls answered with a 500 (default: 0)')
+        parser.add_argument('--flow-mode', choices=['session', 'token'],
+                            help='Booking flow state storage (default: BOOKING_FLOW_MODE)')
+
+    def handle(self, *args, **options):
+        flow_mode = nullcontext()
+        if options['flow_mode']:
+            flow_mode = override_settings(BOOKING_FLOW_MODE=options['flow_mode'])
+        with flow_mode, load_test_environment(
+            stripe_latency=options['stripe_latency'],
+            jitter=options['stripe_jitter'],
+            error_rate=options['stripe_error_rate'],
+        ) as server:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['sessions']) as pool:
+                runs = list(pool.map(
+                    lambda visitor: self.run_visitor(visitor, options['bookings'], server.url),
+                    range(options['sessions']),
+                ))
+            elapsed = time.perf_counter() - started
+            stripe_requests = server.state.requests
+            stripe_errors = server.state.injected_errors
+
+        flows = [flow for visitor_flows in runs for flow in visitor_flows]
+        self.report(flows, elapsed)
+        self.stdout.write(
+            f'Fake Stripe: {stripe_requests} requests, {stripe_errors} injected errors'
+        )
+
+    def run_visitor(self, visitor, bookings, stripe_url):
+        """Make ``bookings`` bookings in one session; each on its own slot."""
+        client = Client()
+        first_day = timezone.localdate() + timedelta(days=1)
+        flows = []
+        try:
+            name = f'Dr. Load {visitor}'
+            provider_id = resolve_providers([name])[name]
+            for i in range(bookings):
+                day, slot = divmod(i, len(TIME_SLOT_CHOICES))
+                flows.append(run_booking_flow(client, stripe_url, {
+                    'provider': provider_id,
+                    'client_email': f'load{visitor}-{i}@example.com',
+                    'appointment_date': (first_day + timedelta(days=day)).isoformat(),
+                    'appointment_time_slot': TIME_SLOT_CHOICES[slot][0],
+                }))
+        finally:
+            # Each worker thread opened its own connection
+            connections.close_all()
+        return flows
+
+    def report(self, flows, elapsed):
+        completed = sum(
+            1 for flow in flows
+            if len(flow) == len(BOOKING_STEPS) and all(ok for *_rest, ok in flow)
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{completed}/{len(flows)} bookings completed in {elapsed:.2f} s '
+            f'({completed / elapsed if elapsed else 0:.1f} bookings/s)'
+        ))
+
+        for name in BOOKING_STEPS:
+            results = [result for flow in flows for result in flow if result[0] == name]
+            if not results:
+                continue
+            summary = summarize(
+                [seconds for _name, seconds, _queries, _ok in results], elapsed,
+                errors=sum(1 for *_rest, ok in results if not ok),
+            )
+            queries = [count for _name, _seconds, count, _ok in results]
+            self.stdout.write(
+                f'{format_summary(name, summary)} | '
+                f'queries avg {sum(queries) / len(queries):.1f}, max {max(queries)}'
+            )
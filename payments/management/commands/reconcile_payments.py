@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark appointments paid whose PaymentIntent succeeded on Stripe but '
+        'never reached confirm_payment. Pages through the PaymentIntents '
+        'created in the last --hours and updates matching rows in bulk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=48,
+                            help='Check PaymentIntents created in the last N hours (default: 48)')
+        parser.add_argument('--page-size', type=int, default=100,
+                            help='PaymentIntents per Stripe list request, at most 100 (default: 100)')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Threads for one-by-one lookups of unlisted intents (default: 4)')
+        parser.add_argument('--max-fallbacks', type=int, default=200,
+                            help='Most intents to look up one by one per run (default: 200)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Run again every N seconds until interrupted (default: run once)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['page_size'] <= 100:
+            raise CommandError('--page-size must be between 1 and 100')
+
+        while True:
+            try:
+                self.run_once(options)
+            except Exception as e:
+                if not options['interval']:
+                    raise CommandError(str(e))
+                # A periodic job keeps going and tries again next time
+                self.stderr.write(f'Reconciliation failed: {e}')
+
+            if not options['interval']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
+
+    def run_once(self, options):
+        started = time.perf_counter()
+        stats = reconcile(
+            since=timezone.now() - timedelta(hours=options['hours']),
+            page_size=options['page_size'],
+            workers=options['workers'],
+            max_fallbacks=options['max_fallbacks'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.perf_counter() - started
+
+        verb = 'would mark' if options['dry_run'] else 'marked'
+        self.stdout.write(self.style.SUCCESS(
+            f"Listed {stats['listed']} PaymentIntents in {stats['pages']} pages, "
+            f"{verb} {stats['updated']} appointments paid in {elapsed:.2f} s"
+        ))
+        if stats['fallback_checked']:
+            self.stdout.write(
+                f"Looked up {stats['fallback_checked']} unlisted intents one by one: "
+                f"{verb} {stats['fallback_updated']} paid, {stats['errors']} errors"
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from payments.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve a local stand-in for the Stripe PaymentIntent API. Point '
+        'STRIPE_API_BASE at the printed URL to run the app against it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1',
+                            help='Interface to bind (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=12111,
+                            help='Port to listen on (default: 12111)')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Seconds to wait before every response (default: 0)')
+        parser.add_argument('--jitter', type=float, default=0.0,
+                            help='Extra random delay of up to this many seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Fraction of requests to fail (default: 0)')
+        parser.add_argument('--error-status', type=int, default=500,
+                            help='HTTP status for injected failures (default: 500)')
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake Stripe API listening on {server.url}'))
+        self.stdout.write(f'Set STRIPE_API_BASE={server.url} and restart the app to use it.')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
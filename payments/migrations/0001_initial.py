@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_id",
+                    models.CharField(
+                        help_text="Stripe Event ID", max_length=255, unique=True
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(help_text="Stripe event type", max_length=100),
+                ),
+                (
+                    "payment_intent_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="Stripe PaymentIntent ID the event refers to",
+                        max_length=255,
+                        null=True,
+                    ),
+                ),
+                (
+                    "received_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Timestamp when the event was processed",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stripe Event",
+                "verbose_name_plural": "Stripe Events",
+                "ordering": ["-received_at"],
+            },
+        ),
+    ]
@@ -1,3 +1,47 @@
 from django.db import models
 
-# Create your models here.
+
+class StripeEvent(models.Model):
+    """
+    Stripe webhook event that has already been processed.
+
+    Stripe delivers events at least once; storing the event ID lets the
+    webhook ignore redeliveries.
+
+    Fields:
+        event_id: Stripe Event ID (evt_...)
+        event_type: Event type, e.g. payment_intent.succeeded
+        payment_intent_id: PaymentIntent the event refers to, if any
+        received_at: Timestamp when the event was first processed
+    """
+
+    event_id = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Stripe Event ID"
+    )
+
+    event_type = models.CharField(
+        max_length=100,
+        help_text="Stripe event type"
+    )
+
+    payment_intent_id = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="Stripe PaymentIntent ID the event refers to"
+    )
+
+    received_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when the event was processed"
+    )
+
+    class Meta:
+        ordering = ['-received_at']
+        verbose_name = "Stripe Event"
+        verbose_name_plural = "Stripe Events"
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
@@ -0,0 +1,182 @@
+"""
+Query budgets and latency baselines for the booking views.
+
+``QUERY_BUDGETS`` caps the queries each view may run on a cold cache; the
+test suite fails as soon as a change goes over (an N+1 in
+``appointment_list``, an extra save in ``create_payment``). Lower a budget
+when a view gets cheaper so the gain is kept.
+
+``python manage.py benchmark_views`` times the same views against a seeded
+database and compares the medians with a stored baseline file.
+"""
+
+import json
+import statistics
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connections
+from django.utils import timezone
+
+from appointments.forms import TIME_SLOT_CHOICES
+from .loadtest import BOOKING_STEPS, QueryCounter, percentile, run_booking_flow, timed_request
+
+
+# Most queries each view may run, with the booking flow kept in the session
+QUERY_BUDGETS = {
+    'create_appointment (GET)': 1,
+    'create_appointment (POST)': 7,
+    'payment_create': 3,
+    'payment_confirm': 7,
+    'appointment_success': 4,
+    'appointment_list': 2,
+    'appointment_query': 2,
+    'slot_availability': 1,
+    'month_availability': 1,
+}
+
+VIEWS = [*BOOKING_STEPS, 'appointment_list', 'appointment_query', 'slot_availability', 'month_availability']
+
+
+def booking_for(provider_id: int, index: int) -> Dict:
+    """Form data for the ``index``-th booking, each on a slot of its own."""
+    day, slot = divmod(index, len(TIME_SLOT_CHOICES))
+    return {
+        'provider': provider_id,
+        'client_email': f'perf{index}@example.com',
+        'appointment_date': (timezone.localdate() + timedelta(days=1 + day)).isoformat(),
+        'appointment_time_slot': TIME_SLOT_CHOICES[slot][0],
+    }
+
+
+def run_views(client, stripe_url: str, provider_id: int, index: int = 0) -> List[Tuple]:
+    """
+    Request every view in ``VIEWS`` once: a full booking, then the list, the
+    JSON API and the provider's availability for the day and the month.
+
+    Returns:
+        List of (view, seconds, query count, ok) tuples, as ``run_booking_flow``
+    """
+    booking = booking_for(provider_id, index)
+    results = run_booking_flow(client, stripe_url, booking)
+
+    for name, path, data in [
+        ('appointment_list', '/appointments/list/', None),
+        ('appointment_query', '/appointments/api/', {'provider': provider_id}),
+        ('slot_availability', '/appointments/availability/',
+         {'provider': provider_id, 'date': booking['appointment_date']}),
+        ('month_availability', '/appointments/availability/month/',
+         {'provider': provider_id, 'month': booking['appointment_date'][:7]}),
+    ]:
+        _response, elapsed, queries, ok = timed_request(client, 'get', path, data)
+        results.append((name, elapsed, queries, ok))
+    return results
+
+
+class QueryBudgetCounter(QueryCounter):
+    """``QueryCounter`` that also keeps the SQL, for failure messages."""
+
+    def __init__(self):
+        super().__init__()
+        self.statements = []
+
+    def record(self, sql: str):
+        super().record(sql)
+        self.statements.append(sql)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin with an ``assertNumQueries``-style guard for ``QUERY_BUDGETS``."""
+
+    @contextmanager
+    def assertQueryBudget(self, view: str, using: str = 'default'):
+        """Fail if the block runs more queries than ``QUERY_BUDGETS[view]``."""
+        counter = QueryBudgetCounter()
+        with connections[using].execute_wrapper(counter):
+            yield counter
+        self.assertLessEqual(
+            len(counter.statements), QUERY_BUDGETS[view],
+            '{} ran {} queries, over its budget of {}:\n{}'.format(
+                view, len(counter.statements), QUERY_BUDGETS[view],
+                '\n'.join(f'{i}. {sql}' for i, sql in enumerate(counter.statements, 1)),
+            ),
+        )
+
+    def assertWithinBudgets(self, results: List[Tuple]):
+        """Fail if any step returned by ``run_views`` went over its budget."""
+        for name, _seconds, queries, ok in results:
+            self.assertTrue(ok, f'{name} failed')
+            self.assertLessEqual(
+                queries, QUERY_BUDGETS[name], f'{name} ran {queries} queries, over its budget',
+            )
+
+
+def summarize_views(runs: List[List[Tuple]]) -> Dict:
+    """
+    Summarise repeated ``run_views`` results per view.
+
+    Returns:
+        Dict mapping each view to its median and p95 latency (ms), most
+        queries and failed requests
+    """
+    summary = {}
+    for name in VIEWS:
+        results = [result for run in runs for result in run if result[0] == name]
+        if not results:
+            continue
+        latencies = [seconds for _name, seconds, _queries, _ok in results]
+        summary[name] = {
+            'median_ms': statistics.median(latencies) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'max_queries': max(queries for _name, _seconds, queries, _ok in results),
+            'errors': sum(1 for *_rest, ok in results if not ok),
+        }
+    return summary
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    """Return the stored baseline, or None if there is none yet."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path: str, rows: int, summary: Dict):
+    with open(path, 'w') as f:
+        json.dump({
+            'rows': rows,
+            'views': {name: {'median_ms': round(view['median_ms'], 3)} for name, view in summary.items()},
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def find_regressions(summary: Dict, baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    Compare medians with the baseline.
+
+    Args:
+        summary: Result of ``summarize_views``
+        baseline: Contents of the baseline file
+        threshold: Allowed slowdown as a fraction (0.2 = 20% slower)
+        min_delta_ms: Slowdowns smaller than this are noise, whatever the ratio
+
+    Returns:
+        One message per view over its query budget or slower than allowed
+    """
+    problems = []
+    for name, view in summary.items():
+        if view['max_queries'] > QUERY_BUDGETS[name]:
+            problems.append(f"{name}: {view['max_queries']} queries, budget {QUERY_BUDGETS[name]}")
+        before = baseline.get('views', {}).get(name)
+        if before is None:
+            continue
+        limit = before['median_ms'] * (1 + threshold)
+        if view['median_ms'] > limit and view['median_ms'] - before['median_ms'] > min_delta_ms:
+            problems.append(
+                f"{name}: median {view['median_ms']:.2f} ms, baseline {before['median_ms']:.2f} ms "
+                f"(+{(view['median_ms'] / before['median_ms'] - 1) * 100:.0f}%)"
+            )
+    return problems
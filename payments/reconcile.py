@@ -0,0 +1,151 @@
+"""
+Reconciliation of unpaid appointments against Stripe.
+
+An appointment stays ``is_paid=False`` when the browser never reached
+``confirm_payment`` and no webhook arrived. ``reconcile`` pages through the
+PaymentIntents Stripe created in a time window, up to 100 per request, and
+marks the appointments of succeeded intents paid with one ``UPDATE`` per
+page. Unpaid appointments whose intent the listing did not return are
+then checked one ID at a time on a small thread pool.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from appointments import caching
+from appointments.holds import keep_slots
+from appointments.models import Appointment
+from taskqueue.queue import enqueue_many
+from .services.stripe_service import StripeService
+from .tasks import send_payment_confirmation
+
+
+logger = logging.getLogger(__name__)
+
+SUCCEEDED = 'succeeded'
+
+
+def mark_paid_bulk(payment_intent_ids: Iterable[str], dry_run: bool = False) -> int:
+    """
+    Mark the unpaid appointments owning ``payment_intent_ids`` as paid.
+
+    Args:
+        payment_intent_ids: IDs of succeeded PaymentIntents
+        dry_run: Only count the appointments that would change
+
+    Returns:
+        Number of appointments marked paid (or that would be)
+    """
+    payment_intent_ids = list(payment_intent_ids)
+    if not payment_intent_ids:
+        return 0
+
+    unpaid = Appointment.objects.filter(payment_intent_id__in=payment_intent_ids, is_paid=False)
+    if dry_run:
+        return unpaid.count()
+
+    with transaction.atomic():
+        # Locked and read inside the transaction, so a webhook cannot flip
+        # a row (and queue its own email) between this read and the update
+        appointments = list(unpaid.select_for_update().only('id', 'provider'))
+        if not appointments:
+            return 0
+        ids = [appointment.pk for appointment in appointments]
+        Appointment.objects.filter(pk__in=ids, is_paid=False).update(is_paid=True, updated_at=timezone.now())
+        keep_slots(ids)
+        enqueue_many(send_payment_confirmation, [{'appointment_id': pk} for pk in ids])
+        # update() sends no post_save, so retire the cached list entries here
+        provider_ids = {appointment.provider_id for appointment in appointments}
+        transaction.on_commit(lambda: caching.invalidate(*provider_ids))
+
+    return len(appointments)
+
+
+def _retrieve_status(payment_intent_id: str) -> Optional[str]:
+    try:
+        return StripeService.retrieve_payment_intent(payment_intent_id)['status']
+    except Exception as e:
+        logger.warning("Could not retrieve PaymentIntent %s: %s", payment_intent_id, e)
+        return None
+
+
+def reconcile(
+    since: datetime,
+    until: Optional[datetime] = None,
+    page_size: int = 100,
+    workers: int = 4,
+    max_fallbacks: int = 200,
+    dry_run: bool = False,
+) -> Dict:
+    """
+    Bring ``is_paid`` in line with Stripe for PaymentIntents created in a window.
+
+    Args:
+        since: Start of the window
+        until: End of the window, or None for up to now
+        page_size: PaymentIntents per list request (at most 100)
+        workers: Threads retrieving intents the listing did not return
+        max_fallbacks: Most intents to retrieve one by one in a run
+        dry_run: Report what would change without writing
+
+    Returns:
+        Dict of counters: pages, listed, succeeded, updated,
+        fallback_checked, fallback_updated and errors
+
+    Raises:
+        Exception: If a list request fails
+    """
+    stats = dict.fromkeys(
+        ['pages', 'listed', 'succeeded', 'updated', 'fallback_checked', 'fallback_updated', 'errors'], 0
+    )
+    created_gte = int(since.timestamp())
+    created_lt = int(until.timestamp()) if until else None
+
+    listed = set()
+    starting_after = None
+    while True:
+        page = StripeService.list_payment_intents(
+            created_gte, created_lt, limit=page_size, starting_after=starting_after,
+        )
+        stats['pages'] += 1
+        stats['listed'] += len(page['data'])
+        listed.update(intent['id'] for intent in page['data'])
+
+        succeeded = [intent['id'] for intent in page['data'] if intent['status'] == SUCCEEDED]
+        stats['succeeded'] += len(succeeded)
+        stats['updated'] += mark_paid_bulk(succeeded, dry_run)
+
+        if not page['has_more'] or not page['data']:
+            break
+        starting_after = page['data'][-1]['id']
+
+    # Unpaid appointments given an intent in the window that the listing
+    # missed, e.g. one created just before the window opened
+    candidates = Appointment.objects.filter(
+        is_paid=False, payment_intent_id__isnull=False, updated_at__gte=since,
+    )
+    if until:
+        candidates = candidates.filter(updated_at__lt=until)
+
+    missing = []
+    for payment_intent_id in candidates.values_list('payment_intent_id', flat=True).iterator():
+        if payment_intent_id not in listed:
+            missing.append(payment_intent_id)
+            if len(missing) >= max_fallbacks:
+                break
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = list(pool.map(_retrieve_status, missing))
+        stats['fallback_checked'] = len(missing)
+        stats['errors'] = statuses.count(None)
+        stats['fallback_updated'] = mark_paid_bulk(
+            [pi_id for pi_id, status in zip(missing, statuses) if status == SUCCEEDED], dry_run,
+        )
+
+    return stats
@@ -5,13 +5,296 @@ This module handles all Stripe-related payment operations,
 keeping the business logic separate from views.
 """
 
+import asyncio
+import contextvars
+import random
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
 import stripe
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from typing import Dict, Optional
 
+from metrics import registry as metrics
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - async Stripe calls need httpx
+    httpx = None
+
+
+# Deadline of the Stripe call in progress; a context variable so it is
+# tracked per thread and per asyncio task
+_deadline = contextvars.ContextVar('stripe_call_deadline', default=None)
+
+
+if httpx is not None:
+    class LoopLocalHTTPXClient(stripe.HTTPXClient):
+        """
+        Async Stripe HTTP client keeping one pooled ``httpx.AsyncClient``
+        per event loop, since httpx connections cannot move between loops.
+
+        A loop's client is closed by the loop's ``shutdown_asyncgens()``,
+        which ``asyncio.run`` (and so uvicorn and ``async_to_sync``) runs
+        before closing the loop, so connections do not outlive it.
+        """
+
+        def __init__(self, **kwargs):
+            self._clients = {}
+            super().__init__(**kwargs)
+
+        @property
+        def _client_async(self):
+            # Read by HTTPXClient's request methods
+            return self._clients[asyncio.get_running_loop()][0]
+
+        @_client_async.setter
+        def _client_async(self, client):
+            # HTTPXClient.__init__ builds one up front; clients are built per
+            # loop on first use instead, and this one never opens a connection
+            pass
+
+        async def _open(self):
+            loop = asyncio.get_running_loop()
+            if loop in self._clients:
+                return
+            # Loops closed without shutdown_asyncgens(): nothing can await
+            # their clients any more
+            for other in [other for other in self._clients if other.is_closed()]:
+                del self._clients[other]
+            closer = self._close_at_shutdown(loop)
+            self._clients[loop] = (
+                self.httpx.AsyncClient(verify=ssl.create_default_context(cafile=stripe.ca_bundle_path)),
+                closer,
+            )
+            # Started, so the loop tracks it and closes it on shutdown
+            await closer.asend(None)
+
+        async def _close_at_shutdown(self, loop):
+            try:
+                yield
+            finally:
+                await self._close(loop)
+
+        async def _close(self, loop):
+            entry = self._clients.pop(loop, None)
+            if entry is not None:
+                await entry[0].aclose()
+
+        async def request_async(self, method, url, headers, post_data=None):
+            await self._open()
+            return await super().request_async(method, url, headers, post_data)
 
-# Configure Stripe API key
-stripe.api_key = settings.STRIPE_SECRET_KEY
+        async def request_stream_async(self, method, url, headers, post_data=None):
+            await self._open()
+            return await super().request_stream_async(method, url, headers, post_data)
+
+        async def close_async(self):
+            await self._close(asyncio.get_running_loop())
+
+
+class PooledRequestsClient(stripe.RequestsClient):
+    """
+    Stripe HTTP client with keep-alive sessions and bounded retries.
+
+    Each thread gets its own ``requests.Session`` so connections (and TLS
+    sessions) are reused between calls without sharing a session across
+    threads; a thread makes one call at a time, so each session keeps a
+    single connection. Retries use jittered exponential backoff and stop once the
+    per-call time budget would be exceeded.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        time_budget: float,
+    ):
+        async_client = None
+        if httpx is not None:
+            async_client = LoopLocalHTTPXClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+
+        super().__init__(
+            timeout=(connect_timeout, read_timeout),
+            async_fallback_client=async_client,
+        )
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.time_budget = time_budget
+
+    def _ensure_session(self):
+        if getattr(self._thread_local, 'session', None) is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._thread_local.session = session
+
+    def request(self, method, url, headers, post_data=None):
+        self._ensure_session()
+        return super().request(method, url, headers, post_data)
+
+    def request_stream(self, method, url, headers, post_data=None):
+        self._ensure_session()
+        return super().request_stream(method, url, headers, post_data)
+
+    def request_with_retries(self, *args, **kwargs):
+        token = _deadline.set(time.monotonic() + self.time_budget)
+        try:
+            return super().request_with_retries(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    async def request_with_retries_async(self, *args, **kwargs):
+        token = _deadline.set(time.monotonic() + self.time_budget)
+        try:
+            return await super().request_with_retries_async(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    def _sleep_time_seconds(self, num_retries, response=None):
+        delay = min(
+            self.retry_base_delay * (2 ** (num_retries - 1)),
+            self.retry_max_delay,
+        )
+        # Jitter in [delay / 2, delay] spreads out retries from many workers
+        return delay * random.uniform(0.5, 1.0)
+
+    def _should_retry(self, response, api_connection_error, num_retries, max_network_retries):
+        deadline = _deadline.get()
+        if deadline is not None:
+            # Leave room for the worst-case backoff plus one more attempt
+            worst_case = min(
+                self.retry_base_delay * (2 ** num_retries),
+                self.retry_max_delay,
+            ) + sum(self._timeout)
+            if time.monotonic() + worst_case > deadline:
+                return False
+
+        return super()._should_retry(
+            response, api_connection_error, num_retries, max_network_retries
+        )
+
+    def close(self):
+        session = getattr(self._thread_local, 'session', None)
+        if session is not None:
+            session.close()
+            self._thread_local.session = None
+
+
+class CallStats:
+    """Thread-safe per-method latency and error counters for Stripe calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                'count': 0,
+                'errors': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+            })
+            stats['count'] += 1
+            stats['errors'] += int(error)
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the counters keyed by method name."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+call_stats = CallStats()
+
+_client_lock = threading.Lock()
+_client = None
+
+
+def get_http_client() -> PooledRequestsClient:
+    """
+    Return the shared Stripe HTTP client, configuring the SDK on first use.
+
+    Returns:
+        The PooledRequestsClient installed as stripe.default_http_client
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = PooledRequestsClient(
+                    connect_timeout=settings.STRIPE_CONNECT_TIMEOUT,
+                    read_timeout=settings.STRIPE_READ_TIMEOUT,
+                    retry_base_delay=settings.STRIPE_RETRY_BASE_DELAY,
+                    retry_max_delay=settings.STRIPE_RETRY_MAX_DELAY,
+                    time_budget=settings.STRIPE_TIME_BUDGET,
+                )
+                stripe.api_key = settings.STRIPE_SECRET_KEY
+                stripe.api_base = settings.STRIPE_API_BASE
+                stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+                stripe.default_http_client = client
+                _client = client
+
+    return _client
+
+
+def reset_http_client():
+    """Drop the shared client so the next call picks up current settings."""
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        stripe.default_http_client = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting.startswith('STRIPE_'):
+        reset_http_client()
+
+
+@contextmanager
+def _timed(name: str):
+    """
+    Record the latency of a Stripe call and whether it raised.
+
+    Also usable around ``await`` in the async methods.
+    """
+    get_http_client()
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        call_stats.record(name, elapsed, error)
+        labels = (('method', name),)
+        metrics.inc('stripe_calls_total', labels)
+        metrics.observe('stripe_call_duration_seconds', elapsed, labels)
+        if error:
+            metrics.inc('stripe_call_errors_total', labels)
 
 
 class StripeService:
@@ -21,7 +304,8 @@ class StripeService:
     def create_payment_intent(
         amount: int,
         currency: str = 'usd',
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """
         Create a Stripe PaymentIntent.
@@ -30,22 +314,26 @@ class StripeService:
             amount: Payment amount in cents (e.g., 5000 for $50.00)
             currency: Currency code (default: 'usd')
             metadata: Optional metadata to attach to the payment
+            idempotency_key: Optional key; repeating a call with the same key
+                returns the PaymentIntent created by the first call
 
         Returns:
             Dict containing PaymentIntent details including client_secret
 
         Raises:
-            stripe.error.StripeError: If payment intent creation fails
+            stripe.StripeError: If payment intent creation fails
         """
         try:
-            payment_intent = stripe.PaymentIntent.create(
-                amount=amount,
-                currency=currency,
-                metadata=metadata or {},
-                automatic_payment_methods={
-                    'enabled': True,
-                }
-            )
+            with _timed('create_payment_intent'):
+                payment_intent = stripe.PaymentIntent.create(
+                    amount=amount,
+                    currency=currency,
+                    metadata=metadata or {},
+                    automatic_payment_methods={
+                        'enabled': True,
+                    },
+                    idempotency_key=idempotency_key,
+                )
 
             return {
                 'id': payment_intent.id,
@@ -55,7 +343,7 @@ class StripeService:
                 'status': payment_intent.status,
             }
 
-        except stripe.error.StripeError as e:
+        except stripe.StripeError as e:
             raise Exception(f"Stripe error: {str(e)}")
 
     @staticmethod
@@ -70,20 +358,71 @@ class StripeService:
             Dict containing PaymentIntent details
 
         Raises:
-            stripe.error.StripeError: If retrieval fails
+            stripe.StripeError: If retrieval fails
         """
         try:
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            with _timed('retrieve_payment_intent'):
+                payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
 
             return {
                 'id': payment_intent.id,
+                'client_secret': payment_intent.client_secret,
                 'amount': payment_intent.amount,
                 'currency': payment_intent.currency,
                 'status': payment_intent.status,
                 'metadata': payment_intent.metadata,
             }
 
-        except stripe.error.StripeError as e:
+        except stripe.StripeError as e:
+            raise Exception(f"Stripe error: {str(e)}")
+
+    @staticmethod
+    def list_payment_intents(
+        created_gte: int,
+        created_lt: Optional[int] = None,
+        limit: int = 100,
+        starting_after: Optional[str] = None
+    ) -> Dict:
+        """
+        List one page of PaymentIntents created in a time window, newest first.
+
+        Args:
+            created_gte: Start of the window (Unix timestamp, inclusive)
+            created_lt: Optional end of the window (Unix timestamp, exclusive)
+            limit: Page size, at most 100
+            starting_after: ID of the last PaymentIntent of the previous page
+
+        Returns:
+            Dict with the page's PaymentIntents under 'data' (id, amount,
+            status and created of each) and 'has_more'
+
+        Raises:
+            stripe.StripeError: If the request fails
+        """
+        params = {'created': {'gte': created_gte}, 'limit': limit}
+        if created_lt is not None:
+            params['created']['lt'] = created_lt
+        if starting_after:
+            params['starting_after'] = starting_after
+
+        try:
+            with _timed('list_payment_intents'):
+                page = stripe.PaymentIntent.list(**params)
+
+            return {
+                'data': [
+                    {
+                        'id': payment_intent.id,
+                        'amount': payment_intent.amount,
+                        'status': payment_intent.status,
+                        'created': payment_intent.created,
+                    }
+                    for payment_intent in page.data
+                ],
+                'has_more': page.has_more,
+            }
+
+        except stripe.StripeError as e:
             raise Exception(f"Stripe error: {str(e)}")
 
     @staticmethod
@@ -98,10 +437,92 @@ class StripeService:
             Boolean indicating if payment succeeded
         """
         try:
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            with _timed('confirm_payment'):
+                payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            return payment_intent.status == 'succeeded'
+
+        except stripe.StripeError:
+            return False
+
+    @staticmethod
+    def construct_webhook_event(payload: bytes, sig_header: str):
+        """
+        Verify a webhook signature and parse the event.
+
+        Args:
+            payload: Raw request body
+            sig_header: Value of the Stripe-Signature header
+
+        Returns:
+            The verified stripe.Event
+
+        Raises:
+            ValueError: If the payload is not valid JSON
+            stripe.SignatureVerificationError: If the signature is invalid
+        """
+        return stripe.Webhook.construct_event(
+            payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
+        )
+
+    @staticmethod
+    async def acreate_payment_intent(
+        amount: int,
+        currency: str = 'usd',
+        metadata: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Async version of ``create_payment_intent``."""
+        try:
+            with _timed('create_payment_intent'):
+                payment_intent = await stripe.PaymentIntent.create_async(
+                    amount=amount,
+                    currency=currency,
+                    metadata=metadata or {},
+                    automatic_payment_methods={
+                        'enabled': True,
+                    },
+                    idempotency_key=idempotency_key,
+                )
+
+            return {
+                'id': payment_intent.id,
+                'client_secret': payment_intent.client_secret,
+                'amount': payment_intent.amount,
+                'currency': payment_intent.currency,
+                'status': payment_intent.status,
+            }
+
+        except stripe.StripeError as e:
+            raise Exception(f"Stripe error: {str(e)}")
+
+    @staticmethod
+    async def aretrieve_payment_intent(payment_intent_id: str) -> Dict:
+        """Async version of ``retrieve_payment_intent``."""
+        try:
+            with _timed('retrieve_payment_intent'):
+                payment_intent = await stripe.PaymentIntent.retrieve_async(payment_intent_id)
+
+            return {
+                'id': payment_intent.id,
+                'client_secret': payment_intent.client_secret,
+                'amount': payment_intent.amount,
+                'currency': payment_intent.currency,
+                'status': payment_intent.status,
+                'metadata': payment_intent.metadata,
+            }
+
+        except stripe.StripeError as e:
+            raise Exception(f"Stripe error: {str(e)}")
+
+    @staticmethod
+    async def aconfirm_payment(payment_intent_id: str) -> bool:
+        """Async version of ``confirm_payment``."""
+        try:
+            with _timed('confirm_payment'):
+                payment_intent = await stripe.PaymentIntent.retrieve_async(payment_intent_id)
             return payment_intent.status == 'succeeded'
 
-        except stripe.error.StripeError:
+        except stripe.StripeError:
             return False
 
 
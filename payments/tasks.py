@@ -0,0 +1,30 @@
+"""
+Background tasks run after a payment, by ``python manage.py run_worker``.
+
+Queued by ``payments.webhooks`` when an appointment is first marked paid,
+so they stay off the request that confirmed the payment.
+"""
+
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from appointments.models import Appointment
+from taskqueue.queue import task
+
+
+@task(name='payments.send_payment_confirmation')
+def send_payment_confirmation(appointment_id: int):
+    """Email the client that their appointment is paid and booked."""
+    appointment = Appointment.objects.select_related('provider').get(pk=appointment_id)
+    appointment_time = timezone.localtime(appointment.appointment_time)
+
+    send_mail(
+        subject='Your appointment is confirmed',
+        message=(
+            f'Your payment was received. Your appointment with '
+            f'{appointment.provider.name} is on '
+            f'{appointment_time:%A, %B %d, %Y at %I:%M %p}.'
+        ),
+        from_email=None,
+        recipient_list=[appointment.client_email],
+    )
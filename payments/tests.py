@@ -1,9 +1,23 @@
-from django.test import TestCase
-from unittest.mock import patch, MagicMock
-from appointments.models import Appointment
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from unittest.mock import patch, AsyncMock, MagicMock
+from appointments.models import Appointment, Provider, SlotHold
 from django.utils import timezone
 from datetime import timedelta
-from .services.stripe_service import StripeService
+from django.core.cache import cache
+from django.test import Client
+from .fake_stripe import FakeStripeServer
+from .loadtest import BOOKING_STEPS, QueryCounter, run_booking_flow
+from .models import StripeEvent
+from .perf import VIEWS, QueryBudgetMixin, booking_for, find_regressions, run_views
+from .services.stripe_service import StripeService, call_stats
 
 
 class StripeServiceTest(TestCase):
@@ -89,7 +103,7 @@ class PaymentViewTest(TestCase):
         """Set up test data."""
         self.future_time = timezone.now() + timedelta(days=1)
         self.appointment = Appointment.objects.create(
-            provider_name="Dr. Smith",
+            provider=Provider.objects.create(name="Dr. Smith"),
             client_email="test@example.com",
             appointment_time=self.future_time
         )
@@ -123,3 +137,677 @@ class PaymentViewTest(TestCase):
         # Note: This will fail without template, but tests the logic
         self.assertEqual(response.status_code, 200)
         mock_create.assert_called_once()
+
+    @patch('payments.views.StripeService.create_payment_intent')
+    def test_create_payment_slot_lost(self, mock_create):
+        """Test an unpaid booking whose slot went to someone else is sent back."""
+        SlotHold.objects.filter(appointment=self.appointment).delete()
+        session = self.client.session
+        session['pending_appointment_id'] = self.appointment.id
+        session.save()
+
+        response = self.client.get('/payments/create/')
+
+        self.assertRedirects(response, '/appointments/create/', fetch_redirect_response=False)
+        mock_create.assert_not_called()
+
+
+WEBHOOK_SECRET = 'whsec_test_secret'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTest(TestCase):
+    """Test cases for the Stripe webhook endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.appointment = Appointment.objects.create(
+            provider=Provider.objects.create(name="Dr. Smith"),
+            client_email="test@example.com",
+            appointment_time=timezone.now() + timedelta(days=1),
+            payment_intent_id='pi_test_123'
+        )
+
+    def post_event(self, event_id, event_type, secret=WEBHOOK_SECRET):
+        """Post a signed webhook event."""
+        payload = json.dumps({
+            'id': event_id,
+            'object': 'event',
+            'type': event_type,
+            'data': {'object': {'id': 'pi_test_123', 'object': 'payment_intent'}},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(
+            secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256
+        ).hexdigest()
+
+        return self.client.post(
+            '/payments/webhook/',
+            data=payload,
+            content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}'
+        )
+
+    def test_succeeded_marks_appointment_paid(self):
+        """Test payment_intent.succeeded flips is_paid."""
+        response = self.post_event('evt_1', 'payment_intent.succeeded')
+
+        self.assertEqual(response.status_code, 200)
+        self.appointment.refresh_from_db()
+        self.assertTrue(self.appointment.is_paid)
+        self.assertIsNone(self.appointment.slot_hold.expires_at)
+        self.assertTrue(StripeEvent.objects.filter(event_id='evt_1').exists())
+
+    def test_mark_paid_rolls_back_on_failure(self):
+        """Test a failure after the flip leaves the appointment unpaid, so a retry queues the email."""
+        from taskqueue.models import Task
+        from .webhooks import mark_paid
+
+        with patch('payments.webhooks.enqueue', side_effect=RuntimeError('queue down')):
+            with self.assertRaises(RuntimeError):
+                mark_paid('pi_test_123')
+        self.appointment.refresh_from_db()
+        self.assertFalse(self.appointment.is_paid)
+
+        self.assertEqual(mark_paid('pi_test_123'), 1)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_duplicate_event_ignored(self):
+        """Test a redelivered event is acknowledged but not reapplied."""
+        self.post_event('evt_1', 'payment_intent.succeeded')
+        response = self.post_event('evt_1', 'payment_intent.succeeded')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_integrity_error_while_applying_retried(self):
+        """Test an integrity error after recording the event fails the delivery, so Stripe retries."""
+        from django.db import IntegrityError
+        from .webhooks import handle_event
+
+        event = {
+            'id': 'evt_1',
+            'type': 'payment_intent.succeeded',
+            'data': {'object': {'id': 'pi_test_123'}},
+        }
+        with patch('payments.webhooks.holds.keep_slots', side_effect=IntegrityError('slot')):
+            with self.assertRaises(IntegrityError):
+                handle_event(event)
+        self.assertFalse(StripeEvent.objects.exists())
+
+        self.assertTrue(handle_event(event))
+        self.appointment.refresh_from_db()
+        self.assertTrue(self.appointment.is_paid)
+
+    def test_failed_event_leaves_appointment_unpaid(self):
+        """Test payment_intent.payment_failed is recorded only."""
+        self.post_event('evt_2', 'payment_intent.payment_failed')
+
+        self.appointment.refresh_from_db()
+        self.assertFalse(self.appointment.is_paid)
+        self.assertTrue(StripeEvent.objects.filter(event_id='evt_2').exists())
+
+    def test_invalid_signature_rejected(self):
+        """Test events signed with the wrong secret are rejected."""
+        response = self.post_event('evt_3', 'payment_intent.succeeded', secret='whsec_wrong')
+
+        self.assertEqual(response.status_code, 400)
+        self.appointment.refresh_from_db()
+        self.assertFalse(self.appointment.is_paid)
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_confirm_payment_uses_local_state(self, mock_retrieve):
+        """Test confirm_payment answers from the database without Stripe."""
+        response = self.client.post('/payments/confirm/', {'payment_intent_id': 'pi_test_123'})
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json()['pending'])
+
+        self.post_event('evt_1', 'payment_intent.succeeded')
+
+        response = self.client.post('/payments/confirm/', {'payment_intent_id': 'pi_test_123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        mock_retrieve.assert_not_called()
+
+
+class StripeHTTPClientTest(TestCase):
+    """Test StripeService's HTTP client against the local fake Stripe API."""
+
+    def setUp(self):
+        """Start the fake server and point the Stripe client at it."""
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=self.server.url,
+            STRIPE_READ_TIMEOUT=0.5,
+            STRIPE_MAX_NETWORK_RETRIES=2,
+            STRIPE_RETRY_BASE_DELAY=0.01,
+            STRIPE_RETRY_MAX_DELAY=0.02,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_stats.reset()
+
+    def test_connection_reused_between_calls(self):
+        """Test consecutive calls share one keep-alive connection."""
+        created = StripeService.create_payment_intent(amount=5000)
+        retrieved = StripeService.retrieve_payment_intent(created['id'])
+
+        self.assertEqual(retrieved['id'], created['id'])
+        self.assertEqual(retrieved['amount'], 5000)
+        self.assertEqual(self.server.state.connections, 1)
+
+    def test_retries_server_errors(self):
+        """Test 5xx responses are retried within the retry limit."""
+        self.server.state.fail_next(2)
+
+        result = StripeService.create_payment_intent(amount=5000)
+
+        self.assertTrue(result['id'].startswith('pi_fake_'))
+        self.assertEqual(self.server.state.requests, 3)
+
+    def test_gives_up_after_retry_limit(self):
+        """Test errors surface once retries are exhausted."""
+        self.server.state.fail_next(3)
+
+        with self.assertRaises(Exception):
+            StripeService.create_payment_intent(amount=5000)
+        self.assertEqual(self.server.state.requests, 3)
+        self.assertEqual(call_stats.snapshot()['create_payment_intent']['errors'], 1)
+
+    @override_settings(STRIPE_MAX_NETWORK_RETRIES=0)
+    def test_read_timeout(self):
+        """Test a slow response is cut off by the read timeout."""
+        self.server.state.latency = 1.0
+
+        started = time.monotonic()
+        with self.assertRaises(Exception):
+            StripeService.create_payment_intent(amount=5000)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_records_latency(self):
+        """Test each call's latency is recorded per method."""
+        created = StripeService.create_payment_intent(amount=5000)
+        StripeService.confirm_payment(created['id'])
+
+        stats = call_stats.snapshot()
+        self.assertEqual(stats['create_payment_intent']['count'], 1)
+        self.assertEqual(stats['confirm_payment']['count'], 1)
+        self.assertGreater(stats['create_payment_intent']['total_seconds'], 0)
+
+
+class PaymentIntentReuseTest(TestCase):
+    """Test the payment page reuses one PaymentIntent per appointment."""
+
+    def setUp(self):
+        """Start the fake server and put a pending appointment in the session."""
+        cache.clear()
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=self.server.url,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.appointment = Appointment.objects.create(
+            provider=Provider.objects.create(name="Dr. Smith"),
+            client_email="test@example.com",
+            appointment_time=timezone.now() + timedelta(days=1)
+        )
+        session = self.client.session
+        session['pending_appointment_id'] = self.appointment.id
+        session.save()
+
+    def test_reload_uses_cache(self):
+        """Test reloading the page makes no further Stripe calls."""
+        first = self.client.get('/payments/create/')
+        second = self.client.get('/payments/create/')
+
+        self.assertEqual(second.context['client_secret'], first.context['client_secret'])
+        self.assertEqual(self.server.state.requests, 1)
+        self.assertEqual(len(self.server.state.payment_intents), 1)
+
+    def test_cache_miss_retrieves_stored_intent(self):
+        """Test a cold cache costs one retrieve, not a new intent."""
+        first = self.client.get('/payments/create/')
+        cache.clear()
+
+        second = self.client.get('/payments/create/')
+
+        self.assertEqual(second.context['client_secret'], first.context['client_secret'])
+        self.assertEqual(self.server.state.requests, 2)
+        self.assertEqual(len(self.server.state.payment_intents), 1)
+
+    def test_unusable_intent_replaced(self):
+        """Test an intent that can no longer be paid is replaced."""
+        self.client.get('/payments/create/')
+        self.appointment.refresh_from_db()
+        old_id = self.appointment.payment_intent_id
+        self.server.state.payment_intents[old_id]['status'] = 'canceled'
+        cache.clear()
+
+        self.client.get('/payments/create/')
+
+        self.appointment.refresh_from_db()
+        self.assertNotEqual(self.appointment.payment_intent_id, old_id)
+        self.assertEqual(len(self.server.state.payment_intents), 2)
+
+    def test_paid_appointment_not_charged_again(self):
+        """Test reloading the page after paying starts no payment, cached or not."""
+        self.client.get('/payments/create/')
+        self.appointment.refresh_from_db()
+        intent_id = self.appointment.payment_intent_id
+        Appointment.objects.filter(pk=self.appointment.pk).update(is_paid=True)
+
+        for clear in (False, True):
+            if clear:
+                cache.clear()
+            response = self.client.get('/payments/create/')
+            self.assertRedirects(response, '/appointments/success/', fetch_redirect_response=False)
+
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.payment_intent_id, intent_id)
+        self.assertEqual(len(self.server.state.payment_intents), 1)
+
+    def test_succeeded_intent_marks_paid(self):
+        """Test an intent that succeeded before its webhook arrived is kept and recorded."""
+        self.client.get('/payments/create/')
+        self.appointment.refresh_from_db()
+        intent_id = self.appointment.payment_intent_id
+        self.server.state.payment_intents[intent_id]['status'] = 'succeeded'
+        cache.clear()
+
+        response = self.client.get('/payments/create/')
+
+        self.assertRedirects(response, '/appointments/success/', fetch_redirect_response=False)
+        self.appointment.refresh_from_db()
+        self.assertTrue(self.appointment.is_paid)
+        self.assertEqual(self.appointment.payment_intent_id, intent_id)
+        self.assertEqual(len(self.server.state.payment_intents), 1)
+
+    def test_processing_intent_not_replaced(self):
+        """Test an intent whose payment is under way is neither replaced nor marked paid."""
+        self.client.get('/payments/create/')
+        self.appointment.refresh_from_db()
+        intent_id = self.appointment.payment_intent_id
+        self.server.state.payment_intents[intent_id]['status'] = 'processing'
+        cache.clear()
+
+        response = self.client.get('/payments/create/')
+
+        self.assertRedirects(response, '/appointments/success/', fetch_redirect_response=False)
+        self.appointment.refresh_from_db()
+        self.assertFalse(self.appointment.is_paid)
+        self.assertEqual(self.appointment.payment_intent_id, intent_id)
+        self.assertEqual(len(self.server.state.payment_intents), 1)
+
+    def test_retried_create_is_idempotent(self):
+        """Test a create repeated after losing the response returns the same intent."""
+        self.client.get('/payments/create/')
+        self.appointment.refresh_from_db()
+        created_id = self.appointment.payment_intent_id
+
+        # As if the first response never reached us
+        Appointment.objects.filter(pk=self.appointment.pk).update(payment_intent_id=None)
+        cache.clear()
+        self.client.get('/payments/create/')
+
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.payment_intent_id, created_id)
+        self.assertEqual(self.server.state.idempotent_replays, 1)
+
+
+@override_settings(ROOT_URLCONF='sofia_health.urls_async')
+class AsyncPaymentViewTest(TestCase):
+    """Test cases for the async payment views served under ASGI."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.appointment = Appointment.objects.create(
+            provider=Provider.objects.create(name="Dr. Smith"),
+            client_email="test@example.com",
+            appointment_time=timezone.now() + timedelta(days=1)
+        )
+
+    @patch('payments.views.StripeService.acreate_payment_intent', new_callable=AsyncMock)
+    async def test_create_payment_async(self, mock_create):
+        """Test the async payment page awaits Stripe and stores the intent."""
+        mock_create.return_value = {
+            'id': 'pi_test_123',
+            'client_secret': 'pi_test_123_secret',
+            'amount': 5000,
+            'currency': 'usd',
+            'status': 'requires_payment_method'
+        }
+        session = await self.async_client.asession()
+        await session.aset('pending_appointment_id', self.appointment.id)
+        await session.asave()
+
+        response = await self.async_client.get('/payments/create/')
+
+        self.assertEqual(response.status_code, 200)
+        mock_create.assert_awaited_once()
+        await self.appointment.arefresh_from_db()
+        self.assertEqual(self.appointment.payment_intent_id, 'pi_test_123')
+
+    @patch('payments.views.StripeService.acreate_payment_intent', new_callable=AsyncMock)
+    async def test_create_payment_async_already_paid(self, mock_create):
+        """Test the async payment page sends a paid booking to the success page."""
+        await Appointment.objects.filter(pk=self.appointment.pk).aupdate(is_paid=True)
+        session = await self.async_client.asession()
+        await session.aset('pending_appointment_id', self.appointment.id)
+        await session.asave()
+
+        response = await self.async_client.get('/payments/create/')
+
+        self.assertRedirects(response, '/appointments/success/', fetch_redirect_response=False)
+        mock_create.assert_not_awaited()
+
+    @patch('payments.views.StripeService.acreate_payment_intent', new_callable=AsyncMock)
+    @patch('payments.views.StripeService.aretrieve_payment_intent', new_callable=AsyncMock)
+    async def test_create_payment_async_intent_succeeded(self, mock_retrieve, mock_create):
+        """Test the async payment page records a succeeded intent instead of replacing it."""
+        await cache.aclear()
+        await Appointment.objects.filter(pk=self.appointment.pk).aupdate(payment_intent_id='pi_test_123')
+        mock_retrieve.return_value = {
+            'id': 'pi_test_123',
+            'client_secret': 'pi_test_123_secret',
+            'amount': 5000,
+            'currency': 'usd',
+            'status': 'succeeded'
+        }
+        session = await self.async_client.asession()
+        await session.aset('pending_appointment_id', self.appointment.id)
+        await session.asave()
+
+        response = await self.async_client.get('/payments/create/')
+
+        self.assertRedirects(response, '/appointments/success/', fetch_redirect_response=False)
+        mock_create.assert_not_awaited()
+        await self.appointment.arefresh_from_db()
+        self.assertTrue(self.appointment.is_paid)
+
+    async def test_create_payment_async_no_session(self):
+        """Test the async payment page redirects without a pending booking."""
+        response = await self.async_client.get('/payments/create/')
+        self.assertEqual(response.status_code, 302)
+
+    @patch('payments.views.StripeService.aconfirm_payment', new_callable=AsyncMock)
+    async def test_confirm_payment_async(self, mock_confirm):
+        """Test the async confirm view marks the appointment paid."""
+        mock_confirm.return_value = True
+        self.appointment.payment_intent_id = 'pi_test_123'
+        await self.appointment.asave()
+
+        response = await self.async_client.post(
+            '/payments/confirm/', {'payment_intent_id': 'pi_test_123'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        await self.appointment.arefresh_from_db()
+        self.assertTrue(self.appointment.is_paid)
+
+
+class StripeAsyncClientTest(TestCase):
+    """Test StripeService's async calls against the local fake Stripe API."""
+
+    def setUp(self):
+        """Start the fake server and point the Stripe client at it."""
+        self.server = FakeStripeServer(latency=0.2).start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=self.server.url,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    async def test_concurrent_calls_overlap(self):
+        """Test concurrent async calls wait on Stripe in parallel."""
+        started = time.monotonic()
+        results = await asyncio.gather(*[
+            StripeService.acreate_payment_intent(amount=5000) for _ in range(10)
+        ])
+
+        self.assertEqual(len({result['id'] for result in results}), 10)
+        # Ten sequential calls would take at least 2 seconds
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_loop_clients_closed_with_their_loop(self):
+        """Test each event loop's httpx client is closed when the loop shuts down."""
+        from .services.stripe_service import get_http_client
+
+        client = get_http_client()._async_fallback_client
+        opened = []
+        for _ in range(2):
+            async def call():
+                await StripeService.acreate_payment_intent(amount=5000)
+                opened.append(client._client_async)
+
+            asyncio.run(call())
+
+        self.assertEqual(len(opened), 2)
+        self.assertIsNot(opened[0], opened[1])
+        self.assertTrue(all(httpx_client.is_closed for httpx_client in opened))
+        self.assertEqual(client._clients, {})
+
+
+class BookingFlowLoadTest(QueryBudgetMixin, TestCase):
+    """Test the load-test booking flow end to end against the fake Stripe API."""
+
+    def setUp(self):
+        """Start the fake server and point the Stripe client at it."""
+        cache.clear()
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=self.server.url,
+            STRIPE_WEBHOOK_SECRET='',
+            STRIPE_MAX_NETWORK_RETRIES=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.booking = {
+            'provider': Provider.objects.create(name='Dr. Load').pk,
+            'client_email': 'load@example.com',
+            'appointment_date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+            'appointment_time_slot': '09:00',
+        }
+
+    def test_completes_booking(self):
+        """Test every step succeeds and the appointment ends up paid."""
+        results = run_booking_flow(Client(), self.server.url, self.booking)
+
+        self.assertEqual([name for name, *_rest in results], BOOKING_STEPS)
+        self.assertWithinBudgets(results)
+        # The counter sees the booking's writes
+        queries = {name: queries for name, _seconds, queries, _ok in results}
+        self.assertGreater(queries['create_appointment (POST)'], 0)
+        self.assertTrue(Appointment.objects.get(client_email='load@example.com').is_paid)
+
+    def test_token_mode_skips_session(self):
+        """Test the token flow completes without touching the session table."""
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with override_settings(BOOKING_FLOW_MODE='token'), connection.execute_wrapper(capture):
+            results = run_booking_flow(Client(), self.server.url, self.booking)
+
+        self.assertTrue(all(ok for *_rest, ok in results))
+        self.assertTrue(statements)
+        self.assertFalse([sql for sql in statements if 'django_session' in sql])
+
+    def test_stops_at_failed_step(self):
+        """Test a Stripe failure on the payment page ends the flow there."""
+        self.server.state.error_rate = 1.0
+
+        results = run_booking_flow(Client(), self.server.url, self.booking)
+
+        self.assertEqual(results[-1][0], 'payment_create')
+        self.assertFalse(results[-1][3])
+
+
+class ReconcilePaymentsTest(TestCase):
+    """Test the reconcile_payments command against the fake Stripe API."""
+
+    def setUp(self):
+        """Start the fake server and create appointments with intents."""
+        cache.clear()
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=self.server.url,
+            STRIPE_MAX_NETWORK_RETRIES=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        provider = Provider.objects.create(name="Dr. Smith")
+        self.appointments = []
+        for i in range(5):
+            intent = self.server.state.create_payment_intent({'amount': '5000'})
+            if i != 4:
+                self.server.state.succeed(intent['id'])
+            self.appointments.append(Appointment.objects.create(
+                provider=provider,
+                client_email=f"client{i}@example.com",
+                appointment_time=timezone.now() + timedelta(days=1, hours=i),
+                payment_intent_id=intent['id']
+            ))
+
+    def paid(self):
+        return list(
+            Appointment.objects.order_by('client_email').values_list('is_paid', flat=True)
+        )
+
+    def test_pages_and_updates_in_bulk(self):
+        """Test succeeded intents are found by listing, without per-ID lookups."""
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_payments', '--page-size', '2', stdout=out)
+
+        self.assertEqual(self.paid(), [True, True, True, True, False])
+        self.assertEqual(SlotHold.objects.filter(expires_at__isnull=True).count(), 4)
+        self.assertIn('Listed 5 PaymentIntents in 3 pages', out.getvalue())
+        # Three list requests and nothing else
+        self.assertEqual(self.server.state.requests, 3)
+
+    def test_webhook_paid_not_emailed_again(self):
+        """Test a payment the webhook already recorded queues no second email."""
+        from taskqueue.models import Task
+        from .reconcile import mark_paid_bulk
+        from .webhooks import mark_paid
+
+        mark_paid(self.appointments[0].payment_intent_id)
+        updated = mark_paid_bulk(a.payment_intent_id for a in self.appointments[:4])
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            sorted(task.kwargs['appointment_id'] for task in Task.objects.all()),
+            sorted(a.pk for a in self.appointments[:4]),
+        )
+
+    def test_unlisted_intent_looked_up_by_id(self):
+        """Test an intent created before the window is retrieved on its own."""
+        intent_id = self.appointments[0].payment_intent_id
+        self.server.state.payment_intents[intent_id]['created'] -= 7 * 24 * 3600
+
+        out = StringIO()
+        call_command('reconcile_payments', stdout=out)
+
+        self.assertEqual(self.paid(), [True, True, True, True, False])
+        self.assertIn('Looked up 1 unlisted intents one by one: marked 1 paid', out.getvalue())
+
+    def test_dry_run_writes_nothing(self):
+        """Test --dry-run reports the changes but leaves rows alone."""
+        out = StringIO()
+        call_command('reconcile_payments', '--dry-run', stdout=out)
+
+        self.assertEqual(self.paid(), [False] * 5)
+        self.assertIn('would mark 4 appointments paid', out.getvalue())
+
+    def test_list_failure_reported(self):
+        """Test a failing Stripe listing ends a single run with an error."""
+        from django.core.management.base import CommandError
+
+        self.server.state.fail_next(1)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_payments', stdout=StringIO())
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test every booking view stays within its query budget."""
+
+    def setUp(self):
+        """Start the fake server on a cold cache."""
+        cache.clear()
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=self.server.url,
+            STRIPE_WEBHOOK_SECRET='',
+            STRIPE_MAX_NETWORK_RETRIES=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.provider = Provider.objects.create(name='Dr. Budget')
+
+    def test_booking_views_within_budgets(self):
+        """Test a full booking plus list and availability on a cold cache."""
+        results = run_views(Client(), self.server.url, self.provider.pk)
+
+        self.assertEqual([name for name, *_rest in results], VIEWS)
+        self.assertWithinBudgets(results)
+
+    def test_extra_save_in_create_payment_caught(self):
+        """Test one more query on the payment page fails with the SQL listed."""
+        client = Client()
+        client.post('/appointments/create/', booking_for(self.provider.pk, 0))
+        appointment = Appointment.objects.get()
+
+        with self.assertRaisesMessage(AssertionError, 'payment_create ran 4 queries, over its budget of 3'):
+            with self.assertQueryBudget('payment_create'):
+                client.get('/payments/create/')
+                appointment.save()
+
+    def test_transaction_statements_not_counted(self):
+        """Test BEGIN and savepoints, which depend on the caller's transaction, are not counted."""
+        counter = QueryCounter()
+        for sql in ('BEGIN IMMEDIATE', 'SAVEPOINT "s1"', 'SELECT 1', 'RELEASE SAVEPOINT "s1"'):
+            counter(lambda *args: None, sql, None, False, {})
+
+        self.assertEqual(counter.count, 1)
+
+    def test_regressions_against_baseline(self):
+        """Test slowdowns over the threshold and budget overruns are reported."""
+        baseline = {'views': {'appointment_list': {'median_ms': 10.0}, 'payment_create': {'median_ms': 1.0}}}
+        summary = {
+            'appointment_list': {'median_ms': 14.0, 'max_queries': 2},
+            # 50% slower, but only by half a millisecond
+            'payment_create': {'median_ms': 1.5, 'max_queries': 4},
+            'slot_availability': {'median_ms': 2.0, 'max_queries': 1},
+        }
+
+        problems = find_regressions(summary, baseline, threshold=0.25, min_delta_ms=1.0)
+
+        self.assertEqual(problems, [
+            'appointment_list: median 14.00 ms, baseline 10.00 ms (+40%)',
+            'payment_create: 4 queries, budget 3',
+        ])
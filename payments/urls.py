@@ -4,4 +4,12 @@ from . import views
 urlpatterns = [
     path('create/', views.create_payment, name='payment_create'),
     path('confirm/', views.confirm_payment, name='payment_confirm'),
+    path('webhook/', views.stripe_webhook, name='stripe_webhook'),
+]
+
+# Same routes served by the async views, used by sofia_health.urls_async
+async_urlpatterns = [
+    path('create/', views.create_payment_async, name='payment_create'),
+    path('confirm/', views.confirm_payment_async, name='payment_confirm'),
+    path('webhook/', views.stripe_webhook, name='stripe_webhook'),
 ]
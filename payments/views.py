@@ -1,44 +1,58 @@
+import stripe
 from django.shortcuts import render, redirect
+from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from appointments import flow
 from appointments.models import Appointment
+from .intents import PaymentSettled, aget_or_create_payment_intent, get_or_create_payment_intent
 from .services.stripe_service import StripeService, get_stripe_publishable_key
+from .webhooks import amark_paid, handle_event, mark_paid
+
+
+def _slot_lost(appointment) -> bool:
+    """
+    Whether an unpaid appointment's hold expired and another booking took
+    the slot (see ``appointments.holds``).
+    """
+    return not appointment.is_paid and not hasattr(appointment, 'slot_hold')
 
 
 def create_payment(request):
     """
     View for creating a Stripe payment for an appointment.
     """
-    # Get pending appointment from session
-    appointment_id = request.session.get('pending_appointment_id')
+    # Appointment booked on the previous step
+    appointment_id = flow.recall(request, flow.PENDING)
 
     if not appointment_id:
         messages.error(request, 'No appointment found. Please create an appointment first.')
         return redirect('create_appointment')
 
     try:
-        appointment = Appointment.objects.get(id=appointment_id)
+        appointment = Appointment.objects.select_related('provider', 'slot_hold').get(id=appointment_id)
     except Appointment.DoesNotExist:
         messages.error(request, 'Appointment not found.')
         return redirect('create_appointment')
 
+    if _slot_lost(appointment):
+        messages.error(request, 'Your hold on this time slot expired and it has been booked. Please choose another.')
+        return redirect('create_appointment')
+
+    if appointment.is_paid:
+        # Already paid (e.g. the page was reloaded): never start another payment
+        response = redirect('appointment_success')
+        flow.remember(request, response, flow.COMPLETED, appointment.id)
+        return response
+
     # Create PaymentIntent (amount in cents, e.g., $50.00 = 5000 cents)
     amount = 5000  # $50.00 appointment fee
 
     try:
-        payment_data = StripeService.create_payment_intent(
-            amount=amount,
-            metadata={
-                'appointment_id': appointment.id,
-                'provider_name': appointment.provider_name,
-                'client_email': appointment.client_email,
-            }
-        )
-
-        # Update appointment with payment intent ID
-        appointment.payment_intent_id = payment_data['id']
-        appointment.save()
+        # Reuses the appointment's PaymentIntent across page loads
+        payment_data = get_or_create_payment_intent(appointment, amount)
 
         context = {
             'client_secret': payment_data['client_secret'],
@@ -50,15 +64,42 @@ def create_payment(request):
 
         return render(request, 'payments/create.html', context)
 
+    except PaymentSettled as e:
+        return _settled(request, appointment, e)
     except Exception as e:
         messages.error(request, f'Payment error: {str(e)}')
         return redirect('create_appointment')
 
 
+def _settled(request, appointment, settled):
+    """
+    Send the client whose payment went through (or is under way) to the
+    success page instead of starting another payment.
+    """
+    if not settled.paid:
+        messages.info(request, 'Your payment is being processed. We will email you once it completes.')
+    response = redirect('appointment_success')
+    flow.remember(request, response, flow.COMPLETED, appointment.id)
+    return response
+
+
+async def _asettled(request, appointment, settled):
+    """Async version of ``_settled``."""
+    if not settled.paid:
+        messages.info(request, 'Your payment is being processed. We will email you once it completes.')
+    response = redirect('appointment_success')
+    await flow.aremember(request, response, flow.COMPLETED, appointment.id)
+    return response
+
+
 @require_http_methods(["POST"])
 def confirm_payment(request):
     """
     API endpoint to confirm payment and complete appointment booking.
+
+    Payment status is read from the database, where the Stripe webhook
+    records it. Stripe is only queried directly when no webhook secret is
+    configured (e.g. local development without the Stripe CLI).
     """
     payment_intent_id = request.POST.get('payment_intent_id')
 
@@ -66,20 +107,126 @@ def confirm_payment(request):
         return JsonResponse({'error': 'No payment intent ID provided'}, status=400)
 
     try:
-        # Verify payment succeeded
-        if StripeService.confirm_payment(payment_intent_id):
-            # Find and update appointment
-            appointment = Appointment.objects.get(payment_intent_id=payment_intent_id)
-            appointment.is_paid = True
-            appointment.save()
+        appointment = Appointment.objects.only('id', 'is_paid').get(
+            payment_intent_id=payment_intent_id
+        )
 
-            # Store in session for success page
-            request.session['completed_appointment_id'] = appointment.id
+        is_paid = appointment.is_paid
+        if not is_paid and not settings.STRIPE_WEBHOOK_SECRET:
+            # No webhook delivery to wait for, so ask Stripe
+            if StripeService.confirm_payment(payment_intent_id):
+                mark_paid(payment_intent_id)
+                is_paid = True
 
+        if is_paid:
+            response = JsonResponse({
+                'success': True,
+                'redirect_url': '/appointments/success/'
+            })
+            # Remember the appointment for the success page
+            flow.remember(request, response, flow.COMPLETED, appointment.id)
+            return response
+        elif settings.STRIPE_WEBHOOK_SECRET:
+            # Webhook not received yet; the client polls again
+            return JsonResponse({
+                'success': False,
+                'pending': True
+            }, status=202)
+        else:
             return JsonResponse({
+                'success': False,
+                'error': 'Payment not confirmed'
+            }, status=400)
+
+    except Appointment.DoesNotExist:
+        return JsonResponse({'error': 'Appointment not found'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def create_payment_async(request):
+    """
+    Async version of ``create_payment`` for ASGI deployments.
+
+    The Stripe call is awaited, so the worker can serve other requests
+    while it waits on the network.
+    """
+    appointment_id = await flow.arecall(request, flow.PENDING)
+
+    if not appointment_id:
+        messages.error(request, 'No appointment found. Please create an appointment first.')
+        return redirect('create_appointment')
+
+    try:
+        appointment = await Appointment.objects.select_related('provider', 'slot_hold').aget(id=appointment_id)
+    except Appointment.DoesNotExist:
+        messages.error(request, 'Appointment not found.')
+        return redirect('create_appointment')
+
+    if _slot_lost(appointment):
+        messages.error(request, 'Your hold on this time slot expired and it has been booked. Please choose another.')
+        return redirect('create_appointment')
+
+    if appointment.is_paid:
+        response = redirect('appointment_success')
+        await flow.aremember(request, response, flow.COMPLETED, appointment.id)
+        return response
+
+    amount = 5000  # $50.00 appointment fee
+
+    try:
+        payment_data = await aget_or_create_payment_intent(appointment, amount)
+
+        context = {
+            'client_secret': payment_data['client_secret'],
+            'stripe_public_key': get_stripe_publishable_key(),
+            'amount': amount / 100,
+            'appointment': appointment,
+            'title': 'Payment'
+        }
+
+        return render(request, 'payments/create.html', context)
+
+    except PaymentSettled as e:
+        return await _asettled(request, appointment, e)
+    except Exception as e:
+        messages.error(request, f'Payment error: {str(e)}')
+        return redirect('create_appointment')
+
+
+@require_http_methods(["POST"])
+async def confirm_payment_async(request):
+    """
+    Async version of ``confirm_payment`` for ASGI deployments.
+    """
+    payment_intent_id = request.POST.get('payment_intent_id')
+
+    if not payment_intent_id:
+        return JsonResponse({'error': 'No payment intent ID provided'}, status=400)
+
+    try:
+        appointment = await Appointment.objects.only('id', 'is_paid').aget(
+            payment_intent_id=payment_intent_id
+        )
+
+        is_paid = appointment.is_paid
+        if not is_paid and not settings.STRIPE_WEBHOOK_SECRET:
+            if await StripeService.aconfirm_payment(payment_intent_id):
+                await amark_paid(payment_intent_id)
+                is_paid = True
+
+        if is_paid:
+            response = JsonResponse({
                 'success': True,
                 'redirect_url': '/appointments/success/'
             })
+            await flow.aremember(request, response, flow.COMPLETED, appointment.id)
+            return response
+        elif settings.STRIPE_WEBHOOK_SECRET:
+            return JsonResponse({
+                'success': False,
+                'pending': True
+            }, status=202)
         else:
             return JsonResponse({
                 'success': False,
@@ -90,3 +237,28 @@ def confirm_payment(request):
         return JsonResponse({'error': 'Appointment not found'}, status=404)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def stripe_webhook(request):
+    """
+    Stripe webhook endpoint for PaymentIntent events.
+
+    Verifies the Stripe-Signature header, then records and applies the
+    event. Duplicate deliveries are acknowledged without side effects.
+    """
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        return HttpResponse(status=404)
+
+    try:
+        event = StripeService.construct_webhook_event(
+            request.body,
+            request.META.get('HTTP_STRIPE_SIGNATURE', '')
+        )
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponse(status=400)
+
+    handle_event(event)
+
+    return HttpResponse(status=200)
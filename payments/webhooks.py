@@ -0,0 +1,106 @@
+"""
+Stripe webhook event processing.
+
+Events are recorded in ``StripeEvent`` before they are applied, inside the
+same transaction, so a redelivered event is a no-op.
+"""
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from appointments import caching, holds
+from appointments.models import Appointment
+from taskqueue.queue import enqueue
+from .models import StripeEvent
+from .tasks import send_payment_confirmation
+
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_SUCCEEDED = 'payment_intent.succeeded'
+PAYMENT_FAILED = 'payment_intent.payment_failed'
+
+HANDLED_EVENTS = {PAYMENT_SUCCEEDED, PAYMENT_FAILED}
+
+
+def mark_paid(payment_intent_id: str) -> int:
+    """
+    Flip ``is_paid`` for the appointment owning a PaymentIntent.
+
+    Uses a single conditional UPDATE so concurrent callers cannot
+    double-apply it. The caller that flips it queues the confirmation
+    email, so the email is sent once. The flip, the slot hold and the
+    queued email commit together: if any of them fails, the appointment
+    stays unpaid and a retry applies all three.
+
+    Returns:
+        Number of appointments updated (0 if already paid or unknown)
+    """
+    with transaction.atomic():
+        updated = Appointment.objects.filter(
+            payment_intent_id=payment_intent_id,
+            is_paid=False,
+        ).update(is_paid=True, updated_at=timezone.now())
+
+        if updated:
+            # update() sends no post_save, so retire the cached list entries here,
+            # once the new status is visible to readers
+            appointment_id, provider_id = Appointment.objects.filter(
+                payment_intent_id=payment_intent_id,
+            ).values_list('id', 'provider_id').first()
+            # Paid appointments hold their slot for good
+            holds.keep_slots([appointment_id])
+            transaction.on_commit(lambda: caching.invalidate(provider_id))
+            enqueue(send_payment_confirmation, appointment_id=appointment_id)
+    return updated
+
+
+async def amark_paid(payment_intent_id: str) -> int:
+    """Async version of ``mark_paid``."""
+    # Async queries cannot share a transaction, so run the sync version
+    return await sync_to_async(mark_paid)(payment_intent_id)
+
+
+def handle_event(event) -> bool:
+    """
+    Apply a verified Stripe event.
+
+    Args:
+        event: Verified stripe.Event (or dict with the same shape)
+
+    Returns:
+        True if the event was processed, False if it was a duplicate or
+        an event type we do not handle
+
+    Raises:
+        Exception: If applying the event fails; nothing is recorded, so
+            Stripe's redelivery applies it again
+    """
+    if event['type'] not in HANDLED_EVENTS:
+        return False
+
+    payment_intent_id = event['data']['object']['id']
+
+    with transaction.atomic():
+        try:
+            # Savepoint around the insert alone: an integrity error while
+            # applying the event must fail the request so Stripe retries it
+            with transaction.atomic():
+                StripeEvent.objects.create(
+                    event_id=event['id'],
+                    event_type=event['type'],
+                    payment_intent_id=payment_intent_id,
+                )
+        except IntegrityError:
+            # Already processed this event ID
+            return False
+
+        if event['type'] == PAYMENT_SUCCEEDED:
+            mark_paid(payment_intent_id)
+        else:
+            logger.info("Payment failed for PaymentIntent %s", payment_intent_id)
+
+    return True
@@ -0,0 +1,125 @@
+"""
+Read-replica routing.
+
+Reads go to a replica (one of ``DATABASE_REPLICAS``) only during GET and
+HEAD requests to views marked with ``@replica_reads`` and to the admin.
+Everything else, including every write, ``confirm_payment``, the webhook,
+management commands and task workers, uses the primary.
+
+A replica can lag behind the primary, so once a request writes, the
+visitor is pinned to the primary for ``DB_REPLICA_PIN_SECONDS`` with a
+cookie: the pages they see next (the list after booking, the success page
+after paying) read their own writes. Values stored in a cache that pinned
+visitors read too are computed inside ``primary_reads()`` while a replica
+may still lag behind the last write, so an unpinned request cannot store
+rows the replica has not caught up on.
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+PIN_COOKIE = 'db_primary_pin'
+
+# Routing state of the request being served: whether its reads may use a
+# replica, and whether it has written. A dict, so changes made in
+# process_view (which may run in another thread) are seen by the request
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+def replica_reads(view_func):
+    """Mark a read-only view: its GET and HEAD requests may read from a replica."""
+    view_func.replica_reads = True
+    return view_func
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even in a ``@replica_reads`` view."""
+    state = _request_state.get()
+    if state is None or not state['replica']:
+        yield
+        return
+    state['replica'] = False
+    try:
+        yield
+    finally:
+        state['replica'] = True
+
+
+def choose_replica() -> str:
+    """Return the alias of the replica to read from."""
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """Send reads of marked views to a replica and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state['replica'] or state['wrote'] or not settings.DATABASE_REPLICAS:
+            return 'default'
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may use a replica; pin visitors after writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _request_state.get()
+        if state is None or PIN_COOKIE in request.COOKIES or request.method not in ('GET', 'HEAD'):
+            return
+        match = request.resolver_match
+        state['replica'] = getattr(view_func, 'replica_reads', False) or match.namespace == 'admin'
+
+    def _finish(self, response, state):
+        if state['wrote'] and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DB_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = {'replica': False, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            return self._finish(self.get_response(request), state)
+        finally:
+            _request_state.reset(token)
+
+    async def __acall__(self, request):
+        state = {'replica': False, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            return self._finish(await self.get_response(request), state)
+        finally:
+            _request_state.reset(token)
+
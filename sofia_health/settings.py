@@ -41,10 +41,19 @@ INSTALLED_APPS = [
     # Local apps
     "appointments",
     "payments",
+    "taskqueue",
+    "metrics",
+    "assets",
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include all other middleware
+    "metrics.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Static files when SERVE_STATIC is on; answers before sessions or the database
+    "assets.middleware.StaticFilesMiddleware",
+    # Before the session middleware, so session reads and writes are routed too
+    "sofia_health.routers.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -53,11 +62,15 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "sofia_health.urls"
+# Async booking/payment views for ASGI servers (uvicorn, daphne); sync views otherwise
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+ROOT_URLCONF = "sofia_health.urls_async" if ASYNC_VIEWS else "sofia_health.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django's engine, timing each render for /metrics
+        "BACKEND": "metrics.templates.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -76,16 +89,17 @@ WSGI_APPLICATION = "sofia_health.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-# Use MySQL if DB_ENGINE is configured, otherwise fall back to SQLite
-if config('DB_ENGINE', default='') == 'django.db.backends.mysql':
+# Use MySQL or PostgreSQL if DB_ENGINE is configured, otherwise fall back to SQLite
+DB_ENGINE = config('DB_ENGINE', default='')
+if DB_ENGINE in ('django.db.backends.mysql', 'django.db.backends.postgresql'):
     DATABASES = {
         "default": {
-            "ENGINE": config('DB_ENGINE'),
+            "ENGINE": DB_ENGINE,
             "NAME": config('DB_NAME'),
             "USER": config('DB_USER'),
             "PASSWORD": config('DB_PASSWORD'),
             "HOST": config('DB_HOST', default='localhost'),
-            "PORT": config('DB_PORT', default='3306'),
+            "PORT": config('DB_PORT', default='3306' if DB_ENGINE.endswith('mysql') else '5432'),
         }
     }
 else:
@@ -93,9 +107,79 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Writers queue for the database lock instead of failing at once:
+            # transactions take it up front, and wait up to `timeout` seconds
+            "OPTIONS": {
+                "transaction_mode": "IMMEDIATE",
+                "timeout": config('DB_SQLITE_TIMEOUT', default=20, cast=int),
+            },
+            # On disk rather than in memory, so the concurrency tests' threads
+            # each get a connection of their own to the same database
+            "TEST": {
+                "NAME": BASE_DIR / "test_db.sqlite3",
+            },
         }
     }
 
+# Connection lifetime. Seconds a connection is reused across requests (0 opens
+# one per request). Async views run each request's queries on a different
+# thread, where persistent connections pile up, so they default to 0 there
+DATABASES['default']['CONN_MAX_AGE'] = config(
+    'DB_CONN_MAX_AGE', default=0 if ASYNC_VIEWS else 60, cast=int
+)
+# Check a reused connection still works before the request's first query
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# PostgreSQL connection pool (psycopg[pool]), shared by the threads of a
+# worker process. Use it instead of persistent connections, e.g. under ASGI
+if DB_ENGINE == 'django.db.backends.postgresql' and config('DB_POOL', default=False, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            # Seconds a request waits for a free connection
+            'timeout': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+        },
+    }
+
+# Read replicas (MySQL or PostgreSQL): comma-separated hosts, each given a replica_<n> alias
+# with the primary's credentials unless DB_REPLICA_USER/PASSWORD/PORT are set.
+# GET requests to read-only views and the admin read from them; see
+# sofia_health/routers.py
+DATABASE_REPLICAS = []
+for number, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', '')),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default'].get('USER', '')),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default'].get('PASSWORD', '')),
+        # Tests read the test primary instead of a separate test replica
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['sofia_health.routers.ReplicaRouter']
+
+# Seconds a visitor reads from the primary after a write; cover the replication lag
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=10, cast=int)
+
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache and
+# redis://127.0.0.1:6379/1) so all workers see the same entries and versions
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='sofia-health'),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='sofia'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,6 +217,33 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+# Where collectstatic writes hashed and precompressed files for production
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / "staticfiles"))
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    # Content-hashed names (cacheable forever) plus .gz/.br copies outside DEBUG;
+    # plain names in development, where files are served unprocessed
+    "staticfiles": {
+        "BACKEND": config(
+            'STATICFILES_STORAGE',
+            default="django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "assets.storage.CompressedManifestStaticFilesStorage",
+        ),
+    },
+}
+
+# Serve STATIC_ROOT from Django (assets.middleware.StaticFilesMiddleware); turn
+# off when nginx or a CDN serves /static/
+SERVE_STATIC = config('SERVE_STATIC', default=not DEBUG, cast=bool)
+# Cache lifetime of static files without a content hash in their name
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=3600, cast=int)
+
+# Tailwind build (python manage.py build_css): files scanned for classes, output
+TAILWIND_CONTENT = [str(BASE_DIR / "templates" / "**" / "*.html")]
+TAILWIND_OUTPUT = BASE_DIR / "static" / "css" / "app.css"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -142,3 +253,57 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Stripe Configuration
 STRIPE_PUBLIC_KEY = config('STRIPE_PUBLIC_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
+# Signing secret of the webhook endpoint (whsec_...); enables /payments/webhook/
+STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+
+# Stripe HTTP client: API host, timeouts (seconds) and retry policy
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3.0, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10.0, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
+STRIPE_RETRY_BASE_DELAY = config('STRIPE_RETRY_BASE_DELAY', default=0.5, cast=float)
+STRIPE_RETRY_MAX_DELAY = config('STRIPE_RETRY_MAX_DELAY', default=2.0, cast=float)
+# Upper bound on one Stripe call including all retries
+STRIPE_TIME_BUDGET = config('STRIPE_TIME_BUDGET', default=20.0, cast=float)
+
+# Where the booking flow keeps the appointment between pages: 'session', or
+# 'token' for a signed cookie that avoids session-table reads and writes
+BOOKING_FLOW_MODE = config('BOOKING_FLOW_MODE', default='session')
+# Lifetime of a booking flow token in seconds
+BOOKING_FLOW_TOKEN_MAX_AGE = config('BOOKING_FLOW_TOKEN_MAX_AGE', default=3600, cast=int)
+
+# Appointment list pagination
+APPOINTMENTS_PAGE_SIZE = config('APPOINTMENTS_PAGE_SIZE', default=25, cast=int)
+APPOINTMENTS_MAX_PAGE_SIZE = config('APPOINTMENTS_MAX_PAGE_SIZE', default=100, cast=int)
+
+# Slot availability cache lifetime in seconds (entries are also dropped on every appointment write)
+AVAILABILITY_CACHE_TIMEOUT = config('AVAILABILITY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds an unpaid booking holds its slot; afterwards the slot can be booked again
+SLOT_HOLD_SECONDS = config('SLOT_HOLD_SECONDS', default=900, cast=int)
+
+# Appointment list page/counter cache lifetime in seconds (entries are also retired on every appointment write)
+APPOINTMENT_LIST_CACHE_TIMEOUT = config('APPOINTMENT_LIST_CACHE_TIMEOUT', default=300, cast=int)
+
+# How long the payment page reuses a cached PaymentIntent without asking Stripe
+PAYMENT_INTENT_CACHE_TIMEOUT = config('PAYMENT_INTENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Background task queue (python manage.py run_worker)
+TASK_MAX_ATTEMPTS = config('TASK_MAX_ATTEMPTS', default=5, cast=int)
+# Retry backoff in seconds: base * 2^(attempt - 1), capped, with jitter
+TASK_RETRY_BASE_DELAY = config('TASK_RETRY_BASE_DELAY', default=10.0, cast=float)
+TASK_RETRY_MAX_DELAY = config('TASK_RETRY_MAX_DELAY', default=3600.0, cast=float)
+# A running task not finished within this many seconds is handed to another worker
+TASK_LEASE_TIMEOUT = config('TASK_LEASE_TIMEOUT', default=300, cast=int)
+
+# Outgoing email (payment confirmations); printed to the console unless configured
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='appointments@sofiahealth.local')
+
+# Metrics (/metrics). With several worker processes, point METRICS_DIR at a
+# directory they share so any worker reports the totals of all of them
+METRICS_DIR = config('METRICS_DIR', default='')
+# Seconds between a worker's writes to METRICS_DIR
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+# When set, scrapes must send "Authorization: Bearer <token>"
+METRICS_BEARER_TOKEN = config('METRICS_BEARER_TOKEN', default='')
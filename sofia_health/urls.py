@@ -20,13 +20,35 @@ from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
 
-urlpatterns = [
-    path("", TemplateView.as_view(template_name="home.html"), name="home"),
-    path("admin/", admin.site.urls),
-    path("appointments/", include('appointments.urls')),
-    path("payments/", include('payments.urls')),
-]
-
-# Serve static files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
+import appointments.urls
+import payments.urls
+from metrics.views import metrics_view
+
+
+def build_urlpatterns(async_views=False):
+    """
+    Build the project URL patterns.
+
+    Args:
+        async_views: Route booking and payment pages to their async views
+    """
+    patterns = [
+        path("", TemplateView.as_view(template_name="home.html"), name="home"),
+        path("admin/", admin.site.urls),
+        path("metrics", metrics_view, name="metrics"),
+        path("appointments/", include(
+            appointments.urls.async_urlpatterns if async_views else appointments.urls.urlpatterns
+        )),
+        path("payments/", include(
+            payments.urls.async_urlpatterns if async_views else payments.urls.urlpatterns
+        )),
+    ]
+
+    # Serve static files during development
+    if settings.DEBUG:
+        patterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
+
+    return patterns
+
+
+urlpatterns = build_urlpatterns()
@@ -0,0 +1,8 @@
+"""
+URL configuration serving the async booking and payment views.
+
+Selected by ``ASYNC_VIEWS=True`` for ASGI deployments.
+"""
+from sofia_health.urls import build_urlpatterns
+
+urlpatterns = build_urlpatterns(async_views=True)
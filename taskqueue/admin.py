@@ -0,0 +1,31 @@
+from django.contrib import admin
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Admin configuration for background tasks."""
+
+    list_display = [
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'duration_ms',
+        'created_at'
+    ]
+
+    list_filter = [
+        'status',
+        'name'
+    ]
+
+    readonly_fields = [
+        'locked_by',
+        'locked_at',
+        'last_error',
+        'duration_ms',
+        'created_at',
+        'started_at',
+        'finished_at'
+    ]
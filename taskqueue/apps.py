@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TaskqueueConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "taskqueue"
+
+    def ready(self):
+        # Register the task functions defined in each app's tasks.py
+        from django.utils.module_loading import autodiscover_modules
+
+        autodiscover_modules('tasks')
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from taskqueue.queue import claim, run_task
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks. Start as many workers as needed; they never share a task.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help='Tasks claimed per round trip (default: 10)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty (default: 1)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no task is due instead of polling')
+
+    def handle(self, *args, **options):
+        succeeded = failed = 0
+        try:
+            while True:
+                # Long-running process: drop connections the server closed
+                close_old_connections()
+                claimed = claim(options['batch_size'])
+                for claimed_task in claimed:
+                    if run_task(claimed_task):
+                        succeeded += 1
+                    else:
+                        failed += 1
+
+                if not claimed:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {succeeded + failed} tasks: {succeeded} succeeded, {failed} failed'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from taskqueue.queue import get_stats
+
+
+class Command(BaseCommand):
+    help = 'Print queue depth and run times for each background task.'
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        if not stats:
+            self.stdout.write('No tasks queued yet.')
+            return
+
+        for name, row in stats.items():
+            timing = (
+                f"avg {row['avg_ms']:.1f} ms, max {row['max_ms']:.1f} ms"
+                if row['avg_ms'] is not None else 'no finished runs'
+            )
+            self.stdout.write(
+                f"{name}: {row['pending']} pending, {row['running']} running, "
+                f"{row['done']} done, {row['failed']} failed | {timing}"
+            )
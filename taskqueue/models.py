@@ -0,0 +1,122 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Background task waiting to run, running, or finished.
+
+    Fields:
+        name: Registered name of the task function
+        kwargs: Keyword arguments for the task function (JSON)
+        status: pending, running, done or failed
+        attempts: Number of times the task has been started
+        max_attempts: Attempts allowed before the task is marked failed
+        run_at: Earliest time the task may (next) run
+        locked_by: Claim token of the worker running the task
+        locked_at: Timestamp when the task was last claimed
+        last_error: Error raised by the last failed attempt
+        duration_ms: Run time of the last attempt in milliseconds
+        created_at: Timestamp when the task was enqueued
+        started_at: Timestamp when the last attempt started
+        finished_at: Timestamp when the task succeeded or gave up
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(
+        max_length=255,
+        help_text="Registered name of the task function"
+    )
+
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Keyword arguments for the task function"
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        help_text="Task status"
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times the task has been started"
+    )
+
+    max_attempts = models.PositiveIntegerField(
+        default=5,
+        help_text="Attempts allowed before the task is marked failed"
+    )
+
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time the task may run"
+    )
+
+    locked_by = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="Claim token of the worker running the task"
+    )
+
+    locked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Timestamp when the task was last claimed"
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        help_text="Error raised by the last failed attempt"
+    )
+
+    duration_ms = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="Run time of the last attempt in milliseconds"
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when the task was enqueued"
+    )
+
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Timestamp when the last attempt started"
+    )
+
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Timestamp when the task succeeded or gave up"
+    )
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Task"
+        verbose_name_plural = "Tasks"
+        indexes = [
+            # Workers claim the oldest due tasks of a status
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
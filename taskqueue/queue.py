@@ -0,0 +1,206 @@
+"""
+Database-backed background task queue.
+
+Functions decorated with ``@task`` (in an app's ``tasks.py``) are queued
+with ``enqueue`` and run by ``python manage.py run_worker``. No broker is
+needed: a queued task is a ``Task`` row.
+
+The row is written in the caller's transaction, so a task enqueued inside
+``transaction.atomic()`` becomes visible to workers when that transaction
+commits and disappears with it on rollback. Workers claim batches of due
+tasks with ``select_for_update(skip_locked=True)``, so concurrent workers
+never block on or run the same task. A failed task is retried with jittered
+exponential backoff until it runs out of attempts. A task whose worker died
+is claimed again once its lease has expired.
+"""
+
+import logging
+import random
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name: str = None, max_attempts: int = None):
+    """
+    Register a function as a background task.
+
+    Args:
+        name: Name the task is stored under (default: module.function)
+        max_attempts: Attempts before giving up (default: TASK_MAX_ATTEMPTS)
+    """
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def _new_task(func: Union[Callable, str], kwargs: Dict, delay: float = 0) -> Task:
+    name = getattr(func, 'task_name', func)
+    if name not in _registry:
+        raise LookupError(f'Unknown task {name!r}')
+    return Task(
+        name=name,
+        kwargs=kwargs,
+        max_attempts=_registry[name].max_attempts or settings.TASK_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(func: Union[Callable, str], delay: float = 0, **kwargs) -> Task:
+    """
+    Queue a call to a registered task.
+
+    Args:
+        func: Function decorated with ``@task``, or its registered name
+        delay: Seconds to wait before the task may run
+        **kwargs: JSON-serializable keyword arguments for the function
+
+    Returns:
+        The saved Task
+
+    Raises:
+        LookupError: If the task is not registered
+    """
+    new_task = _new_task(func, kwargs, delay)
+    new_task.save()
+    return new_task
+
+
+async def aenqueue(func: Union[Callable, str], delay: float = 0, **kwargs) -> Task:
+    """Async version of ``enqueue``."""
+    new_task = _new_task(func, kwargs, delay)
+    await new_task.asave()
+    return new_task
+
+
+def enqueue_many(func: Union[Callable, str], kwargs_list: Iterable[Dict]) -> List[Task]:
+    """Queue one call per kwargs dict with a single INSERT."""
+    return Task.objects.bulk_create([_new_task(func, kwargs) for kwargs in kwargs_list])
+
+
+def claim(batch_size: int) -> List[Task]:
+    """
+    Claim up to ``batch_size`` due tasks for this worker.
+
+    Tasks another worker has locked are skipped rather than waited on. The
+    claim UPDATE repeats the due condition and stamps a fresh token, so on
+    backends without row locks (SQLite) a task still goes to one worker.
+
+    Returns:
+        The claimed tasks, oldest first, with ``attempts`` already counted
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    lease_expired = now - timedelta(seconds=settings.TASK_LEASE_TIMEOUT)
+    due = (
+        Q(status=Task.PENDING, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_at__lt=lease_expired)
+    )
+
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Task.objects.filter(due, pk__in=ids).update(
+            status=Task.RUNNING,
+            locked_by=token,
+            locked_at=now,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(Task.objects.filter(locked_by=token, status=Task.RUNNING).order_by('run_at', 'id'))
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the next attempt, after ``attempts`` failures."""
+    delay = min(
+        settings.TASK_RETRY_BASE_DELAY * (2 ** (attempts - 1)),
+        settings.TASK_RETRY_MAX_DELAY,
+    )
+    # Jitter in [delay / 2, delay] keeps retried tasks from bunching up
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_task(claimed: Task) -> bool:
+    """
+    Run one claimed task and record its outcome and timing.
+
+    Returns:
+        True if the task succeeded
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        func = _registry.get(claimed.name)
+        if func is None:
+            raise LookupError(f'Unknown task {claimed.name!r}')
+        func(**claimed.kwargs)
+    except Exception as e:
+        error = e
+        logger.exception("Task %s #%s failed (attempt %s)", claimed.name, claimed.pk, claimed.attempts)
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    now = timezone.now()
+    # Only the worker holding the claim may record the outcome
+    mine = Task.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by)
+
+    if error is None:
+        mine.update(status=Task.DONE, finished_at=now, duration_ms=duration_ms, last_error='')
+        logger.info("Task %s #%s done in %.1f ms", claimed.name, claimed.pk, duration_ms)
+        return True
+
+    if claimed.attempts >= claimed.max_attempts:
+        mine.update(
+            status=Task.FAILED, finished_at=now, duration_ms=duration_ms, last_error=repr(error),
+        )
+    else:
+        mine.update(
+            status=Task.PENDING,
+            run_at=now + timedelta(seconds=retry_delay(claimed.attempts)),
+            duration_ms=duration_ms,
+            last_error=repr(error),
+        )
+    return False
+
+
+def get_stats() -> Dict:
+    """
+    Return per-task counters and timings.
+
+    Returns:
+        Dict mapping each task name to its pending, running, done and
+        failed counts and the average and maximum run time (ms) of
+        finished tasks
+    """
+    rows = Task.objects.values('name').annotate(
+        pending=Count('id', filter=Q(status=Task.PENDING)),
+        running=Count('id', filter=Q(status=Task.RUNNING)),
+        done=Count('id', filter=Q(status=Task.DONE)),
+        failed=Count('id', filter=Q(status=Task.FAILED)),
+        avg_ms=Avg('duration_ms', filter=Q(status=Task.DONE)),
+        max_ms=Max('duration_ms', filter=Q(status=Task.DONE)),
+    ).order_by('name')
+
+    return {row.pop('name'): row for row in rows}
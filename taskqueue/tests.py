@@ -0,0 +1,162 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from appointments.models import Appointment, Provider
+from .models import Task
+from .queue import claim, enqueue, get_stats, run_task, task
+
+
+calls = []
+
+
+def run_worker_burst(stdout):
+    """Run one worker burst inside the test's transaction."""
+    # Outside autocommit close_old_connections() closes the connection,
+    # and with it the test case's transaction
+    with patch('taskqueue.management.commands.run_worker.close_old_connections'):
+        call_command('run_worker', '--burst', stdout=stdout)
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTest(TestCase):
+    """Test cases for enqueueing, claiming and running tasks."""
+
+    def setUp(self):
+        """Forget calls made by other tests."""
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Test a queued task is claimed once, run and timed."""
+        enqueue(record, value=1)
+
+        claimed = claim(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claim(10), [])
+
+        self.assertTrue(run_task(claimed[0]))
+        finished = Task.objects.get()
+        self.assertEqual(calls, [1])
+        self.assertEqual(finished.status, Task.DONE)
+        self.assertEqual(finished.attempts, 1)
+        self.assertIsNotNone(finished.duration_ms)
+
+    def test_delayed_task_not_due(self):
+        """Test a task with a delay is not claimed early."""
+        enqueue(record, delay=60, value=1)
+        self.assertEqual(claim(10), [])
+
+    def test_failure_retried_with_backoff_then_failed(self):
+        """Test a failing task is rescheduled and gives up after max_attempts."""
+        enqueue(fail)
+
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            self.assertFalse(run_task(claim(10)[0]))
+        retried = Task.objects.get()
+        self.assertEqual(retried.status, Task.PENDING)
+        self.assertGreater(retried.run_at, timezone.now())
+        self.assertIn('boom', retried.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            self.assertFalse(run_task(claim(10)[0]))
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    @override_settings(TASK_LEASE_TIMEOUT=60)
+    def test_expired_lease_reclaimed(self):
+        """Test a task left running by a dead worker is claimed again."""
+        enqueue(record, value=1)
+        stale = claim(10)[0]
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        reclaimed = claim(10)
+        self.assertEqual([t.pk for t in reclaimed], [stale.pk])
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+        # The first worker's late result is ignored
+        run_task(stale)
+        self.assertEqual(Task.objects.get().status, Task.RUNNING)
+
+    def test_unknown_task_rejected(self):
+        """Test enqueueing an unregistered name fails fast."""
+        with self.assertRaises(LookupError):
+            enqueue('tests.missing')
+
+    def test_run_worker_and_stats(self):
+        """Test the worker drains the queue and the stats report timings."""
+        enqueue(record, value=1)
+        enqueue(record, value=2)
+        out = StringIO()
+
+        run_worker_burst(out)
+
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertIn('Ran 2 tasks: 2 succeeded, 0 failed', out.getvalue())
+        self.assertEqual(get_stats()['tests.record']['done'], 2)
+
+        out = StringIO()
+        call_command('task_stats', stdout=out)
+        self.assertIn('tests.record: 0 pending, 0 running, 2 done, 0 failed | avg', out.getvalue())
+
+
+class EnqueueOnCommitTest(TransactionTestCase):
+    """Test tasks follow the transaction they were enqueued in."""
+
+    def test_rolled_back_enqueue_discarded(self):
+        """Test a task enqueued in a rolled-back transaction never exists."""
+        try:
+            with transaction.atomic():
+                enqueue(record, value=1)
+                raise RuntimeError('rollback')
+        except RuntimeError:
+            pass
+        self.assertFalse(Task.objects.exists())
+
+        with transaction.atomic():
+            enqueue(record, value=2)
+        self.assertEqual(Task.objects.get().kwargs, {'value': 2})
+
+
+class PaymentConfirmationTaskTest(TestCase):
+    """Test confirm_payment queues the confirmation email instead of sending it."""
+
+    def test_confirm_payment_enqueues_email(self):
+        """Test the email is sent by the worker, once."""
+        from unittest.mock import patch
+
+        Appointment.objects.create(
+            provider=Provider.objects.create(name='Dr. Smith'),
+            client_email='client@example.com',
+            appointment_time=timezone.now() + timedelta(days=1),
+            payment_intent_id='pi_confirm'
+        )
+
+        with override_settings(STRIPE_WEBHOOK_SECRET=''), \
+                patch('payments.views.StripeService.confirm_payment', return_value=True):
+            for _ in range(2):
+                response = self.client.post('/payments/confirm/', {'payment_intent_id': 'pi_confirm'})
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Task.objects.filter(name='payments.send_payment_confirmation').count(), 1)
+
+        run_worker_burst(StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['client@example.com'])
+        self.assertIn('Dr. Smith', mail.outbox[0].body)